@@ -0,0 +1,135 @@
+import logging
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from PIL import Image
+
+from scripts.tile_indexer import DEFAULT_TILE_BUDGET, TILE_SIZE, analyze_tiles
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COLOR_TYPES = {0: "grayscale", 2: "rgb", 3: "indexed", 4: "grayscale_alpha", 6: "rgba"}
+# GB Studio sprite frames are 16x16
+SPRITE_FRAME_SIZE = 16
+
+def read_png_header(path: str) -> Optional[dict]:
+    """
+    Reads a PNG's dimensions, bit depth and colour type from its IHDR chunk
+    without decoding any image data. Returns None for files that are not PNGs.
+    """
+    with open(path, "rb") as f:
+        header = f.read(33)
+    if len(header) < 33 or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        return None
+    width, height, bit_depth, color_type = struct.unpack(">IIBB", header[16:26])
+    return {
+        "width": width,
+        "height": height,
+        "bit_depth": bit_depth,
+        "color_type": PNG_COLOR_TYPES.get(color_type, str(color_type)),
+    }
+
+def read_image_header(path: str) -> dict:
+    """Reads an image's size from its PNG header, falling back to Pillow's lazy open for other formats."""
+    header = read_png_header(path)
+    if header is not None:
+        return header
+    with Image.open(path) as img:
+        return {"width": img.width, "height": img.height, "bit_depth": None, "color_type": img.mode}
+
+class AssetInspector:
+    """
+    Caches what the project editor needs to know about files on disk: the
+    location of each project's .gbsproj and the header metadata, frame count
+    and tile statistics of each image. Image entries are keyed by path and
+    revalidated against the file's mtime and size, so a changed file is
+    re-read and an unchanged one never is.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._project_files: dict[str, str] = {}
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def project_file(self, project_path: str) -> str:
+        """Returns the .gbsproj in a project directory, walking the tree only when the cached path is gone."""
+        key = os.path.abspath(project_path)
+        cached = self._project_files.get(key)
+        if cached is not None and os.path.isfile(cached):
+            return cached
+        for root, _, files in os.walk(project_path):
+            for file in sorted(files):
+                if file.endswith('.gbsproj'):
+                    path = os.path.join(root, file)
+                    self._project_files[key] = path
+                    return path
+        self._project_files.pop(key, None)
+        raise FileNotFoundError("No .gbsproj file found in the specified project path.")
+
+    def inspect(self, path: str) -> dict:
+        """Returns an image's width, height, colour type, sprite frame count and tile grid size."""
+        return dict(self._entry(path)["info"])
+
+    def tile_stats(self, path: str, budget: int = DEFAULT_TILE_BUDGET) -> dict:
+        """Returns an image's unique tile report, decoding it only on the first call per file version."""
+        entry = self._entry(path)
+        report = entry["tiles"].get(budget)
+        if report is None:
+            report = analyze_tiles(path, budget)
+            with self._lock:
+                entry["tiles"][budget] = report
+        return dict(report)
+
+    def _entry(self, path: str) -> dict:
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["version"] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        header = read_image_header(key)
+        width, height = header["width"], header["height"]
+        info = {
+            **header,
+            "size": stat.st_size,
+            "frames": (width // SPRITE_FRAME_SIZE) * (height // SPRITE_FRAME_SIZE),
+            "tiles": (width // TILE_SIZE) * (height // TILE_SIZE),
+        }
+        entry = {"version": version, "info": info, "tiles": {}}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def forget(self, path: Optional[str] = None):
+        """Drops one file's cached metadata, or everything (including project locations) when no path is given."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._project_files.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "projects": len(self._project_files),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+asset_inspector = AssetInspector()
@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from scripts import database
+from scripts.metrics import DB_CALL_SECONDS, DB_WRITE_BATCH_SIZE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class AsyncDatabase:
+    """
+    Async front end for the synchronous functions in scripts/database.py.
+
+    Writes are queued to a single writer thread, which drains everything
+    waiting in the queue (up to `max_batch` calls) and runs it as one
+    transaction, so a burst of inserts and updates costs one commit instead
+    of one per call. Reads run on a small thread pool; with WAL journaling
+    they never wait for the writer. Awaiting a write returns the function's
+    result once its batch has been committed.
+    """
+
+    def __init__(self, max_batch: int = 64, reader_threads: int = 4):
+        self.max_batch = max_batch
+        self.reader_threads = reader_threads
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._readers: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    def start(self):
+        """Starts the writer thread. Called lazily by the first write if needed."""
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+                self._writer.start()
+
+    async def stop(self):
+        """Commits the queued writes, then stops the writer thread and reader pool."""
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._queue.put(None)
+            await asyncio.to_thread(writer.join)
+        self._writer = None
+        if self._readers is not None:
+            self._readers.shutdown(wait=False)
+            self._readers = None
+
+    async def write(self, func: Callable, *args, **kwargs):
+        """Queues a database write and waits for its batch to be committed."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with DB_CALL_SECONDS.time(function=_function_name(func), kind="write"):
+            self._queue.put((functools.partial(func, *args, **kwargs), loop, future))
+            return await future
+
+    async def read(self, func: Callable, *args, **kwargs):
+        """Runs a database read on the reader pool."""
+        if self._readers is None:
+            self._readers = ThreadPoolExecutor(max_workers=self.reader_threads, thread_name_prefix="db-reader")
+        loop = asyncio.get_running_loop()
+        with DB_CALL_SECONDS.time(function=_function_name(func), kind="read"):
+            return await loop.run_in_executor(self._readers, functools.partial(func, *args, **kwargs))
+
+    def _writer_loop(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+        database.close_db_connections()
+
+    def _run_batch(self, batch: list):
+        results = []
+        try:
+            with database.write_batch():
+                for call, _, _ in batch:
+                    try:
+                        results.append((call(), None))
+                    except Exception as e:
+                        results.append((None, e))
+        except sqlite3.Error as e:
+            logging.error(f"Failed to commit database write batch of {len(batch)} calls: {e}")
+            results = [(None, e)] * len(batch)
+        self.batches += 1
+        self.writes += len(batch)
+        DB_WRITE_BATCH_SIZE.observe(len(batch))
+        for (_, loop, future), (result, error) in zip(batch, results):
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+            except RuntimeError:
+                # The caller's event loop has already closed
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "writes": self.writes,
+            "average_batch_size": round(self.writes / self.batches, 2) if self.batches else 0.0,
+        }
+
+def _function_name(func: Callable) -> str:
+    """Returns a metrics label for a database call, unwrapping partials."""
+    while isinstance(func, functools.partial):
+        func = func.func
+    return getattr(func, "__name__", type(func).__name__)
+
+def _resolve(future: asyncio.Future, result, error: Optional[Exception]):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+async_db = AsyncDatabase()
@@ -0,0 +1,483 @@
+"""
+Load-tests the hub on a CPU-only machine. Starts fake Ollama and ComfyUI
+servers (see fake_backends.py), runs the real hub app against them with
+uvicorn, and drives chat, Art generation, approval and /ws fan-out at a
+configurable concurrency. Reports p50/p95/p99 latencies, jobs per minute
+and the hub's event-loop lag, and can save a baseline and fail on regression.
+
+    python -m scripts.benchmark --chats 200 --generations 40 --concurrency 8 --ws-clients 25
+    python -m scripts.benchmark --save-baseline benchmark_baseline.json
+    python -m scripts.benchmark --baseline benchmark_baseline.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import aiohttp
+import httpx
+
+from scripts.fake_backends import FakeComfyUI, FakeOllama, workflow_models
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Lower bounds under which a slower run is treated as noise rather than a regression
+MIN_REGRESSION_MS = 5.0
+BASELINE_METRICS = ("p50_ms", "p95_ms")
+
+def percentile(values: list[float], q: float) -> float:
+    """Linearly interpolated percentile (q in 0-100) of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def summarize(seconds: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    return {
+        "count": len(seconds),
+        "p50_ms": round(percentile(seconds, 50) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 2),
+        "p99_ms": round(percentile(seconds, 99) * 1000, 2),
+        "max_ms": round(max(seconds) * 1000, 2) if seconds else 0.0,
+    }
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Returns a description of every regression against a baseline report:
+    latency percentiles (including event-loop lag) more than `tolerance`
+    slower, and jobs per minute more than `tolerance` lower.
+    """
+    regressions = []
+    for name, previous in baseline.get("latency", {}).items():
+        current = report.get("latency", {}).get(name)
+        if not current or not current["count"] or not previous["count"]:
+            continue
+        for metric in BASELINE_METRICS:
+            limit = max(previous[metric] * (1 + tolerance), previous[metric] + MIN_REGRESSION_MS)
+            if current[metric] > limit:
+                regressions.append(f"{name} {metric} {current[metric]} > {round(limit, 2)} (baseline {previous[metric]})")
+    previous_rate = baseline.get("jobs_per_minute") or 0.0
+    if previous_rate and report.get("jobs_per_minute", 0.0) < previous_rate * (1 - tolerance):
+        regressions.append(f"jobs_per_minute {report['jobs_per_minute']} < {round(previous_rate * (1 - tolerance), 2)} (baseline {previous_rate})")
+    return regressions
+
+class LoopLagMonitor:
+    """Measures how late a periodic sleep wakes up on the loop it runs on, i.e. how long that loop was blocked."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[float] = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - started - self.interval, 0.0))
+
+class HubServer:
+    """Serves the hub app with uvicorn on its own thread and event loop, so load generation does not skew its loop lag."""
+
+    def __init__(self, app, lag_interval: float = 0.01):
+        self.app = app
+        self.lag = LoopLagMonitor(lag_interval)
+        self.url: Optional[str] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, timeout: float = 30.0):
+        import uvicorn
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, log_level="warning", lifespan="on"))
+        self._thread = threading.Thread(target=asyncio.run, args=(self._serve(sock),), name="hub", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("The hub did not start.")
+            time.sleep(0.02)
+
+    async def _serve(self, sock: socket.socket):
+        monitor = asyncio.create_task(self.lag.run())
+        try:
+            await self._server.serve(sockets=[sock])
+        finally:
+            monitor.cancel()
+
+    def stop(self, timeout: float = 30.0):
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+class EventListeners:
+    """
+    Dashboard stand-ins: `clients` /ws connections that record when each
+    job event reaches each of them. The first arrival of a job's COMPLETED
+    or ERROR event marks the job finished.
+    """
+
+    def __init__(self, url: str, clients: int):
+        self.url = url.replace("http://", "ws://", 1) + "/ws"
+        self.clients = max(clients, 1)
+        self.arrivals: dict[str, dict[int, float]] = {}
+        self.finished: dict[int, tuple[str, float]] = {}
+        self._waiters: dict[int, asyncio.Future] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        self._session = aiohttp.ClientSession()
+        sockets = await asyncio.gather(*(self._session.ws_connect(self.url, heartbeat=None) for _ in range(self.clients)))
+        self._tasks = [asyncio.create_task(self._read(index, ws)) for index, ws in enumerate(sockets)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+
+    async def _read(self, index: int, ws: aiohttp.ClientWebSocketResponse):
+        async for message in ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                break
+            received = time.perf_counter()
+            data = json.loads(message.data)
+            if data.get("event") == "PING":
+                await ws.send_json({"action": "pong"})
+                continue
+            asset_id = data.get("asset_id")
+            if asset_id is None:
+                continue
+            self.arrivals.setdefault(message.data, {}).setdefault(index, received)
+            status = "ERROR" if data.get("event") == "ERROR" else data.get("status")
+            if status in ("COMPLETED", "ERROR") and asset_id not in self.finished:
+                self.finished[asset_id] = (status, received)
+                waiter = self._waiters.pop(asset_id, None)
+                if waiter and not waiter.done():
+                    waiter.set_result(self.finished[asset_id])
+
+    async def wait_for(self, asset_id: int, timeout: float) -> tuple[str, float]:
+        if asset_id in self.finished:
+            return self.finished[asset_id]
+        waiter = self._waiters.setdefault(asset_id, asyncio.get_running_loop().create_future())
+        return await asyncio.wait_for(waiter, timeout)
+
+    def fanout(self) -> tuple[list[float], float]:
+        """Returns, per event, the delay between its first and last delivery, and the fraction of deliveries that arrived."""
+        spreads = [max(times.values()) - min(times.values()) for times in self.arrivals.values() if len(times) == self.clients]
+        delivered = sum(len(times) for times in self.arrivals.values())
+        expected = len(self.arrivals) * self.clients
+        return spreads, round(delivered / expected, 4) if expected else 1.0
+
+def prepare_workdir(workdir: str, ollama_url: str, comfyui_urls: list[str], generation_concurrency: int, warmup: bool = True) -> dict:
+    """
+    Lays out a throwaway project, workflow folder and output folder and
+    points the hub's settings at them and at the fakes. Must run before
+    scripts.main is imported, since the hub reads its settings on import.
+    """
+    project = os.path.join(workdir, "project_files")
+    for subfolder in ("sprites", "backgrounds", "ui"):
+        os.makedirs(os.path.join(project, "assets", subfolder), exist_ok=True)
+    with open(os.path.join(project, "benchmark.gbsproj"), "w") as f:
+        json.dump({"sprites": [], "backgrounds": []}, f)
+    shutil.copytree(os.path.join(REPO_ROOT, "workflows"), os.path.join(workdir, "workflows"), dirs_exist_ok=True)
+    os.makedirs(os.path.join(workdir, "output"), exist_ok=True)
+    environment = {
+        "GB_PROJECT_PATH": project,
+        "COMFYUI_OUTPUT_PATH": os.path.join(workdir, "output"),
+        "GBS_CLI_PATH": "/nonexistent/gb-studio-cli",
+        "EMULATOR_PATH": "/nonexistent/emulator",
+        "OLLAMA_API_URL": ollama_url,
+        "COMFYUI_API_URL": comfyui_urls[0],
+        "COMFYUI_BACKEND_URLS": ",".join(comfyui_urls),
+        "COMFYUI_HEALTH_INTERVAL": "1.0",
+        "GENERATION_CONCURRENCY": str(generation_concurrency),
+        "GENERATION_RETRY_BACKOFF": "0.1",
+        "GENERATION_RETRY_BACKOFF_MAX": "1.0",
+        "LLM_CACHE_ENABLED": "false",
+        "RESULT_CACHE_ENABLED": "false",
+        "WARMUP_ENABLED": str(warmup).lower(),
+    }
+    os.environ.update(environment)
+    return environment
+
+async def timed_chat(client: httpx.AsyncClient, agent: str, message: str) -> tuple[float, bool]:
+    started = time.perf_counter()
+    try:
+        response = await client.post(f"/api/v1/chat/{agent}", json={"message": message, "bypass_cache": True})
+        ok = response.status_code == 200 and "error" not in response.json()
+    except httpx.HTTPError:
+        ok = False
+    return time.perf_counter() - started, ok
+
+async def request_generation(client: httpx.AsyncClient, message: str) -> Optional[int]:
+    """Asks the Art agent for a sprite over the streaming chat endpoint and returns the queued asset ID."""
+    asset_id = None
+    async with client.stream("POST", "/api/v1/chat/Art/stream", json={"message": message, "bypass_cache": True}) as response:
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "job":
+                asset_id = json.loads(line[6:])["asset_id"]
+    return asset_id
+
+async def wait_until_ready(hub_url: str, timeout: float) -> float:
+    """Polls the hub's /ready until its models have warmed up and returns how long that took."""
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=hub_url, timeout=httpx.Timeout(5.0)) as client:
+        while True:
+            try:
+                if (await client.get("/ready")).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError(f"The hub was not ready after {timeout}s.")
+            await asyncio.sleep(0.05)
+
+class Benchmark:
+    """One load run: drives the hub at `hub_url` and collects latencies."""
+
+    def __init__(self, hub_url: str, listeners: EventListeners, options: argparse.Namespace):
+        self.hub_url = hub_url
+        self.listeners = listeners
+        self.options = options
+        self.latencies: dict[str, list[float]] = {"chat": [], "generation": [], "approval": []}
+        self.counts = {"chat_errors": 0, "generation_failed": 0, "generation_completed": 0, "approval_errors": 0}
+
+    async def run_chats(self, client: httpx.AsyncClient):
+        limit = asyncio.Semaphore(self.options.concurrency)
+
+        async def one(i: int):
+            async with limit:
+                seconds, ok = await timed_chat(client, "PM", f"Status update {i}")
+            self.latencies["chat"].append(seconds)
+            if not ok:
+                self.counts["chat_errors"] += 1
+
+        await asyncio.gather(*(one(i) for i in range(self.options.chats)))
+
+    async def run_generations(self, client: httpx.AsyncClient):
+        limit = asyncio.Semaphore(self.options.concurrency)
+
+        async def one(i: int):
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    asset_id = await request_generation(client, f"benchmark sprite {i}")
+                    if asset_id is None:
+                        raise RuntimeError("no job queued")
+                    status, finished = await self.listeners.wait_for(asset_id, self.options.job_timeout)
+                except (httpx.HTTPError, RuntimeError, asyncio.TimeoutError):
+                    self.counts["generation_failed"] += 1
+                    return
+                if status != "COMPLETED":
+                    self.counts["generation_failed"] += 1
+                    return
+                self.latencies["generation"].append(finished - started)
+                self.counts["generation_completed"] += 1
+                if self.options.approve:
+                    await self.approve(client, asset_id)
+
+        await asyncio.gather(*(one(i) for i in range(self.options.generations)))
+
+    async def approve(self, client: httpx.AsyncClient, asset_id: int):
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/v1/approve_asset", json={"asset_id": asset_id, "asset_type": "sprite"})
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        self.latencies["approval"].append(time.perf_counter() - started)
+        if not ok:
+            self.counts["approval_errors"] += 1
+
+    async def run(self, lag_samples: list[float]) -> dict:
+        timeout = httpx.Timeout(self.options.job_timeout)
+        limits = httpx.Limits(max_connections=self.options.concurrency * 2 + 10)
+        async with httpx.AsyncClient(base_url=self.hub_url, timeout=timeout, limits=limits) as client:
+            # One untimed round trip so connection setup and the first catalog fetch are not measured
+            await timed_chat(client, "PM", "warm up")
+            lag_samples.clear()
+            started = time.perf_counter()
+            await asyncio.gather(self.run_chats(client), self.run_generations(client))
+            elapsed = time.perf_counter() - started
+        spreads, delivery = self.listeners.fanout()
+        return {
+            "duration_seconds": round(elapsed, 3),
+            "latency": {
+                **{name: summarize(values) for name, values in self.latencies.items()},
+                "ws_fanout": summarize(spreads),
+                "event_loop_lag": summarize(list(lag_samples)),
+            },
+            "jobs_per_minute": round(self.counts["generation_completed"] / elapsed * 60, 2) if elapsed else 0.0,
+            "ws_delivery_ratio": delivery,
+            **self.counts,
+        }
+
+@asynccontextmanager
+async def fake_hub(options: argparse.Namespace):
+    """
+    Starts the fakes and a hub pointed at them, yielding the running hub
+    server, the fake Ollama and the fake ComfyUI hosts. Everything,
+    including the throwaway project, is torn down afterwards.
+    """
+    ollama = FakeOllama(
+        latency=options.ollama_latency, token_delay=options.ollama_token_delay,
+        jitter=options.jitter, failure_rate=options.ollama_failure_rate, load_latency=options.ollama_load_latency,
+        seed=options.seed
+    )
+    models = workflow_models(os.path.join(REPO_ROOT, "workflows"))
+    comfyuis = [
+        FakeComfyUI(
+            latency=options.comfyui_latency, workers=options.comfyui_workers, jitter=options.jitter,
+            failure_rate=options.comfyui_failure_rate, models=models,
+            seed=None if options.seed is None else options.seed + index
+        )
+        for index in range(options.comfyui_backends)
+    ]
+    await ollama.start()
+    comfyui_urls = [await comfyui.start() for comfyui in comfyuis]
+
+    workdir = tempfile.mkdtemp(prefix="hub-benchmark-")
+    hub = None
+    try:
+        prepare_workdir(workdir, ollama.generate_url, comfyui_urls, options.generation_concurrency, options.warmup)
+        from scripts import database
+        database.DB_FILE = os.path.join(workdir, "hub.db")
+        from scripts.main import app
+        if not options.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+        hub = HubServer(app)
+        await asyncio.to_thread(hub.start)
+        # Measure the warmed-up hub; with --no-warmup /ready answers at once
+        hub.warmup_seconds = round(await wait_until_ready(hub.url, options.warmup_timeout), 3)
+        yield hub, ollama, comfyuis
+    finally:
+        if hub is not None:
+            await asyncio.to_thread(hub.stop)
+        for server in (ollama, *comfyuis):
+            await server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+async def run_benchmark(options: argparse.Namespace) -> dict:
+    """Starts the fakes and the hub, runs the load and returns the report."""
+    async with fake_hub(options) as (hub, ollama, comfyuis):
+        listeners = EventListeners(hub.url, options.ws_clients)
+        try:
+            await listeners.start()
+            report = await Benchmark(hub.url, listeners, options).run(hub.lag.samples)
+        finally:
+            await listeners.stop()
+        report["warmup_seconds"] = hub.warmup_seconds
+
+    report["config"] = {
+        key: getattr(options, key) for key in (
+            "chats", "generations", "concurrency", "ws_clients", "approve", "comfyui_backends", "comfyui_workers",
+            "generation_concurrency", "ollama_latency", "ollama_token_delay", "ollama_load_latency", "comfyui_latency",
+            "jitter", "ollama_failure_rate", "comfyui_failure_rate", "warmup", "seed"
+        )
+    }
+    report["fakes"] = fake_counts(ollama, comfyuis)
+    return report
+
+def fake_counts(ollama: FakeOllama, comfyuis: list[FakeComfyUI]) -> dict:
+    return {
+        "ollama_requests": ollama.requests,
+        "ollama_failures": ollama.failures,
+        "ollama_loads": ollama.loads,
+        "comfyui_prompts": sum(comfyui.submitted for comfyui in comfyuis),
+        "comfyui_failures": sum(comfyui.failures for comfyui in comfyuis),
+    }
+
+def format_report(report: dict) -> str:
+    lines = [f"{'':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for name, stats in report["latency"].items():
+        lines.append(
+            f"{name:<16}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}"
+        )
+    lines.append(
+        f"jobs/min {report['jobs_per_minute']}  completed {report['generation_completed']}  "
+        f"failed {report['generation_failed']}  chat errors {report['chat_errors']}  "
+        f"approval errors {report['approval_errors']}  ws delivery {report['ws_delivery_ratio']}  "
+        f"in {report['duration_seconds']}s (hub ready after {report['warmup_seconds']}s)"
+    )
+    return "\n".join(lines)
+
+def add_fake_backend_arguments(parser: argparse.ArgumentParser):
+    """Adds the options controlling the fake Ollama and ComfyUI servers and the hub run against them."""
+    parser.add_argument("--ollama-latency", type=float, default=0.05, help="seconds before the fake LLM's first token")
+    parser.add_argument("--ollama-token-delay", type=float, default=0.002, help="seconds between fake LLM tokens")
+    parser.add_argument("--ollama-failure-rate", type=float, default=0.0)
+    parser.add_argument("--ollama-load-latency", type=float, default=0.0, help="seconds the fake LLM takes to load when not resident")
+    parser.add_argument("--comfyui-backends", type=int, default=1, help="fake ComfyUI hosts to load-balance across")
+    parser.add_argument("--comfyui-workers", type=int, default=1, help="prompts each fake ComfyUI executes at once")
+    parser.add_argument("--comfyui-latency", type=float, default=0.2, help="seconds each fake prompt takes to execute")
+    parser.add_argument("--comfyui-failure-rate", type=float, default=0.0)
+    parser.add_argument("--generation-concurrency", type=int, default=1, help="hub jobs per ComfyUI host (GENERATION_CONCURRENCY)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- fraction applied to fake latencies")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the fakes' jitter and failures")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false", help="start the hub cold (WARMUP_ENABLED=false)")
+    parser.add_argument("--warmup-timeout", type=float, default=120.0, help="seconds to wait for the hub's /ready")
+    parser.add_argument("--verbose", action="store_true", help="keep the hub's INFO logging")
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test the hub against fake Ollama and ComfyUI servers.")
+    parser.add_argument("--chats", type=int, default=100, help="PM chat requests to send")
+    parser.add_argument("--generations", type=int, default=20, help="Art generations to request through the streaming chat")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent chats and, separately, concurrent generations")
+    parser.add_argument("--ws-clients", type=int, default=10, help="dashboard WebSocket clients receiving job events")
+    parser.add_argument("--no-approve", dest="approve", action="store_false", help="skip approving finished generations")
+    parser.add_argument("--job-timeout", type=float, default=120.0, help="seconds to wait for a generation to finish")
+    add_fake_backend_arguments(parser)
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--baseline", help="compare against this baseline report and exit 1 on regression")
+    parser.add_argument("--save-baseline", help="save this run's report as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a metric counts as a regression")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[list[str]] = None) -> int:
+    options = parse_args(argv)
+    # The hub serves /static relative to the working directory
+    os.chdir(REPO_ROOT)
+    report = asyncio.run(run_benchmark(options))
+    print(format_report(report))
+    for path in (options.output, options.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+    if options.baseline:
+        with open(options.baseline, "r") as f:
+            regressions = compare_to_baseline(report, json.load(f), options.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {options.baseline} (tolerance {options.tolerance:.0%}).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+import aiohttp
+
+from scripts.comfyui_tracker import ComfyUITracker
+from scripts.model_catalog import ModelCatalog
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class ComfyUIBackend:
+    """A single ComfyUI host with its own WebSocket tracker, model catalog and health state."""
+
+    def __init__(self, url: str, tracker: ComfyUITracker, catalog: ModelCatalog):
+        self.url = url
+        self.tracker = tracker
+        self.catalog = catalog
+        self.healthy = True
+        self.draining = False
+        self.queue_depth = 0
+        self.consecutive_failures = 0
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and not self.draining
+
+    def as_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "draining": self.draining,
+            "queue_depth": self.queue_depth,
+            "websocket_connected": self.tracker.connected,
+            "consecutive_failures": self.consecutive_failures,
+            "last_checked_seconds_ago": round(time.monotonic() - self.last_checked, 1) if self.last_checked else None,
+            "last_error": self.last_error,
+        }
+
+class ComfyUIBackendPool:
+    """
+    Tracks a set of ComfyUI hosts, health-checks them through /queue and
+    reports which ones can accept work and how loaded they are, so the
+    generation scheduler can route each job to the least-loaded healthy host.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        session_provider: Callable[[str], aiohttp.ClientSession],
+        catalog_ttl: float = 300.0,
+        request_timeout: float = 60.0,
+        health_interval: float = 10.0,
+        failure_threshold: int = 2,
+        use_websocket: bool = True
+    ):
+        self._session_provider = session_provider
+        self.request_timeout = request_timeout
+        self.health_interval = health_interval
+        self.failure_threshold = failure_threshold
+        self.use_websocket = use_websocket
+        self.backends: dict[str, ComfyUIBackend] = {}
+        for url in urls:
+            url = url.rstrip("/")
+            self.backends[url] = ComfyUIBackend(
+                url,
+                ComfyUITracker(url, session_provider),
+                ModelCatalog(url, session_provider, ttl=catalog_ttl, request_timeout=request_timeout)
+            )
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def urls(self) -> list[str]:
+        return list(self.backends)
+
+    @property
+    def default(self) -> ComfyUIBackend:
+        return next(iter(self.backends.values()))
+
+    def get(self, url: Optional[str]) -> ComfyUIBackend:
+        """Returns the backend for a URL, or the default backend if the URL is unknown or empty."""
+        if url and url.rstrip("/") in self.backends:
+            return self.backends[url.rstrip("/")]
+        return self.default
+
+    def start(self):
+        """Starts the WebSocket trackers and the periodic health checker."""
+        if self.use_websocket:
+            for backend in self.backends.values():
+                backend.tracker.start()
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for backend in self.backends.values():
+            await backend.tracker.stop()
+
+    def load(self, url: str) -> Optional[float]:
+        """Returns the backend's last known queue depth, or None if it should not receive new work."""
+        backend = self.backends.get(url)
+        if backend is None or not backend.available:
+            return None
+        return backend.queue_depth
+
+    def set_draining(self, url: str, draining: bool) -> bool:
+        backend = self.backends.get(url.rstrip("/"))
+        if backend is None:
+            return False
+        backend.draining = draining
+        logging.info(f"ComfyUI backend {backend.url} {'draining' if draining else 'accepting work'}")
+        return True
+
+    def record_failure(self, url: str, error: str):
+        """Counts a request failure against a backend, marking it unhealthy past the threshold."""
+        backend = self.backends.get(url)
+        if backend is None:
+            return
+        backend.consecutive_failures += 1
+        backend.last_error = error
+        if backend.healthy and backend.consecutive_failures >= self.failure_threshold:
+            backend.healthy = False
+            logging.warning(f"ComfyUI backend {url} marked unhealthy: {error}")
+
+    def record_success(self, url: str):
+        backend = self.backends.get(url)
+        if backend is None:
+            return
+        backend.consecutive_failures = 0
+        if not backend.healthy:
+            logging.info(f"ComfyUI backend {url} is healthy again")
+        backend.healthy = True
+
+    async def check_health(self, backend: ComfyUIBackend):
+        """Reads /queue to refresh a backend's health and queue depth."""
+        backend.last_checked = time.monotonic()
+        try:
+            session = self._session_provider(backend.url)
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+            async with session.get(f"{backend.url}/queue", timeout=timeout) as response:
+                if response.status != 200:
+                    raise Exception(f"/queue returned {response.status}")
+                queue = await response.json()
+            backend.queue_depth = len(queue.get("queue_running", [])) + len(queue.get("queue_pending", []))
+            self.record_success(backend.url)
+        except Exception as e:
+            self.record_failure(backend.url, str(e) or type(e).__name__)
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check_health(backend) for backend in self.backends.values()))
+
+    async def _health_loop(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.health_interval)
+
+    def status(self) -> list[dict]:
+        return [backend.as_dict() for backend in self.backends.values()]
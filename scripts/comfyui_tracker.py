@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ProgressCallback = Callable[[dict], Awaitable[None]]
+StartCallback = Callable[[], None]
+
+class ComfyUITrackerDisconnected(Exception):
+    """Raised for outstanding jobs when the ComfyUI WebSocket connection drops."""
+
+class ComfyUIExecutionError(Exception):
+    """Raised when ComfyUI reports that a prompt failed or was interrupted."""
+
+class _TrackedJob:
+    def __init__(self, future: asyncio.Future, on_progress: Optional[ProgressCallback], on_start: Optional[StartCallback] = None):
+        self.future = future
+        self.on_progress = on_progress
+        self.on_start = on_start
+        self.started = False
+        self.outputs: dict = {}
+
+    def mark_started(self):
+        """Reports once that the prompt has left ComfyUI's queue and begun executing."""
+        if self.started:
+            return
+        self.started = True
+        if self.on_start:
+            try:
+                self.on_start()
+            except Exception as e:
+                logging.warning(f"Start callback failed: {e}")
+
+class ComfyUITracker:
+    """
+    Listens on ComfyUI's /ws endpoint and multiplexes execution messages for
+    every outstanding prompt_id, resolving one future per job when ComfyUI
+    reports that the prompt has finished executing.
+
+    Prompts must be submitted with this tracker's client_id so that ComfyUI
+    routes their progress messages to this connection.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        session_provider: Callable[[str], aiohttp.ClientSession],
+        reconnect_delay: float = 5.0,
+        recent_results: int = 256
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.client_id = uuid.uuid4().hex
+        self.reconnect_delay = reconnect_delay
+        self._session_provider = session_provider
+        self._jobs: dict[str, _TrackedJob] = {}
+        # Outputs of prompts that started, or finished, before anyone tracked them
+        self._early_outputs: OrderedDict[str, dict] = OrderedDict()
+        self._recent: OrderedDict[str, object] = OrderedDict()
+        self._recent_limit = recent_results
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+
+    @property
+    def ws_url(self) -> str:
+        scheme = "wss" if self.base_url.startswith("https") else "ws"
+        host = self.base_url.split("://", 1)[-1]
+        return f"{scheme}://{host}/ws?clientId={self.client_id}"
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self):
+        """Starts the background listener task on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the listener and fails any jobs that are still waiting."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._connected.clear()
+        self._fail_pending(ComfyUITrackerDisconnected("ComfyUI tracker stopped."))
+
+    def track(
+        self,
+        prompt_id: str,
+        on_progress: Optional[ProgressCallback] = None,
+        on_start: Optional[StartCallback] = None
+    ) -> asyncio.Future:
+        """
+        Registers interest in a prompt and returns a future that resolves to the
+        prompt's outputs dictionary (node_id -> output) once it has executed.
+        `on_start` is called when the prompt starts executing.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if prompt_id in self._recent:
+            result = self._recent.pop(prompt_id)
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+            return future
+        job = _TrackedJob(future, on_progress, on_start)
+        job.outputs = self._early_outputs.pop(prompt_id, {})
+        self._jobs[prompt_id] = job
+        return future
+
+    async def wait(
+        self,
+        prompt_id: str,
+        timeout: float,
+        on_progress: Optional[ProgressCallback] = None,
+        on_start: Optional[StartCallback] = None
+    ) -> dict:
+        """Waits for a prompt to finish executing and returns its outputs."""
+        future = self.track(prompt_id, on_progress, on_start)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._jobs.pop(prompt_id, None)
+
+    async def _run(self):
+        while True:
+            try:
+                session = self._session_provider(self.base_url)
+                async with session.ws_connect(self.ws_url, heartbeat=30) as ws:
+                    self._connected.set()
+                    logging.info(f"Connected to ComfyUI WebSocket at {self.base_url}")
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            await self._handle_message(msg.data)
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+                        # Binary frames carry preview images, which we ignore
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"ComfyUI WebSocket connection failed: {e}")
+            if self._connected.is_set():
+                logging.warning("ComfyUI WebSocket disconnected; pending jobs will fall back to polling.")
+            self._connected.clear()
+            self._fail_pending(ComfyUITrackerDisconnected("ComfyUI WebSocket disconnected."))
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _handle_message(self, raw: str):
+        try:
+            message = json.loads(raw)
+        except json.JSONDecodeError:
+            logging.warning(f"Ignoring malformed ComfyUI WebSocket message: {raw[:200]}")
+            return
+
+        msg_type = message.get("type")
+        data = message.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+        job = self._jobs.get(prompt_id)
+        if job and msg_type in ("execution_start", "execution_cached", "executing", "progress", "executed"):
+            # Any execution message means the prompt has left the queue
+            job.mark_started()
+
+        if msg_type == "progress":
+            if job and job.on_progress:
+                try:
+                    await job.on_progress({
+                        "value": data.get("value"),
+                        "max": data.get("max"),
+                        "node": data.get("node")
+                    })
+                except Exception as e:
+                    logging.warning(f"Progress callback failed for prompt {prompt_id}: {e}")
+        elif msg_type == "executed":
+            if job is not None:
+                outputs = job.outputs
+            else:
+                outputs = self._early_outputs.setdefault(prompt_id, {})
+                self._trim(self._early_outputs)
+            outputs[str(data.get("node"))] = data.get("output") or {}
+        elif msg_type == "executing" and data.get("node") is None:
+            # A null node for our prompt_id means the whole prompt has finished
+            outputs = job.outputs if job else self._early_outputs.pop(prompt_id, {})
+            self._resolve(prompt_id, outputs)
+        elif msg_type in ("execution_error", "execution_interrupted"):
+            reason = data.get("exception_message") or msg_type.replace("_", " ")
+            self._resolve(prompt_id, ComfyUIExecutionError(f"ComfyUI {msg_type} for prompt {prompt_id}: {reason}"))
+
+    def _resolve(self, prompt_id: str, result):
+        job = self._jobs.pop(prompt_id, None)
+        if job is None:
+            self._recent[prompt_id] = result
+            self._trim(self._recent)
+            return
+        if job.future.done():
+            return
+        if isinstance(result, Exception):
+            job.future.set_exception(result)
+        else:
+            job.future.set_result(result)
+
+    def _trim(self, entries: OrderedDict):
+        while len(entries) > self._recent_limit:
+            entries.popitem(last=False)
+
+    def _fail_pending(self, error: Exception):
+        for prompt_id, job in list(self._jobs.items()):
+            if not job.future.done():
+                job.future.set_exception(error)
+        self._jobs.clear()
@@ -8,7 +8,104 @@ class Settings(BaseSettings):
     gbs_cli_path: str
     emulator_path: str
     ollama_api_url: str
+    ollama_model: str = "qwen3:1.7b"
     comfyui_api_url: str = os.getenv("COMFYUI_URL", "http://host.docker.internal:8188")
+    # Comma-separated list of ComfyUI hosts to load-balance across; defaults to comfyui_api_url
+    comfyui_backend_urls: str = ""
+
+    # Shared HTTP client pool used for Ollama and ComfyUI calls
+    http_pool_limit: int = 100
+    http_pool_limit_per_host: int = 20
+    http_keepalive_timeout: float = 30.0
+    http_connect_timeout: float = 10.0
+    ollama_request_timeout: float = 300.0
+    comfyui_request_timeout: float = 60.0
+
+    # ComfyUI job completion tracking
+    comfyui_use_websocket: bool = True
+    comfyui_result_timeout: float = 900.0
+    comfyui_poll_interval: float = 2.0
+    comfyui_catalog_ttl: float = 300.0
+    comfyui_health_interval: float = 10.0
+    comfyui_failure_threshold: int = 2
+
+    # PM project history summary
+    project_history_conversations: int = 10
+    project_history_assets: int = 10
+    project_history_token_budget: int = 1500
+    project_history_response_chars: int = 400
+
+    # Agent response cache
+    llm_cache_enabled: bool = False
+    llm_cache_ttl: float = 86400.0
+    llm_cache_max_entries: int = 1000
+    llm_cache_max_bytes: int = 10_000_000
+
+    # Generated image cache, keyed by the fully substituted workflow
+    result_cache_enabled: bool = False
+    result_cache_max_bytes: int = 1_000_000_000
+
+    # Game Boy post-processing of generated images: resample is "nearest", "mean" or "majority"
+    gb_postprocess_enabled: bool = True
+    gb_postprocess_resample: str = "majority"
+    gb_postprocess_dither: bool = False
+
+    # Unique 8x8 tile budget checked before a background is added to the project;
+    # with merging enabled, near-duplicate tiles (differing in up to N pixels) are merged to fit
+    background_tile_budget: int = 192
+    tile_merge_enabled: bool = False
+    tile_merge_max_distance: int = 6
+
+    # Rotating backups kept of the .gbsproj, one per batch of project edits
+    gbsproj_max_backups: int = 10
+
+    # Asset integration: parallel file moves and GB Studio CLI build timeout (seconds)
+    integration_workers: int = 4
+    gbs_build_timeout: float = 1800.0
+
+    # Generation job scheduler
+    generation_concurrency: int = 1
+    generation_max_attempts: int = 3
+    generation_retry_backoff: float = 5.0
+    generation_retry_backoff_max: float = 300.0
+    generation_default_duration: float = 60.0
+    generation_batch_max_items: int = 256
+
+    # Workflow templates are reloaded when their files change
+    workflow_reload_interval: float = 2.0
+
+    # WebSocket fan-out
+    ws_send_queue_size: int = 100
+    ws_send_timeout: float = 5.0
+    ws_heartbeat_interval: float = 20.0
+    ws_heartbeat_timeout: float = 60.0
+
+    # Event bus shared by worker processes: "memory" (single process) or "sqlite"
+    event_bus_backend: str = "memory"
+    event_bus_poll_interval: float = 0.1
+    event_bus_retention: float = 300.0
+
+    # Opt-in capture of state-changing API calls to a rotating JSONL file, replayable with scripts/replay.py
+    traffic_capture_enabled: bool = False
+    traffic_capture_path: str = "captures/requests.jsonl"
+    traffic_capture_max_bytes: int = 10_000_000
+    traffic_capture_backups: int = 5
+
+    # Model warm-up from startup: the Ollama model is kept loaded for ollama_keep_alive
+    # (an Ollama duration; negative keeps it loaded indefinitely) and every workflow
+    # template runs a throwaway prompt on each ComfyUI host; both are re-warmed every
+    # warmup_interval seconds (0 disables re-warming)
+    warmup_enabled: bool = True
+    warmup_comfyui_enabled: bool = True
+    ollama_keep_alive: str = "30m"
+    warmup_interval: float = 600.0
+    warmup_timeout: float = 600.0
+
+    @computed_field
+    @property
+    def comfyui_backends(self) -> list[str]:
+        urls = [url.strip().rstrip("/") for url in self.comfyui_backend_urls.split(",") if url.strip()]
+        return urls or [self.comfyui_api_url.rstrip("/")]
 
     class Config:
         env_file = ".env"
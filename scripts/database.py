@@ -1,23 +1,231 @@
 import sqlite3
 import json
+import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 import logging
 
+from scripts.project_history import project_history
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 DB_FILE = "gbstudio_hub.db"
 
+# Columns that let the assets table double as the persistent generation job queue
+JOB_QUEUE_COLUMNS = {
+    "workflow": "TEXT",
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "next_attempt_at": "TEXT",
+    "last_error": "TEXT",
+    "backend": "TEXT",
+    "started_at": "TEXT",
+    "completed_at": "TEXT",
+    "worker_pid": "INTEGER",
+    "parent_id": "INTEGER",
+    "seed": "INTEGER",
+    "trace_id": "TEXT",
+    "cancel_requested": "INTEGER NOT NULL DEFAULT 0",
+    # When a retried or interrupted job became runnable again; NULL means since `timestamp`
+    "queued_at": "TEXT",
+}
+
+# Applied to every new connection. WAL lets readers proceed while a write is
+# in progress, and NORMAL sync is durable in WAL mode short of power loss.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+# Versioned schema migrations, tracked with PRAGMA user_version
+SCHEMA_MIGRATIONS = [
+    (1, "Index the columns used for filtering and ordering", [
+        "CREATE INDEX IF NOT EXISTS idx_assets_status ON assets (status)",
+        "CREATE INDEX IF NOT EXISTS idx_assets_timestamp ON assets (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_assets_queue ON assets (status, priority DESC, id)",
+        "CREATE INDEX IF NOT EXISTS idx_assets_source_path ON assets (source_path)",
+        "CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations (timestamp)",
+    ]),
+    (2, "Add the events table used by the SQLite event bus", [
+        """CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            payload TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_events_created_at ON events (created_at)",
+    ]),
+    (3, "Add generation batches", [
+        """CREATE TABLE IF NOT EXISTS generation_batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            workflow TEXT NOT NULL,
+            asset_type TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            total INTEGER NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_assets_parent_id ON assets (parent_id)",
+    ]),
+    (4, "Add the generated image result cache", [
+        """CREATE TABLE IF NOT EXISTS generation_cache (
+            key TEXT PRIMARY KEY,
+            workflow TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            created_at REAL NOT NULL,
+            last_accessed REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_generation_cache_last_accessed ON generation_cache (last_accessed)",
+    ]),
+    (5, "Add timed trace spans for chat turns and generation jobs", [
+        """CREATE TABLE IF NOT EXISTS trace_spans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trace_id TEXT NOT NULL,
+            asset_id INTEGER,
+            span_id TEXT NOT NULL,
+            parent_id TEXT,
+            name TEXT NOT NULL,
+            start REAL NOT NULL,
+            duration REAL,
+            attributes TEXT,
+            error TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_trace_spans_trace_id ON trace_spans (trace_id, start)",
+    ]),
+    (6, "Add the agent response cache", [
+        """CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            agent_name TEXT NOT NULL,
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_accessed REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_accessed ON llm_cache (last_accessed)",
+        "CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache (created_at)",
+    ]),
+]
+
+_local = threading.local()
+
+class PooledConnection:
+    """
+    Proxy for a thread's pooled sqlite3 connection. It behaves like the
+    connection itself, except that close() returns it to the pool (rolling
+    back any unfinished transaction) instead of closing it.
+
+    Inside write_batch() each `with conn:` block becomes a savepoint of the
+    batch's transaction, so a failing call only undoes its own changes and
+    the whole batch is committed once.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @property
+    def _batched(self) -> bool:
+        return getattr(_local, "batch_conn", None) is self._conn
+
+    def __enter__(self):
+        if self._batched:
+            self._conn.execute("SAVEPOINT batch_item")
+        else:
+            self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._batched:
+            return self._conn.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            self._conn.execute("ROLLBACK TO batch_item")
+        self._conn.execute("RELEASE batch_item")
+        return False
+
+    def close(self):
+        if self._conn.in_transaction and not self._batched:
+            self._conn.rollback()
+
+def _open_connection(db_file: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_file, timeout=5.0)
+    conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 def get_db_connection():
-    """Creates and returns a database connection."""
+    """
+    Returns this thread's pooled connection to DB_FILE, opening it on first use.
+    Callers still call close() when done; that hands the connection back.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row
-        return conn
+        connections = getattr(_local, "connections", None)
+        if connections is None:
+            connections = _local.connections = {}
+        conn = connections.get(DB_FILE)
+        if conn is None:
+            conn = connections[DB_FILE] = _open_connection(DB_FILE)
+        return PooledConnection(conn)
     except sqlite3.Error as e:
         logging.error(f"Database connection failed: {e}")
         return None
 
+def close_db_connections():
+    """Closes the pooled connections opened by the calling thread."""
+    connections = getattr(_local, "connections", None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+@contextmanager
+def write_batch():
+    """
+    Runs the database calls made by this thread inside the block as a single
+    transaction, committed (and synced) once at the end.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        raise sqlite3.OperationalError("Could not get database connection for write batch.")
+    if getattr(_local, "batch_conn", None) is not None:
+        yield
+        return
+    conn.execute("BEGIN")
+    _local.batch_conn = conn._conn
+    try:
+        yield
+        _local.batch_conn = None
+        conn.commit()
+    except BaseException:
+        _local.batch_conn = None
+        conn.rollback()
+        raise
+
+def apply_migrations(conn) -> int:
+    """Applies pending SCHEMA_MIGRATIONS and returns the resulting schema version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, description, statements in SCHEMA_MIGRATIONS:
+        if target <= version:
+            continue
+        with conn:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+        version = target
+        logging.info(f"Applied database migration {target}: {description}")
+    return version
+
 def initialize_database():
     """Initializes the database and creates tables if they don't exist."""
     conn = get_db_connection()
@@ -54,6 +262,15 @@ def initialize_database():
                     status TEXT NOT NULL DEFAULT 'generated'
                 );
             """)
+
+            # Add the generation job queue columns to older databases
+            cursor = conn.execute("PRAGMA table_info(assets)")
+            asset_columns = [column[1] for column in cursor.fetchall()]
+            for column_name, column_def in JOB_QUEUE_COLUMNS.items():
+                if column_name not in asset_columns:
+                    conn.execute(f"ALTER TABLE assets ADD COLUMN {column_name} {column_def};")
+                    logging.info(f"Added {column_name} column to assets table")
+        apply_migrations(conn)
         logging.info("Database initialized successfully.")
     except sqlite3.Error as e:
         logging.error(f"Database initialization failed: {e}")
@@ -77,6 +294,7 @@ def update_asset_status(asset_id: int, status: str) -> bool:
                 logging.warning(f"Attempted to update status for non-existent asset ID: {asset_id}")
                 return False
         logging.info(f"Updated asset {asset_id} to status '{status}'")
+        project_history.record_asset_status(asset_id, status)
         return True
     except sqlite3.Error as e:
         logging.error(f"Failed to update asset status for ID {asset_id}: {e}")
@@ -114,6 +332,112 @@ def get_approved_assets() -> list:
     finally:
         conn.close()
 
+def update_asset_statuses(asset_ids: list, status: str) -> int:
+    """Updates the status of many assets in one transaction and returns how many changed."""
+    if not asset_ids:
+        return 0
+    conn = get_db_connection()
+    if conn is None:
+        logging.error("Could not get database connection for updating asset statuses.")
+        return 0
+
+    try:
+        with conn:
+            cursor = conn.executemany(
+                "UPDATE assets SET status = ? WHERE id = ?",
+                [(status, asset_id) for asset_id in asset_ids]
+            )
+        logging.info(f"Updated {cursor.rowcount} assets to status '{status}'")
+        for asset_id in asset_ids:
+            project_history.record_asset_status(asset_id, status)
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logging.error(f"Failed to update asset statuses for IDs {asset_ids}: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def publish_event(origin: str, payload: str) -> int:
+    """Appends a serialized event to the events table and returns its ID, or -1 on error."""
+    conn = get_db_connection()
+    if conn is None:
+        logging.error("Could not get database connection for publishing an event.")
+        return -1
+
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO events (origin, created_at, payload) VALUES (?, ?, ?)",
+                (origin, time.time(), payload)
+            )
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        logging.error(f"Failed to publish event: {e}")
+        return -1
+    finally:
+        conn.close()
+
+def get_events_since(last_id: int, exclude_origin: str, limit: int = 500) -> list:
+    """Returns (id, payload) rows published after last_id by other processes."""
+    conn = get_db_connection()
+    if conn is None:
+        return []
+
+    try:
+        return conn.execute(
+            "SELECT id, payload FROM events WHERE id > ? AND origin != ? ORDER BY id LIMIT ?",
+            (last_id, exclude_origin, limit)
+        ).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Failed to read events: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_last_event_id() -> int:
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+
+    try:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+    except sqlite3.Error as e:
+        logging.error(f"Failed to read the last event ID: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def prune_events(older_than: float) -> int:
+    """Deletes events created before the given UNIX time."""
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+
+    try:
+        with conn:
+            return conn.execute("DELETE FROM events WHERE created_at < ?", (older_than,)).rowcount
+    except sqlite3.Error as e:
+        logging.error(f"Failed to prune events: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def get_asset_by_source_path(source_path: str):
+    """Retrieves the most recent asset whose output file has the given source path."""
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    try:
+        return conn.execute(
+            "SELECT * FROM assets WHERE source_path = ? ORDER BY id DESC LIMIT 1", (source_path,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        logging.error(f"Failed to retrieve asset for source path {source_path}: {e}")
+        return None
+    finally:
+        conn.close()
+
 def update_asset_source_path(asset_id: int, source_path: str) -> bool:
     """Updates the source_path of an asset in the database."""
     conn = get_db_connection()
@@ -153,11 +477,54 @@ def log_chat_message(user_message: str, agent_response: str, agent_name: str = N
                 (datetime.now().isoformat(), user_message, agent_response, agent_name)
             )
         logging.info(f"Successfully logged chat message for agent: {agent_name}")
+        project_history.record_conversation(user_message, agent_response)
     except sqlite3.Error as e:
         logging.error(f"Failed to log chat message: {e}")
     finally:
         conn.close()
 
+def log_asset_creations(assets: list) -> list:
+    """
+    Logs many new assets in one transaction.
+
+    Args:
+        assets: Dicts with task_name, asset_type, final_prompt and source_path keys,
+            plus optional status, workflow and priority.
+
+    Returns:
+        The new asset IDs in input order, or an empty list if the insert failed.
+    """
+    if not assets:
+        return []
+    conn = get_db_connection()
+    if conn is None:
+        logging.error("Could not get database connection for logging asset creations.")
+        return []
+
+    try:
+        timestamp = datetime.now().isoformat()
+        new_ids = []
+        with conn:
+            for asset in assets:
+                cursor = conn.execute(
+                    "INSERT INTO assets (task_name, asset_type, timestamp, final_prompt, source_path, status, workflow, priority) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        asset['task_name'], asset['asset_type'], timestamp, asset['final_prompt'],
+                        asset['source_path'], asset.get('status', 'generated'),
+                        asset.get('workflow'), asset.get('priority', 0)
+                    )
+                )
+                new_ids.append(cursor.lastrowid)
+        logging.info(f"Logged creation of {len(new_ids)} assets")
+        for asset, new_id in zip(assets, new_ids):
+            project_history.record_asset(new_id, asset['task_name'], asset['asset_type'], asset.get('status', 'generated'), timestamp)
+        return new_ids
+    except sqlite3.Error as e:
+        logging.error(f"Failed to log asset creations: {e}")
+        return []
+    finally:
+        conn.close()
+
 def log_asset_creation(task_name: str, asset_type: str, final_prompt: str, source_path: str) -> int:
     """Logs the creation of a new asset and returns the new asset's ID."""
     conn = get_db_connection()
@@ -166,16 +533,385 @@ def log_asset_creation(task_name: str, asset_type: str, final_prompt: str, sourc
         return -1
 
     try:
+        timestamp = datetime.now().isoformat()
         with conn:
             cursor = conn.execute(
                 "INSERT INTO assets (task_name, asset_type, timestamp, final_prompt, source_path, status) VALUES (?, ?, ?, ?, ?, ?)",
-                (task_name, asset_type, datetime.now().isoformat(), final_prompt, source_path, 'generated')
+                (task_name, asset_type, timestamp, final_prompt, source_path, 'generated')
             )
             new_id = cursor.lastrowid
-            logging.info(f"Logged creation of asset '{task_name}' with ID {new_id}")
-            return new_id
+        logging.info(f"Logged creation of asset '{task_name}' with ID {new_id}")
+        project_history.record_asset(new_id, task_name, asset_type, 'generated', timestamp)
+        return new_id
     except sqlite3.Error as e:
         logging.error(f"Failed to log asset creation for '{task_name}': {e}")
         return -1
     finally:
         conn.close()
+
+def enqueue_generation_job(
+    task_name: str,
+    asset_type: str,
+    final_prompt: str,
+    workflow: str,
+    priority: int = 0,
+    trace_id: str = None
+) -> int:
+    """Adds a generation job to the queue as a 'queued' asset and returns its ID."""
+    conn = get_db_connection()
+    if conn is None:
+        logging.error("Could not get database connection for enqueuing generation job.")
+        return -1
+
+    try:
+        timestamp = datetime.now().isoformat()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO assets (task_name, asset_type, timestamp, final_prompt, source_path, status, workflow, priority, trace_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_name, asset_type, timestamp, final_prompt, 'placeholder', 'queued', workflow, priority, trace_id)
+            )
+            new_id = cursor.lastrowid
+        logging.info(f"Queued generation job '{task_name}' with ID {new_id} (priority {priority})")
+        project_history.record_asset(new_id, task_name, asset_type, 'queued', timestamp)
+        return new_id
+    except sqlite3.Error as e:
+        logging.error(f"Failed to enqueue generation job for '{task_name}': {e}")
+        return -1
+    finally:
+        conn.close()
+
+def enqueue_generation_batch(name: str, asset_type: str, workflow: str, items: list, priority: int = 0):
+    """
+    Records a batch and all of its generation jobs in one transaction.
+
+    Args:
+        items: (subject_prompt, seed) pairs, one per job.
+
+    Returns:
+        (batch_id, [asset_id, ...]) in item order, or (-1, []) if nothing was recorded.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        logging.error("Could not get database connection for enqueuing generation batch.")
+        return -1, []
+
+    try:
+        timestamp = datetime.now().isoformat()
+        asset_ids = []
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO generation_batches (name, workflow, asset_type, timestamp, total) VALUES (?, ?, ?, ?, ?)",
+                (name, workflow, asset_type, timestamp, len(items))
+            )
+            batch_id = cursor.lastrowid
+            for index, (subject_prompt, seed) in enumerate(items, start=1):
+                cursor = conn.execute(
+                    "INSERT INTO assets (task_name, asset_type, timestamp, final_prompt, source_path, status, workflow, priority, parent_id, seed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (f"{name} #{index}", asset_type, timestamp, subject_prompt, 'placeholder', 'queued', workflow, priority, batch_id, seed)
+                )
+                asset_ids.append(cursor.lastrowid)
+        logging.info(f"Queued generation batch '{name}' with ID {batch_id} ({len(asset_ids)} jobs)")
+        for index, asset_id in enumerate(asset_ids, start=1):
+            project_history.record_asset(asset_id, f"{name} #{index}", asset_type, 'queued', timestamp)
+        return batch_id, asset_ids
+    except sqlite3.Error as e:
+        logging.error(f"Failed to enqueue generation batch '{name}': {e}")
+        return -1, []
+    finally:
+        conn.close()
+
+def get_generation_batch(batch_id: int, include_items: bool = True):
+    """Returns a batch with per-status counts (and its items), or None if it does not exist."""
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    try:
+        batch = conn.execute("SELECT * FROM generation_batches WHERE id = ?", (batch_id,)).fetchone()
+        if batch is None:
+            return None
+        rows = conn.execute(
+            "SELECT status, COUNT(*) AS count FROM assets WHERE parent_id = ? GROUP BY status",
+            (batch_id,)
+        ).fetchall()
+        result = {**dict(batch), "counts": {row['status']: row['count'] for row in rows}}
+        if include_items:
+            items = conn.execute(
+                "SELECT id, task_name, final_prompt, seed, status, source_path, last_error FROM assets WHERE parent_id = ? ORDER BY id",
+                (batch_id,)
+            ).fetchall()
+            result["items"] = [dict(item) for item in items]
+        return result
+    except sqlite3.Error as e:
+        logging.error(f"Failed to retrieve generation batch {batch_id}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def claim_next_generation_job(backend: str):
+    """
+    Atomically moves the highest-priority ready job from 'queued' to 'generating'
+    for the given backend and returns its row, or None if nothing is ready.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    now = datetime.now().isoformat()
+    try:
+        with conn:
+            job = conn.execute(
+                """
+                SELECT * FROM assets
+                WHERE status = 'queued' AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                ORDER BY priority DESC, id ASC
+                LIMIT 1
+                """,
+                (now,)
+            ).fetchone()
+            if job is None:
+                return None
+            cursor = conn.execute(
+                "UPDATE assets SET status = 'generating', attempts = attempts + 1, backend = ?, started_at = ?, worker_pid = ? WHERE id = ? AND status = 'queued'",
+                (backend, now, os.getpid(), job['id'])
+            )
+            if cursor.rowcount == 0:
+                # Claimed by another worker between the SELECT and the UPDATE
+                return None
+            claimed = conn.execute("SELECT * FROM assets WHERE id = ?", (job['id'],)).fetchone()
+        project_history.record_asset_status(claimed['id'], 'generating')
+        return claimed
+    except sqlite3.Error as e:
+        logging.error(f"Failed to claim next generation job: {e}")
+        return None
+    finally:
+        conn.close()
+
+def finish_generation_job(asset_id: int, status: str, last_error: str = None) -> bool:
+    """Records the final status of a generation job ('generated', 'failed' or 'cancelled')."""
+    conn = get_db_connection()
+    if conn is None:
+        logging.error("Could not get database connection for finishing generation job.")
+        return False
+
+    try:
+        with conn:
+            cursor = conn.execute(
+                "UPDATE assets SET status = ?, last_error = ?, completed_at = ?, next_attempt_at = NULL WHERE id = ?",
+                (status, last_error, datetime.now().isoformat(), asset_id)
+            )
+        project_history.record_asset_status(asset_id, status)
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logging.error(f"Failed to finish generation job {asset_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def requeue_generation_job(asset_id: int, next_attempt_at: str, last_error: str) -> bool:
+    """Puts a failed job back in the queue to be retried no earlier than next_attempt_at."""
+    conn = get_db_connection()
+    if conn is None:
+        logging.error("Could not get database connection for requeuing generation job.")
+        return False
+
+    try:
+        with conn:
+            cursor = conn.execute(
+                "UPDATE assets SET status = 'queued', next_attempt_at = ?, queued_at = ?, last_error = ?, backend = NULL WHERE id = ? AND status = 'generating'",
+                (next_attempt_at, next_attempt_at, last_error, asset_id)
+            )
+        project_history.record_asset_status(asset_id, 'queued')
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logging.error(f"Failed to requeue generation job {asset_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def cancel_queued_generation_job(asset_id: int) -> bool:
+    """Cancels a job that is still waiting in the queue. Returns False if it was not queued."""
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        with conn:
+            cursor = conn.execute(
+                "UPDATE assets SET status = 'cancelled', completed_at = ? WHERE id = ? AND status = 'queued'",
+                (datetime.now().isoformat(), asset_id)
+            )
+        if cursor.rowcount > 0:
+            project_history.record_asset_status(asset_id, 'cancelled')
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logging.error(f"Failed to cancel generation job {asset_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def request_generation_job_cancel(asset_id: int) -> bool:
+    """
+    Flags a running job for cancellation by whichever worker claimed it.
+    Returns False if the job is not running.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        with conn:
+            cursor = conn.execute(
+                "UPDATE assets SET cancel_requested = 1 WHERE id = ? AND status = 'generating'", (asset_id,)
+            )
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logging.error(f"Failed to request cancellation of generation job {asset_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_cancel_requested_jobs(asset_ids: list[int]) -> list[int]:
+    """Returns which of the given jobs have been flagged for cancellation."""
+    conn = get_db_connection()
+    if conn is None or not asset_ids:
+        return []
+
+    try:
+        placeholders = ",".join("?" * len(asset_ids))
+        rows = conn.execute(
+            f"SELECT id FROM assets WHERE cancel_requested = 1 AND id IN ({placeholders})", list(asset_ids)
+        ).fetchall()
+        return [row['id'] for row in rows]
+    except sqlite3.Error as e:
+        logging.error(f"Failed to read generation job cancellations: {e}")
+        return []
+    finally:
+        conn.close()
+
+def _worker_alive(pid) -> bool:
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def reset_interrupted_generation_jobs() -> int:
+    """
+    Returns jobs left in 'generating' by a previous process to the queue.
+    Jobs claimed by another worker process that is still running are left alone.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+
+    try:
+        with conn:
+            rows = conn.execute(
+                "SELECT id, worker_pid FROM assets WHERE status = 'generating' AND workflow IS NOT NULL"
+            ).fetchall()
+            now = datetime.now().isoformat()
+            interrupted = [(now, row['id']) for row in rows if not _worker_alive(row['worker_pid'])]
+            conn.executemany(
+                "UPDATE assets SET status = 'queued', queued_at = ?, backend = NULL, worker_pid = NULL WHERE id = ? AND status = 'generating'",
+                interrupted
+            )
+            if interrupted:
+                logging.info(f"Requeued {len(interrupted)} generation jobs interrupted by a restart")
+            return len(interrupted)
+    except sqlite3.Error as e:
+        logging.error(f"Failed to reset interrupted generation jobs: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def get_generation_queue_counts() -> dict:
+    """Returns the number of generation jobs per queue status ('queued', 'generating')."""
+    conn = get_db_connection()
+    if conn is None:
+        return {}
+
+    try:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) AS count FROM assets WHERE status IN ('queued', 'generating') GROUP BY status"
+        ).fetchall()
+        return {row['status']: row['count'] for row in rows}
+    except sqlite3.Error as e:
+        logging.error(f"Failed to count generation jobs: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def load_project_history(conversation_limit: int, asset_limit: int) -> bool:
+    """Seeds the in-memory project history from the most recent database rows."""
+    conn = get_db_connection()
+    if conn is None:
+        return False
+
+    try:
+        conv_rows = conn.execute(
+            "SELECT user_message, agent_response FROM conversations ORDER BY timestamp DESC LIMIT ?",
+            (conversation_limit,)
+        ).fetchall()
+        asset_rows = conn.execute(
+            "SELECT id, task_name, asset_type, status, timestamp FROM assets ORDER BY timestamp DESC LIMIT ?",
+            (asset_limit,)
+        ).fetchall()
+        project_history.load(conv_rows, asset_rows)
+        return True
+    except sqlite3.Error as e:
+        logging.error(f"Failed to load project history: {e}")
+        return False
+    finally:
+        conn.close()
+
+def record_trace_spans(trace_id: str, asset_id, spans: list) -> int:
+    """Stores finished trace spans and returns how many were written."""
+    if not spans:
+        return 0
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO trace_spans (trace_id, asset_id, span_id, parent_id, name, start, duration, attributes, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        trace_id, asset_id, span['span_id'], span['parent_id'], span['name'], span['start'],
+                        span['duration'], json.dumps(span['attributes']), span['error']
+                    )
+                    for span in spans
+                ]
+            )
+        return len(spans)
+    except sqlite3.Error as e:
+        logging.error(f"Failed to record trace spans for trace {trace_id}: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def get_trace_spans(trace_id: str, asset_id: int = None) -> list:
+    """Returns a trace's spans in start order, limited to one asset's spans and its untied (e.g. chat) spans if given."""
+    conn = get_db_connection()
+    if conn is None:
+        return []
+
+    try:
+        query = "SELECT * FROM trace_spans WHERE trace_id = ?"
+        params = [trace_id]
+        if asset_id is not None:
+            query += " AND (asset_id IS NULL OR asset_id = ?)"
+            params.append(asset_id)
+        rows = conn.execute(query + " ORDER BY start, id", params).fetchall()
+        return [{**dict(row), "attributes": json.loads(row['attributes'] or "{}")} for row in rows]
+    except sqlite3.Error as e:
+        logging.error(f"Failed to read trace spans for trace {trace_id}: {e}")
+        return []
+    finally:
+        conn.close()
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from scripts.async_database import async_db
+from scripts.database import publish_event, get_events_since, get_last_event_id, prune_events
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+class InProcessEventBus:
+    """Delivers published events straight to this process's subscribers."""
+
+    def __init__(self):
+        self._handlers: list[EventHandler] = []
+
+    def subscribe(self, handler: EventHandler):
+        self._handlers.append(handler)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, message: dict):
+        await self._dispatch(message)
+
+    async def _dispatch(self, message: dict):
+        for handler in self._handlers:
+            try:
+                await handler(message)
+            except Exception as e:
+                logging.error(f"Event handler failed: {e}")
+
+class SQLiteEventBus(InProcessEventBus):
+    """
+    Shares events between processes (e.g. uvicorn workers) through the
+    `events` table of the hub database.
+
+    Events are delivered to local subscribers immediately and appended to
+    the table; every process polls for rows published by the others. Rows
+    older than `retention` seconds are pruned.
+    """
+
+    def __init__(self, poll_interval: float = 0.1, retention: float = 300.0):
+        super().__init__()
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.last_id = 0
+        self._poller: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._poller is None or self._poller.done():
+            self.last_id = await async_db.read(get_last_event_id)
+            self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poller:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+
+    async def publish(self, message: dict):
+        await self._dispatch(message)
+        try:
+            await async_db.write(publish_event, self.origin, json.dumps(message))
+        except Exception as e:
+            logging.error(f"Failed to publish event to other workers: {e}")
+
+    async def poll(self) -> int:
+        """Delivers events published by other processes since the last poll."""
+        rows = await async_db.read(get_events_since, self.last_id, self.origin)
+        for row in rows:
+            self.last_id = row["id"]
+            try:
+                message = json.loads(row["payload"])
+            except json.JSONDecodeError:
+                continue
+            await self._dispatch(message)
+        return len(rows)
+
+    async def _poll_loop(self):
+        last_pruned = time.monotonic()
+        while True:
+            try:
+                await self.poll()
+                if time.monotonic() - last_pruned > self.retention:
+                    last_pruned = time.monotonic()
+                    await async_db.write(prune_events, time.time() - self.retention)
+            except Exception as e:
+                logging.error(f"Event bus poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+def create_event_bus(backend: str, poll_interval: float = 0.1, retention: float = 300.0) -> InProcessEventBus:
+    """Returns the event bus for a backend name: 'memory' or 'sqlite'."""
+    if backend == "memory":
+        return InProcessEventBus()
+    if backend == "sqlite":
+        return SQLiteEventBus(poll_interval=poll_interval, retention=retention)
+    raise ValueError(f"Unknown event bus backend '{backend}'. Use 'memory' or 'sqlite'.")
@@ -0,0 +1,361 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from aiohttp import web, WSMsgType
+from PIL import Image
+
+from scripts.model_catalog import CATALOG_SOURCES, VALIDATED_NODES
+from scripts.workflow_registry import WorkflowError, load_template
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Keeps the fakes' memory flat during long runs
+MAX_STORED_OUTPUTS = 1000
+# Ollama unloads an idle model after five minutes unless told otherwise
+DEFAULT_KEEP_ALIVE = 300.0
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def workflow_models(workflows_dir: str) -> dict[str, set]:
+    """Collects the checkpoint, LoRA and VAE names the workflow templates reference, so a fake ComfyUI can list them."""
+    models = {key: set() for key in CATALOG_SOURCES}
+    for filename in sorted(os.listdir(workflows_dir)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            workflow = load_template(os.path.join(workflows_dir, filename)).workflow
+        except WorkflowError as e:
+            logging.warning(f"Skipping workflow {filename}: {e}")
+            continue
+        for node in workflow.values():
+            target = VALIDATED_NODES.get(node.get("class_type")) if isinstance(node, dict) else None
+            if target and node.get("inputs", {}).get(target[1]):
+                models[target[0]].add(node["inputs"][target[1]])
+    return models
+
+def art_reply(task: str) -> str:
+    """The default fake Art Director reply: a sentence followed by the generation JSON the hub looks for."""
+    request = {"workflow": "workflow_pixel_art.json", "asset_type": "sprite", "prompt": task.replace("{", "").replace("}", "")}
+    return f"Queueing that sprite now. {json.dumps(request)}"
+
+def parse_keep_alive(value) -> float:
+    """Seconds an Ollama keep_alive (a number of seconds or a duration such as "30m") keeps a model loaded; negative means forever."""
+    if value is None or value == "":
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, str):
+        for unit in sorted(DURATION_UNITS, key=len, reverse=True):
+            if value.endswith(unit):
+                seconds = float(value[:-len(unit)]) * DURATION_UNITS[unit]
+                break
+        else:
+            seconds = float(value)
+    else:
+        seconds = float(value)
+    return float("inf") if seconds < 0 else seconds
+
+class FakeServer:
+    """Runs an aiohttp application on a local port for the lifetime of a benchmark or replay."""
+
+    def __init__(self):
+        self.app = web.Application()
+        self.url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.url = f"http://{host}:{site._server.sockets[0].getsockname()[1]}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+class FakeOllama(FakeServer):
+    """
+    Answers /api/generate like Ollama, in both streaming (NDJSON) and
+    single-response mode. Each call waits `latency` seconds (scaled by up to
+    +/- `jitter`) before the first token, then `token_delay` per token, and
+    fails with a 500 at `failure_rate`. A request that finds the model
+    unloaded first waits `load_latency`; the model then stays loaded for
+    the request's keep_alive, and an empty prompt only loads it.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        token_delay: float = 0.002,
+        tokens: int = 20,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        reply=art_reply,
+        model: str = "qwen3:1.7b",
+        load_latency: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        super().__init__()
+        self.latency = latency
+        self.load_latency = load_latency
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.reply = reply
+        self.model = model
+        self.requests = 0
+        self.failures = 0
+        self.loads = 0
+        self.loaded_until = 0.0
+        self._loading: Optional[asyncio.Task] = None
+        self._random = random.Random(seed)
+        self.app.router.add_post("/api/generate", self.generate)
+        self.app.router.add_get("/api/tags", self.tags)
+
+    @property
+    def generate_url(self) -> str:
+        return f"{self.url}/api/generate"
+
+    def _delay(self) -> float:
+        return max(self.latency * (1 + self._random.uniform(-self.jitter, self.jitter)), 0.0)
+
+    def _chunks(self, text: str) -> list[str]:
+        size = max(len(text) // max(self.tokens, 1), 1)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    async def _ensure_loaded(self, keep_alive: float):
+        # Concurrent requests for an unloaded model share one load, as in Ollama
+        if time.monotonic() >= self.loaded_until:
+            if self._loading is None or self._loading.done():
+                self.loads += 1
+                self._loading = asyncio.create_task(asyncio.sleep(self.load_latency))
+            await asyncio.shield(self._loading)
+        self.loaded_until = time.monotonic() + keep_alive
+
+    async def generate(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        self.requests += 1
+        await self._ensure_loaded(parse_keep_alive(payload.get("keep_alive")))
+        if not payload.get("prompt"):
+            return web.json_response({"model": self.model, "response": "", "done": True, "done_reason": "load"})
+        await asyncio.sleep(self._delay())
+        if self._random.random() < self.failure_rate:
+            self.failures += 1
+            return web.json_response({"error": "fake Ollama failure"}, status=500)
+
+        task = payload.get("prompt", "").rsplit("USER TASK:", 1)[-1].strip()
+        chunks = self._chunks(self.reply(task))
+        if not payload.get("stream", True):
+            await asyncio.sleep(self.token_delay * len(chunks))
+            return web.json_response({"model": self.model, "response": "".join(chunks), "done": True})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for chunk in chunks:
+            await response.write((json.dumps({"model": self.model, "response": chunk, "done": False}) + "\n").encode())
+            await asyncio.sleep(self.token_delay)
+        await response.write((json.dumps({"model": self.model, "response": "", "done": True}) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    async def tags(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [{"name": self.model}]})
+
+class FakeComfyUI(FakeServer):
+    """
+    A ComfyUI stand-in with a real queue: /prompt enqueues, `workers`
+    prompts execute at a time for `latency` seconds each in `steps`
+    progress steps, and /ws sends the submitting client the same
+    execution_start/progress/executed/executing messages ComfyUI does.
+    Prompts fail with an execution_error at `failure_rate`. /history,
+    /queue, /object_info and /view serve the rest of what the hub reads.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        steps: int = 4,
+        workers: int = 1,
+        submit_latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        models: Optional[dict[str, set]] = None,
+        image_size: tuple[int, int] = (128, 128),
+        seed: Optional[int] = None
+    ):
+        super().__init__()
+        self.latency = latency
+        self.steps = max(steps, 1)
+        self.workers = max(workers, 1)
+        self.submit_latency = submit_latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.models = models or {key: set() for key in CATALOG_SOURCES}
+        self.submitted = 0
+        self.completed = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._pending: OrderedDict[str, dict] = OrderedDict()
+        self._running: dict[str, dict] = {}
+        self._history: OrderedDict[str, dict] = OrderedDict()
+        self._outputs: OrderedDict[str, bytes] = OrderedDict()
+        self._sockets: dict[str, web.WebSocketResponse] = {}
+        self._ready = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._image = self._make_image(image_size)
+        self.app.router.add_post("/prompt", self.prompt)
+        self.app.router.add_get("/queue", self.queue)
+        self.app.router.add_post("/queue", self.delete_from_queue)
+        self.app.router.add_get("/history/{prompt_id}", self.history)
+        self.app.router.add_get("/object_info", self.object_info)
+        self.app.router.add_get("/view", self.view)
+        self.app.router.add_get("/ws", self.websocket)
+
+    @staticmethod
+    def _make_image(size: tuple[int, int]) -> bytes:
+        # A gradient gives the Game Boy post-processing real work to do
+        width, height = size
+        image = Image.new("RGB", size)
+        image.putdata([((x * 255) // width, (y * 255) // height, ((x + y) * 127) // (width + height)) for y in range(height) for x in range(width)])
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        url = await super().start(host, port)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        return url
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for ws in list(self._sockets.values()):
+            await ws.close()
+        await super().stop()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending) + len(self._running)
+
+    async def prompt(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if not isinstance(payload.get("prompt"), dict):
+            return web.json_response({"error": "no prompt"}, status=400)
+        await asyncio.sleep(self.submit_latency)
+        prompt_id = uuid.uuid4().hex
+        self.submitted += 1
+        self._pending[prompt_id] = {"prompt": payload["prompt"], "client_id": payload.get("client_id"), "number": self.submitted}
+        self._ready.set()
+        return web.json_response({"prompt_id": prompt_id, "number": self.submitted, "node_errors": {}})
+
+    async def queue(self, request: web.Request) -> web.Response:
+        def rows(entries):
+            return [[job["number"], prompt_id, job["prompt"], {"client_id": job["client_id"]}] for prompt_id, job in entries.items()]
+        return web.json_response({"queue_running": rows(self._running), "queue_pending": rows(self._pending)})
+
+    async def delete_from_queue(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        for prompt_id in payload.get("delete", []):
+            self._pending.pop(prompt_id, None)
+        return web.json_response({})
+
+    async def history(self, request: web.Request) -> web.Response:
+        prompt_id = request.match_info["prompt_id"]
+        entry = self._history.get(prompt_id)
+        return web.json_response({prompt_id: entry} if entry else {})
+
+    async def object_info(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            node_class: {"input": {"required": {input_name: [sorted(self.models.get(key, set()))]}}}
+            for key, (node_class, input_name) in CATALOG_SOURCES.items()
+        })
+
+    async def view(self, request: web.Request) -> web.Response:
+        data = self._outputs.get(request.query.get("filename", ""))
+        if data is None:
+            return web.Response(status=404)
+        return web.Response(body=data, content_type="image/png")
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        client_id = request.query.get("clientId") or uuid.uuid4().hex
+        self._sockets[client_id] = ws
+        await ws.send_json({"type": "status", "data": {"status": {"exec_info": {"queue_remaining": self.queue_depth}}}})
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            if self._sockets.get(client_id) is ws:
+                del self._sockets[client_id]
+        return ws
+
+    async def _send(self, client_id: Optional[str], message_type: str, data: dict):
+        ws = self._sockets.get(client_id)
+        if ws is None or ws.closed:
+            return
+        try:
+            await ws.send_json({"type": message_type, "data": data})
+        except ConnectionError:
+            pass
+
+    async def _work(self):
+        while True:
+            if not self._pending:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            prompt_id, job = self._pending.popitem(last=False)
+            self._running[prompt_id] = job
+            try:
+                await self._execute(prompt_id, job)
+            finally:
+                self._running.pop(prompt_id, None)
+
+    async def _execute(self, prompt_id: str, job: dict):
+        client_id = job["client_id"]
+        await self._send(client_id, "execution_start", {"prompt_id": prompt_id})
+        duration = max(self.latency * (1 + self._random.uniform(-self.jitter, self.jitter)), 0.0)
+        sampler = next((node_id for node_id, node in job["prompt"].items() if node.get("class_type") == "KSampler"), None)
+        for step in range(1, self.steps + 1):
+            await asyncio.sleep(duration / self.steps)
+            await self._send(client_id, "progress", {"value": step, "max": self.steps, "prompt_id": prompt_id, "node": sampler})
+
+        if self._random.random() < self.failure_rate:
+            self.failures += 1
+            self._remember(self._history, prompt_id, {"outputs": {}, "status": {"status_str": "error", "completed": False}})
+            await self._send(client_id, "execution_error", {"prompt_id": prompt_id, "exception_message": "fake ComfyUI failure"})
+            return
+
+        save_node, prefix, image_type = "9", "fake", "output"
+        for node_id, node in job["prompt"].items():
+            if node.get("class_type") == "SaveImage":
+                save_node, prefix = node_id, node.get("inputs", {}).get("filename_prefix", prefix)
+            elif node.get("class_type") == "PreviewImage":
+                save_node, prefix, image_type = node_id, "ComfyUI_temp", "temp"
+        # Unique across fake hosts, which would otherwise all count from 00001
+        filename = f"{os.path.basename(prefix)}_{prompt_id[:8]}_{job['number']:05d}_.png"
+        self._remember(self._outputs, filename, self._image)
+        outputs = {save_node: {"images": [{"filename": filename, "subfolder": "", "type": image_type}]}}
+        self._remember(self._history, prompt_id, {"outputs": outputs, "status": {"status_str": "success", "completed": True}})
+        self.completed += 1
+        await self._send(client_id, "executed", {"node": save_node, "output": outputs[save_node], "prompt_id": prompt_id})
+        await self._send(client_id, "executing", {"node": None, "prompt_id": prompt_id})
+
+    @staticmethod
+    def _remember(entries: OrderedDict, key: str, value):
+        entries[key] = value
+        while len(entries) > MAX_STORED_OUTPUTS:
+            entries.popitem(last=False)
@@ -0,0 +1,185 @@
+import logging
+import os
+import time
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# GB Studio's default DMG palette, lightest (index 0) to darkest (index 3)
+DMG_PALETTE = [(224, 248, 207), (134, 192, 108), (48, 104, 80), (7, 24, 33)]
+
+# Output size and tile grid per asset type. Sprites are sheets of 16x16
+# actor frames laid out left to right, backgrounds fill the 160x144 screen,
+# UI elements are 32x32.
+GB_PROFILES = {
+    "sprite": {"size": (16, 16), "tile": 16, "sheet": True},
+    "background": {"size": (160, 144), "tile": 8},
+    "ui": {"size": (32, 32), "tile": 8},
+}
+DEFAULT_PROFILE = "background"
+RESAMPLE_MODES = ("nearest", "mean", "majority")
+
+# 4x4 ordered dither thresholds, centred on zero
+BAYER_4X4 = (np.array([
+    [0, 8, 2, 10],
+    [12, 4, 14, 6],
+    [3, 11, 1, 9],
+    [15, 7, 13, 5],
+], dtype=np.float32) + 0.5) / 16.0 - 0.5
+
+def to_luminance(img: Image.Image) -> np.ndarray:
+    """Returns Rec. 601 luminance in [0, 1] as a float32 array."""
+    rgb = np.asarray(img.convert("RGB"), dtype=np.float32)
+    return (rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)) / 255.0
+
+def auto_levels(lum: np.ndarray, low: float = 1.0, high: float = 99.0) -> np.ndarray:
+    """Stretches luminance so the 1st..99th percentiles span the full range."""
+    lo, hi = np.percentile(lum, [low, high])
+    if hi - lo < 1e-6:
+        return np.clip(lum, 0.0, 1.0)
+    return np.clip((lum - lo) / (hi - lo), 0.0, 1.0)
+
+def crop_to_aspect(arr: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    """Centre-crops a 2D array to the aspect ratio of a (width, height) size."""
+    height, width = arr.shape[:2]
+    target_ratio = size[0] / size[1]
+    if width / height > target_ratio:
+        new_width = max(1, round(height * target_ratio))
+        left = (width - new_width) // 2
+        return arr[:, left:left + new_width]
+    new_height = max(1, round(width / target_ratio))
+    top = (height - new_height) // 2
+    return arr[top:top + new_height, :]
+
+def _blocks(arr: np.ndarray, size: tuple[int, int]) -> Optional[np.ndarray]:
+    """Returns a (rows, block_h, cols, block_w) view of arr, or None when upscaling."""
+    cols, rows = size
+    block_h, block_w = arr.shape[0] // rows, arr.shape[1] // cols
+    if block_h == 0 or block_w == 0:
+        return None
+    top = (arr.shape[0] - rows * block_h) // 2
+    left = (arr.shape[1] - cols * block_w) // 2
+    cropped = arr[top:top + rows * block_h, left:left + cols * block_w]
+    return cropped.reshape(rows, block_h, cols, block_w)
+
+def downscale_nearest(arr: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    """Samples the centre pixel of each output cell (also works for upscaling)."""
+    cols, rows = size
+    y = ((np.arange(rows) + 0.5) * arr.shape[0] / rows).astype(np.intp)
+    x = ((np.arange(cols) + 0.5) * arr.shape[1] / cols).astype(np.intp)
+    return arr[y[:, None], x[None, :]]
+
+def downscale_mean(lum: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    blocks = _blocks(lum, size)
+    if blocks is None:
+        return downscale_nearest(lum, size)
+    return blocks.mean(axis=(1, 3))
+
+def downscale_majority(indices: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    """Gives each output cell the palette index most common in its block, darker on ties."""
+    blocks = _blocks(indices, size)
+    if blocks is None:
+        return downscale_nearest(indices, size)
+    counts = np.stack([(blocks == k).sum(axis=(1, 3)) for k in range(len(DMG_PALETTE))], axis=-1)
+    # argmax returns the first maximum; reverse so ties favour darker outlines
+    return (len(DMG_PALETTE) - 1 - np.argmax(counts[..., ::-1], axis=-1)).astype(np.uint8)
+
+def quantize(lum: np.ndarray, dither: bool = False) -> np.ndarray:
+    """Maps luminance in [0, 1] to DMG palette indices (0 = lightest)."""
+    levels = len(DMG_PALETTE) - 1
+    value = lum * levels
+    if dither:
+        rows, cols = lum.shape
+        threshold = np.tile(BAYER_4X4, (rows // 4 + 1, cols // 4 + 1))[:rows, :cols]
+        value = value + threshold
+    shade = np.clip(np.rint(value), 0, levels).astype(np.uint8)
+    return (levels - shade).astype(np.uint8)
+
+def snap_to_tiles(indices: np.ndarray, tile: int) -> np.ndarray:
+    """Pads an index array with the lightest colour up to whole tiles."""
+    rows, cols = indices.shape
+    pad_rows, pad_cols = -rows % tile, -cols % tile
+    if not pad_rows and not pad_cols:
+        return indices
+    return np.pad(indices, ((0, pad_rows), (0, pad_cols)), constant_values=0)
+
+def write_indexed_png(indices: np.ndarray, path: str):
+    """Writes palette indices as a compact 2-bit indexed PNG with the DMG palette."""
+    img = Image.fromarray(indices.astype(np.uint8), mode="P")
+    img.putpalette([channel for color in DMG_PALETTE for channel in color])
+    img.save(path, optimize=True, bits=2)
+
+def profile_for(asset_type: str) -> dict:
+    return GB_PROFILES.get((asset_type or "").lower(), GB_PROFILES[DEFAULT_PROFILE])
+
+def output_size(profile: dict, source_size: tuple[int, int], frames: Optional[int] = None) -> tuple[int, int]:
+    """
+    Returns the output (width, height) for a profile. Sheet profiles keep
+    one frame per frame-sized step of the source's width, so a 4:1 render
+    of 16x16 frames becomes a 64x16 sheet, unless `frames` is given.
+    """
+    frame_width, frame_height = profile["size"]
+    if not profile.get("sheet"):
+        return frame_width, frame_height
+    if frames is None:
+        width, height = source_size
+        frames = round(width / height * frame_height / frame_width)
+    return frame_width * max(1, frames), frame_height
+
+def convert_to_game_boy(
+    source_path: str,
+    destination_path: str,
+    asset_type: str,
+    resample: str = "majority",
+    dither: bool = False,
+    size: Optional[tuple[int, int]] = None,
+    frames: Optional[int] = None
+) -> dict:
+    """
+    Converts a generated image into a GB Studio-ready asset: crops it to the
+    target aspect ratio, downscales it, quantizes it to the 4-colour DMG
+    palette, pads it to the tile grid and writes an indexed PNG.
+
+    Args:
+        resample: 'nearest', 'mean' or 'majority'. Majority voting quantizes
+            at full resolution first, so it ignores `dither`.
+        size: Output (width, height); defaults to the asset type's profile.
+        frames: Frames in a sprite sheet; defaults to the source's aspect ratio.
+
+    Returns:
+        Details of the written image, including input and output byte sizes.
+    """
+    if resample not in RESAMPLE_MODES:
+        raise ValueError(f"Unknown resample mode '{resample}'. Use one of {', '.join(RESAMPLE_MODES)}.")
+    started = time.perf_counter()
+    profile = profile_for(asset_type)
+
+    with Image.open(source_path) as img:
+        size = tuple(size or output_size(profile, img.size, frames))
+        lum = auto_levels(to_luminance(img))
+    lum = crop_to_aspect(lum, size)
+    if resample == "majority":
+        indices = downscale_majority(quantize(lum), size)
+    elif resample == "mean":
+        indices = quantize(downscale_mean(lum, size), dither)
+    else:
+        indices = quantize(downscale_nearest(lum, size), dither)
+    indices = snap_to_tiles(indices, profile["tile"])
+
+    os.makedirs(os.path.dirname(os.path.abspath(destination_path)), exist_ok=True)
+    write_indexed_png(indices, destination_path)
+    height, width = indices.shape
+    return {
+        "path": destination_path,
+        "width": width,
+        "height": height,
+        "tile": profile["tile"],
+        "tiles": (width // profile["tile"], height // profile["tile"]),
+        "colors_used": int(len(np.unique(indices))),
+        "bytes_in": os.path.getsize(source_path),
+        "bytes_out": os.path.getsize(destination_path),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
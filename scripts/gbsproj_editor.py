@@ -1,41 +1,69 @@
+import glob
 import json
 import os
 import uuid
 import shutil
 import tempfile
 from datetime import datetime
-from PIL import Image
+from typing import Optional
 import logging
 
+from scripts.asset_inspector import asset_inspector
+from scripts.metrics import GBSPROJ_ASSETS_ADDED, GBSPROJ_WRITE_SECONDS
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 def get_project_file_path(project_path: str) -> str:
-    """Finds the .gbsproj file in the given project directory."""
-    for root, _, files in os.walk(project_path):
-        for file in files:
-            if file.endswith('.gbsproj'):
-                return os.path.join(root, file)
-    raise FileNotFoundError("No .gbsproj file found in the specified project path.")
-
-def create_backup(file_path: str) -> str:
+    """Finds the .gbsproj file in the given project directory (cached after the first search)."""
+    return asset_inspector.project_file(project_path)
+
+ASSET_PATH_MAP = {
+    "sprite": "assets/sprites/",
+    "background": "assets/backgrounds/",
+    "ui": "assets/ui/",
+    "music": "assets/music/"
+}
+# Project file collection each supported asset type is added to
+ASSET_COLLECTIONS = {"sprite": "sprites", "background": "backgrounds"}
+DEFAULT_MAX_BACKUPS = 10
+
+def create_backup(file_path: str, max_backups: Optional[int] = DEFAULT_MAX_BACKUPS) -> str:
     """
-    Creates a timestamped backup of the given file.
+    Creates a timestamped backup of the given file and deletes the oldest
+    backups beyond `max_backups`.
     
     Args:
         file_path: Path to the file to backup
+        max_backups: Number of backups to keep, or None to keep them all
         
     Returns:
         Path to the backup file
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     backup_path = f"{file_path}.backup_{timestamp}"
     shutil.copy2(file_path, backup_path)
     logging.info(f"Created backup: {backup_path}")
+    if max_backups is not None:
+        prune_backups(file_path, max_backups)
     return backup_path
 
+def prune_backups(file_path: str, keep: int) -> list[str]:
+    """Deletes all but the newest `keep` backups of a file. Returns the deleted paths."""
+    # Timestamps sort chronologically, so name order is age order
+    backups = sorted(glob.glob(f"{glob.escape(file_path)}.backup_*"))
+    removed = backups[:max(len(backups) - keep, 0)]
+    for backup_path in removed:
+        try:
+            os.remove(backup_path)
+        except OSError as e:
+            logging.warning(f"Failed to remove old backup {backup_path}: {e}")
+    return removed
+
 def atomic_write_json(file_path: str, data: dict) -> bool:
     """
-    Atomically writes JSON data to a file using a temporary file.
+    Atomically and durably writes JSON data to a file: the data is written
+    to a temporary file in the same directory, flushed to disk and then
+    renamed over the target, so a crash leaves either the old or the new file.
     
     Args:
         file_path: Target file path
@@ -44,33 +72,148 @@ def atomic_write_json(file_path: str, data: dict) -> bool:
     Returns:
         True if successful, False otherwise
     """
+    temp_path = None
     try:
         # Write to temporary file first
-        temp_dir = os.path.dirname(file_path)
+        temp_dir = os.path.dirname(os.path.abspath(file_path))
         with tempfile.NamedTemporaryFile(mode='w', dir=temp_dir, delete=False, suffix='.tmp') as temp_f:
-            json.dump(data, temp_f, indent=4)
             temp_path = temp_f.name
+            json.dump(data, temp_f, indent=4)
+            temp_f.flush()
+            os.fsync(temp_f.fileno())
         
-        # Atomically replace original file
-        shutil.move(temp_path, file_path)
+        # Atomically replace original file, then persist the rename itself
+        os.replace(temp_path, file_path)
+        temp_path = None
+        fsync_directory(temp_dir)
         logging.info(f"Atomically wrote JSON to {file_path}")
         return True
         
     except Exception as e:
         logging.error(f"Failed to atomically write JSON: {e}")
         # Clean up temp file if it exists
-        if 'temp_path' in locals() and os.path.exists(temp_path):
+        if temp_path and os.path.exists(temp_path):
             os.unlink(temp_path)
         return False
 
+def fsync_directory(path: str):
+    """Flushes a directory entry change (e.g. a rename) to disk where the platform supports it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class ProjectSession:
+    """
+    Edits a .gbsproj in memory: the file is parsed once, any number of
+    assets are added (skipping ones the project already has) and the result
+    is written once, with a single rotating backup, on `commit()` or when
+    the `with` block exits without an error.
+
+        with ProjectSession(project_path) as session:
+            for asset in assets:
+                session.add_asset(asset['filename'], asset['type'], asset['name'])
+    """
+
+    def __init__(self, project_path: str, max_backups: Optional[int] = DEFAULT_MAX_BACKUPS):
+        self.project_path = project_path
+        self.max_backups = max_backups
+        self.gbsproj_path: Optional[str] = None
+        self.project_data: Optional[dict] = None
+        self.added: list[str] = []
+        self.duplicates: list[str] = []
+        self._added_types: list[str] = []
+        self._known: dict[str, set] = {}
+
+    def load(self) -> "ProjectSession":
+        self.gbsproj_path = get_project_file_path(self.project_path)
+        with open(self.gbsproj_path, 'r') as f:
+            self.project_data = json.load(f)
+        self._known = {
+            collection: {entry.get("filename") for entry in self.project_data.get(collection, [])}
+            for collection in ASSET_COLLECTIONS.values()
+        }
+        return self
+
+    def __enter__(self) -> "ProjectSession":
+        return self.load()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and not self.commit():
+            raise OSError(f"Failed to write project file {self.gbsproj_path}")
+        return False
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.added)
+
+    def add_asset(self, asset_filename: str, asset_type: str, task_name: str) -> bool:
+        """
+        Adds an asset already moved into the project's asset folders.
+
+        Returns:
+            False if the asset file is missing; True if it was added, was
+            already in the project, or is of a type the project file does not list.
+        """
+        if self.project_data is None:
+            self.load()
+        full_asset_path = os.path.join(self.project_path, ASSET_PATH_MAP.get(asset_type, ""), asset_filename)
+        if not os.path.exists(full_asset_path):
+            logging.error(f"Asset file not found at {full_asset_path}. Cannot add to project file.")
+            return False
+
+        collection = ASSET_COLLECTIONS.get(asset_type)
+        if collection is None:
+            logging.warning(f"Asset type '{asset_type}' not yet supported by gbsproj_editor. Skipping JSON modification.")
+            return True # Return True to not break the workflow for other asset types
+        if asset_filename in self._known[collection]:
+            logging.info(f"Asset '{asset_filename}' is already in the project; skipping.")
+            self.duplicates.append(asset_filename)
+            return True
+
+        if asset_type == 'sprite':
+            new_asset = create_sprite_asset(full_asset_path, asset_filename, task_name)
+        else:
+            new_asset = create_background_asset(full_asset_path, asset_filename, task_name)
+        self.project_data.setdefault(collection, []).append(new_asset)
+        self._known[collection].add(asset_filename)
+        self.added.append(asset_filename)
+        self._added_types.append(asset_type)
+        return True
+
+    def commit(self) -> bool:
+        """Backs up the project file and writes all pending additions in one atomic write."""
+        if not self.dirty:
+            return True
+        with GBSPROJ_WRITE_SECONDS.time() as labels:
+            create_backup(self.gbsproj_path, self.max_backups)
+            if not atomic_write_json(self.gbsproj_path, self.project_data):
+                labels["outcome"] = "error"
+                logging.error("Failed to write project file atomically")
+                return False
+        for asset_type in self._added_types:
+            GBSPROJ_ASSETS_ADDED.inc(asset_type=asset_type)
+        logging.info(f"Added {len(self.added)} asset(s) to {self.gbsproj_path} in one write")
+        self.added = []
+        self._added_types = []
+        return True
+
 def add_asset_to_project(
     project_path: str,
     asset_filename: str,
     asset_type: str,
-    task_name: str
+    task_name: str,
+    max_backups: Optional[int] = DEFAULT_MAX_BACKUPS
 ) -> bool:
     """
     Adds a new asset entry to the .gbsproj JSON file with backup and atomic write.
+    Use a ProjectSession to add several assets with a single write.
 
     Args:
         project_path: The root path of the GB Studio project.
@@ -81,68 +224,26 @@ def add_asset_to_project(
     Returns:
         True if the asset was added successfully, False otherwise.
     """
-    backup_path = None
     try:
-        gbsproj_path = get_project_file_path(project_path)
-        
-        # Create backup before modification
-        backup_path = create_backup(gbsproj_path)
-        
-        with open(gbsproj_path, 'r') as f:
-            project_data = json.load(f)
-
-        asset_path_map = {
-            "sprite": "assets/sprites/",
-            "background": "assets/backgrounds/",
-            "ui": "assets/ui/",
-            "music": "assets/music/"
-        }
-        
-        relative_asset_path = os.path.join(asset_path_map.get(asset_type, ""), asset_filename)
-        full_asset_path = os.path.join(project_path, relative_asset_path)
-
-        if not os.path.exists(full_asset_path):
-            logging.error(f"Asset file not found at {full_asset_path}. Cannot add to project file.")
+        session = ProjectSession(project_path, max_backups).load()
+        if not session.add_asset(asset_filename, asset_type, task_name):
             return False
-
-        if asset_type == 'sprite':
-            new_asset = create_sprite_asset(full_asset_path, asset_filename, task_name)
-            project_data['sprites'].append(new_asset)
-        elif asset_type == 'background':
-            new_asset = create_background_asset(full_asset_path, asset_filename, task_name)
-            project_data['backgrounds'].append(new_asset)
-        else:
-            logging.warning(f"Asset type '{asset_type}' not yet supported by gbsproj_editor. Skipping JSON modification.")
-            return True # Return True to not break the workflow for other asset types
-
-        # Use atomic write to prevent corruption
-        if not atomic_write_json(gbsproj_path, project_data):
-            logging.error("Failed to write project file atomically")
+        if not session.commit():
             return False
-            
-        logging.info(f"Successfully added asset '{task_name}' to {gbsproj_path}")
+        logging.info(f"Successfully added asset '{task_name}' to {session.gbsproj_path}")
         return True
-
     except Exception as e:
+        # The project file is replaced atomically, so a failure leaves it untouched
         logging.error(f"Failed to add asset to .gbsproj file: {e}")
-        
-        # Attempt to restore from backup if available
-        if backup_path and os.path.exists(backup_path):
-            try:
-                shutil.copy2(backup_path, gbsproj_path)
-                logging.info(f"Restored project file from backup: {backup_path}")
-            except Exception as restore_error:
-                logging.error(f"Failed to restore from backup: {restore_error}")
-        
         return False
 
 def create_sprite_asset(image_path: str, filename: str, name: str) -> dict:
     """Creates a dictionary for a new sprite asset."""
-    with Image.open(image_path) as img:
-        width, height = img.size
+    info = asset_inspector.inspect(image_path)
+    width, height = info["width"], info["height"]
 
-    # GB Studio sprites are 16x16. Calculate frames based on this.
-    frames = (width // 16) * (height // 16)
+    # GB Studio sprites are 16x16; the inspector counts frames on this grid.
+    frames = info["frames"]
 
     return {
         "id": str(uuid.uuid4()),
@@ -159,8 +260,8 @@ def create_sprite_asset(image_path: str, filename: str, name: str) -> dict:
 
 def create_background_asset(image_path: str, filename: str, name: str) -> dict:
     """Creates a dictionary for a new background asset."""
-    with Image.open(image_path) as img:
-        width, height = img.size
+    info = asset_inspector.inspect(image_path)
+    width, height = info["width"], info["height"]
 
     return {
         "id": str(uuid.uuid4()),
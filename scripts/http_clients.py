@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class HTTPClientPool:
+    """
+    Owns one long-lived aiohttp.ClientSession per upstream host so that calls to
+    Ollama and ComfyUI reuse pooled keep-alive connections instead of paying
+    TCP setup and DNS resolution on every request.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        keepalive_timeout: float = 30.0,
+        connect_timeout: float = 10.0,
+        dns_cache_ttl: int = 300
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._sessions: dict[str, aiohttp.ClientSession] = {}
+        self._session_loops: dict[str, asyncio.AbstractEventLoop] = {}
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        """Returns the scheme://host:port key used to pool connections for a URL."""
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl
+        )
+        timeout = aiohttp.ClientTimeout(connect=self.connect_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def session_for(self, url: str) -> aiohttp.ClientSession:
+        """
+        Returns the pooled session for the host of the given URL, creating it on first use.
+
+        Sessions are bound to the event loop they were created on, so a session
+        from a closed or different loop (e.g. between test runs) is replaced.
+        """
+        key = self.host_key(url)
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(key)
+        if session is None or session.closed or self._session_loops.get(key) is not loop:
+            session = self._create_session()
+            self._sessions[key] = session
+            self._session_loops[key] = loop
+            logging.info(f"Opened pooled HTTP session for {key}")
+        return session
+
+    async def start(self, *urls: str):
+        """Pre-creates sessions for the given upstream URLs."""
+        for url in urls:
+            if url:
+                self.session_for(url)
+
+    async def close(self):
+        """Closes every pooled session and its connections."""
+        for key, session in list(self._sessions.items()):
+            if not session.closed:
+                try:
+                    await session.close()
+                except Exception as e:
+                    logging.warning(f"Failed to close HTTP session for {key}: {e}")
+        self._sessions.clear()
+        self._session_loops.clear()
+        logging.info("Closed all pooled HTTP sessions")
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+from scripts.asset_inspector import asset_inspector
+from scripts.async_database import async_db
+from scripts.database import update_asset_statuses
+from scripts.project_integrator import ASSET_DESTINATIONS, compile_gb_studio_project_async, move_asset
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+Broadcast = Callable[[dict], Awaitable[None]]
+
+class BuildLogStream:
+    """
+    Relays build output to WebSocket clients in small batches, so a chatty
+    build sends a few messages per second instead of one per line. Lines
+    still held when the build ends are sent by close().
+    """
+
+    def __init__(self, broadcast: Broadcast, max_lines: int = 20, max_delay: float = 0.25):
+        self.broadcast = broadcast
+        self.max_lines = max_lines
+        self.max_delay = max_delay
+        self.lines_sent = 0
+        self._lines: list[str] = []
+        self._last_flush = time.monotonic()
+
+    async def write(self, line: str):
+        self._lines.append(line)
+        if len(self._lines) >= self.max_lines or time.monotonic() - self._last_flush >= self.max_delay:
+            await self.flush()
+
+    async def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._lines:
+            return
+        lines, self._lines = self._lines, []
+        self.lines_sent += len(lines)
+        await self.broadcast({"event": "BUILD", "lines": lines})
+
+    async def close(self):
+        await self.flush()
+
+class IntegrationPipeline:
+    """
+    Integrates approved assets into the GB Studio project and builds it
+    without blocking the event loop.
+
+    Files are fetched concurrently, then moved and inspected on a thread
+    pool. Statuses are updated in one transaction and the moved assets are
+    registered in the .gbsproj with a single write. The GB Studio CLI runs
+    as an asyncio subprocess with its output streamed as BUILD events.
+    Every stage is timed and the timings are returned with the result.
+    """
+
+    def __init__(
+        self,
+        project_path: str,
+        gbs_cli_path: str,
+        broadcast: Broadcast,
+        fetch: Callable[[dict], Awaitable[str]],
+        register: Callable[[list[dict]], Awaitable[list[dict]]],
+        workers: int = 4,
+        build_timeout: Optional[float] = None
+    ):
+        self.project_path = project_path
+        self.gbs_cli_path = gbs_cli_path
+        self.broadcast = broadcast
+        self.fetch = fetch
+        self.register = register
+        self.workers = workers
+        self.build_timeout = build_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @asynccontextmanager
+    async def _stage(self, timings: dict, name: str):
+        await self.broadcast({"event": "INTEGRATION", "stage": name, "status": "STARTED"})
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = round(time.perf_counter() - started, 4)
+            await self.broadcast({"event": "INTEGRATION", "stage": name, "status": "FINISHED", "seconds": timings[name]})
+
+    def _move(self, source_path: str, asset: dict) -> Optional[dict]:
+        """Moves one asset into the project and reads its metadata while the file is hot in the page cache."""
+        if not move_asset(source_path=source_path, asset_type=asset['asset_type'], project_path=self.project_path):
+            return None
+        filename = os.path.basename(source_path)
+        destination = os.path.join(self.project_path, ASSET_DESTINATIONS[asset['asset_type'].lower()], filename)
+        try:
+            asset_inspector.inspect(destination)
+        except OSError as e:
+            logging.warning(f"Could not inspect moved asset {destination}: {e}")
+        return {
+            'id': asset['id'],
+            'filename': filename,
+            'asset_type': asset['asset_type'],
+            'task_name': asset['task_name'],
+        }
+
+    async def integrate(self, assets: list[dict]) -> tuple[list[dict], dict]:
+        """
+        Moves and registers assets in the project. Returns the assets that
+        were moved and the per-stage timings in seconds.
+        """
+        timings: dict[str, float] = {}
+        assets = [asset for asset in assets if asset['source_path'] and asset['source_path'] != 'placeholder']
+
+        async with self._stage(timings, "fetch"):
+            fetched = await asyncio.gather(*(self.fetch(asset) for asset in assets), return_exceptions=True)
+        sources = []
+        for asset, result in zip(assets, fetched):
+            if isinstance(result, BaseException):
+                logging.error(f"Failed to fetch asset: {asset['task_name']} (ID: {asset['id']}): {getattr(result, 'detail', result)}")
+            else:
+                sources.append((asset, result))
+
+        async with self._stage(timings, "move"):
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="integration")
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(
+                *(loop.run_in_executor(self._executor, self._move, source_path, asset) for asset, source_path in sources),
+                return_exceptions=True
+            )
+        moved = []
+        for (asset, _), result in zip(sources, results):
+            if isinstance(result, dict):
+                moved.append(result)
+            else:
+                logging.error(f"Failed to move asset: {asset['task_name']} (ID: {asset['id']})")
+
+        async with self._stage(timings, "database"):
+            # IMPORTANT: Update status to 'integrated' to prevent re-integration
+            await async_db.write(update_asset_statuses, [asset['id'] for asset in moved], 'integrated')
+
+        async with self._stage(timings, "project"):
+            for asset in await self.register(moved):
+                logging.error(f"Failed to add asset to the .gbsproj file: {asset['task_name']} (ID: {asset['id']})")
+        return moved, timings
+
+    async def build(self, timings: dict) -> tuple[bool, str]:
+        """Compiles the project, streaming the build log, and records the compile time in `timings`."""
+        log_stream = BuildLogStream(self.broadcast)
+        async with self._stage(timings, "compile"):
+            try:
+                success, rom_path = await compile_gb_studio_project_async(
+                    self.project_path, self.gbs_cli_path, on_output=log_stream.write, timeout=self.build_timeout
+                )
+            finally:
+                await log_stream.close()
+        return success, rom_path
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,321 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from scripts.async_database import async_db
+from scripts.database import (
+    enqueue_generation_job, enqueue_generation_batch, get_generation_batch,
+    claim_next_generation_job, finish_generation_job,
+    requeue_generation_job, cancel_queued_generation_job,
+    request_generation_job_cancel, get_cancel_requested_jobs,
+    reset_interrupted_generation_jobs, get_generation_queue_counts
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class PermanentJobError(Exception):
+    """Raised by a job executor for failures that retrying cannot fix."""
+
+class GenerationScheduler:
+    """
+    Persistent, bounded scheduler for asset generation jobs.
+
+    Jobs live in the SQLite `assets` table (status 'queued' -> 'generating' ->
+    'generated' | 'failed' | 'cancelled'), so the queue survives restarts. A
+    dispatcher claims jobs in priority order and runs at most `concurrency`
+    of them per backend, retrying transient failures with exponential backoff.
+
+    If `backend_load` is given, it is called with a backend name and returns
+    that backend's current external queue depth, or None if the backend must
+    not receive new work; each job goes to the least-loaded available backend.
+
+    Several workers can share the queue. Cancelling a job another worker is
+    running flags its row, and the owning worker's dispatcher cancels the
+    job the next time it polls.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[dict], Awaitable[None]],
+        broadcast: Callable[[dict], Awaitable[None]],
+        concurrency: dict[str, int],
+        max_attempts: int = 3,
+        retry_backoff: float = 5.0,
+        retry_backoff_max: float = 300.0,
+        poll_interval: float = 1.0,
+        default_job_duration: float = 60.0,
+        backend_load: Optional[Callable[[str], Optional[float]]] = None
+    ):
+        self._execute = execute
+        self._broadcast = broadcast
+        self.concurrency = dict(concurrency)
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.poll_interval = poll_interval
+        self._backend_load = backend_load
+        # Exponential moving average of job run time, used for ETA estimates
+        self.average_job_duration = default_job_duration
+        self._running: dict[int, tuple[str, asyncio.Task]] = {}
+        self._cancelling: set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def total_concurrency(self) -> int:
+        return max(1, sum(self.concurrency.values()))
+
+    def running_on(self, backend: str) -> int:
+        return sum(1 for job_backend, _ in self._running.values() if job_backend == backend)
+
+    async def start(self):
+        """Requeues jobs interrupted by a restart and starts the dispatcher."""
+        await async_db.write(reset_interrupted_generation_jobs)
+        self._stopping = False
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """Stops dispatching and cancels running jobs; they are requeued on the next start."""
+        self._stopping = True
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for _, task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*(task for _, task in self._running.values()), return_exceptions=True)
+        self._running.clear()
+
+    async def submit(
+        self,
+        subject_prompt: str,
+        task_name: str,
+        asset_type: str,
+        workflow: str,
+        priority: int = 0,
+        trace_id: Optional[str] = None
+    ) -> int:
+        """Queues a generation job and returns its asset ID. `trace_id` ties the job to the request that queued it."""
+        asset_id = await async_db.write(enqueue_generation_job, task_name, asset_type, subject_prompt, workflow, priority, trace_id)
+        if asset_id == -1:
+            raise Exception("Failed to log asset creation in the database.")
+        status = await self.queue_status()
+        await self._notify({
+            "event": "NEW",
+            "name": task_name,
+            "status": "QUEUED",
+            "asset_id": asset_id,
+            "asset_type": asset_type,
+            "position": status["queued"],
+            "eta_seconds": self.estimate_wait(status["queued"])
+        })
+        await self._notify_queue(status)
+        self._wakeup.set()
+        return asset_id
+
+    async def submit_batch(self, name: str, asset_type: str, workflow: str, items: list, priority: int = 0) -> tuple[int, list[int]]:
+        """
+        Queues one job per (subject_prompt, seed) item under a new batch and
+        returns the batch ID and the items' asset IDs.
+        """
+        batch_id, asset_ids = await async_db.write(enqueue_generation_batch, name, asset_type, workflow, items, priority)
+        if batch_id == -1:
+            raise Exception("Failed to record the generation batch in the database.")
+        status = await self.queue_status()
+        await self._notify({
+            "event": "BATCH",
+            "name": name,
+            "status": "QUEUED",
+            "parent_id": batch_id,
+            "asset_type": asset_type,
+            "asset_ids": asset_ids,
+            "total": len(asset_ids),
+            "counts": {"queued": len(asset_ids)},
+            "eta_seconds": self.estimate_wait(status["queued"])
+        })
+        await self._notify_queue(status)
+        self._wakeup.set()
+        return batch_id, asset_ids
+
+    async def cancel(self, asset_id: int) -> bool:
+        """
+        Cancels a queued or running job, including one running in another
+        worker. Returns False if the job is not active.
+        """
+        if await async_db.write(cancel_queued_generation_job, asset_id):
+            logging.info(f"Cancelled queued generation job {asset_id}")
+            await self._notify({"event": "UPDATE", "status": "CANCELLED", "asset_id": asset_id})
+            await self._notify_queue()
+            return True
+        if asset_id in self._running:
+            self._cancel_running(asset_id)
+            return True
+        if await async_db.write(request_generation_job_cancel, asset_id):
+            logging.info(f"Requested cancellation of generation job {asset_id} from the worker running it")
+            return True
+        return False
+
+    def _cancel_running(self, asset_id: int):
+        running = self._running.get(asset_id)
+        if running and asset_id not in self._cancelling:
+            self._cancelling.add(asset_id)
+            running[1].cancel()
+
+    async def _apply_cancel_requests(self):
+        """Cancels this worker's jobs that another worker was asked to cancel."""
+        if not self._running:
+            return
+        for asset_id in await async_db.read(get_cancel_requested_jobs, list(self._running)):
+            logging.info(f"Cancelling generation job {asset_id} on request")
+            self._cancel_running(asset_id)
+
+    def estimate_wait(self, position: int) -> float:
+        """Estimates seconds until a job at the given 1-based queue position finishes."""
+        rounds = math.ceil(max(position, 1) / self.total_concurrency)
+        return round(rounds * self.average_job_duration, 1)
+
+    async def queue_status(self) -> dict:
+        counts = await async_db.read(get_generation_queue_counts)
+        queued = counts.get("queued", 0)
+        return {
+            "queued": queued,
+            "running": counts.get("generating", 0),
+            "concurrency": self.concurrency,
+            "average_job_seconds": round(self.average_job_duration, 1),
+            "eta_seconds": self.estimate_wait(queued) if queued else 0.0
+        }
+
+    async def _notify(self, message: dict):
+        try:
+            await self._broadcast(message)
+        except Exception as e:
+            logging.warning(f"Failed to broadcast scheduler event: {e}")
+
+    async def _notify_batch(self, parent_id: Optional[int]):
+        """Broadcasts a batch's per-status counts after one of its items settles."""
+        if not parent_id:
+            return
+        batch = await async_db.read(get_generation_batch, parent_id, include_items=False)
+        if batch is None:
+            return
+        counts = batch["counts"]
+        active = counts.get("queued", 0) + counts.get("generating", 0)
+        await self._notify({
+            "event": "BATCH",
+            "name": batch["name"],
+            "status": "GENERATING" if active else "COMPLETED",
+            "parent_id": parent_id,
+            "asset_type": batch["asset_type"],
+            "total": batch["total"],
+            "counts": counts
+        })
+
+    async def _notify_queue(self, status: dict = None):
+        await self._notify({"event": "QUEUE", **(status or await self.queue_status())})
+
+    async def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self._apply_cancel_requests()
+                await self._dispatch_ready()
+            except Exception as e:
+                logging.error(f"Generation scheduler dispatch failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _pick_backend(self) -> Optional[str]:
+        """Returns the least-loaded available backend with spare capacity, if any."""
+        candidates = []
+        for backend, limit in self.concurrency.items():
+            running = self.running_on(backend)
+            if running >= limit:
+                continue
+            external_load = self._backend_load(backend) if self._backend_load else 0
+            if external_load is None:
+                continue
+            # The remote queue already includes our own submitted jobs
+            candidates.append((max(external_load, running) / limit, backend))
+        return min(candidates)[1] if candidates else None
+
+    async def _dispatch_ready(self):
+        dispatched = False
+        while True:
+            backend = self._pick_backend()
+            if backend is None:
+                break
+            job = await async_db.write(claim_next_generation_job, backend)
+            if job is None:
+                break
+            job = dict(job)
+            task = asyncio.create_task(self._run_job(job, backend))
+            self._running[job['id']] = (backend, task)
+            dispatched = True
+        if dispatched:
+            await self._notify_queue()
+
+    async def _run_job(self, job: dict, backend: str):
+        asset_id = job['id']
+        started = time.monotonic()
+        try:
+            await self._execute(job)
+            await async_db.write(finish_generation_job, asset_id, 'generated')
+            duration = time.monotonic() - started
+            self.average_job_duration = 0.8 * self.average_job_duration + 0.2 * duration
+        except asyncio.CancelledError:
+            if self._stopping:
+                # Leave the job in 'generating' so the next start requeues it
+                raise
+            await async_db.write(finish_generation_job, asset_id, 'cancelled', "Cancelled")
+            logging.info(f"Cancelled running generation job {asset_id}")
+            await self._notify({"event": "UPDATE", "name": job['task_name'], "status": "CANCELLED", "asset_id": asset_id})
+        except Exception as e:
+            await self._handle_failure(job, e)
+        finally:
+            self._running.pop(asset_id, None)
+            self._cancelling.discard(asset_id)
+            self._wakeup.set()
+            if not self._stopping:
+                await self._notify_batch(job.get('parent_id'))
+                await self._notify_queue()
+
+    async def _handle_failure(self, job: dict, error: Exception):
+        asset_id = job['id']
+        attempts = job.get('attempts') or 1
+        if isinstance(error, PermanentJobError) or attempts >= self.max_attempts:
+            logging.error(f"Generation task failed for asset {asset_id}: {error}")
+            await async_db.write(finish_generation_job, asset_id, 'failed', str(error))
+            await self._notify({
+                "event": "ERROR",
+                "name": job['task_name'],
+                "asset_id": asset_id,
+                "message": str(error),
+                "asset_type": job['asset_type']
+            })
+            return
+
+        delay = min(self.retry_backoff * (2 ** (attempts - 1)), self.retry_backoff_max)
+        next_attempt_at = (datetime.now() + timedelta(seconds=delay)).isoformat()
+        logging.warning(
+            f"Generation task for asset {asset_id} failed (attempt {attempts}/{self.max_attempts}), "
+            f"retrying in {delay:.0f}s: {error}"
+        )
+        await async_db.write(requeue_generation_job, asset_id, next_attempt_at, str(error))
+        await self._notify({
+            "event": "UPDATE",
+            "name": job['task_name'],
+            "status": "QUEUED",
+            "asset_id": asset_id,
+            "asset_type": job['asset_type'],
+            "message": f"Attempt {attempts} failed, retrying in {delay:.0f}s: {error}"
+        })
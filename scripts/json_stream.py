@@ -0,0 +1,110 @@
+import json
+import logging
+from collections import deque
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+class JSONObjectScanner:
+    """
+    Incrementally scans streamed text for top-level JSON objects embedded in
+    free-form model output, returning each object as soon as its closing
+    brace arrives. Braces inside JSON strings are ignored, and so is
+    everything inside <think>...</think> reasoning blocks.
+
+    A brace in prose (one not followed by a key or a closing brace) is
+    skipped as soon as that is clear, and a candidate that fails to parse
+    is scanned again from just after its opening brace, so stray braces do
+    not hide an object that follows them.
+    """
+
+    def __init__(self):
+        self._in_think = False
+        self._tag = ""  # Start of a possible think tag, held until the next chunk
+        self._reset()
+
+    def _reset(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._expect_key = False
+        self._current: list[str] = []
+
+    def feed(self, text: str) -> list[dict]:
+        """Consumes a chunk of text and returns any JSON objects completed by it."""
+        text, self._tag = self._tag + text, ""
+        visible = []
+        i = 0
+        while i < len(text):
+            if text[i] == "<" and not self._in_string:
+                tag = THINK_CLOSE if self._in_think else THINK_OPEN
+                head = text[i:i + len(tag)]
+                if head == tag:
+                    self._in_think = not self._in_think
+                    i += len(tag)
+                    continue
+                if i + len(head) == len(text) and tag.startswith(head):
+                    self._tag = head
+                    break
+            if not self._in_think:
+                visible.append(text[i])
+            i += 1
+
+        completed = []
+        pending = deque(visible)
+        while pending:
+            replay = self._scan(pending.popleft(), completed)
+            if replay:
+                pending.extendleft(reversed(replay))
+        return completed
+
+    def _scan(self, char: str, completed: list[dict]) -> list[str]:
+        """Advances the scan by one character; returns characters to scan again after a false start."""
+        if self._depth == 0:
+            if char == "{":
+                self._depth = 1
+                self._expect_key = True
+                self._current = [char]
+            return []
+
+        self._current.append(char)
+        if self._expect_key:
+            if char.isspace():
+                return []
+            self._expect_key = False
+            if char not in '"}':
+                return self._abandon()
+
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+        elif char == '"':
+            self._in_string = True
+        elif char == "{":
+            self._depth += 1
+            self._expect_key = True
+        elif char == "}":
+            self._depth -= 1
+            if self._depth == 0:
+                candidate = "".join(self._current)
+                try:
+                    parsed = json.loads(candidate)
+                except json.JSONDecodeError as e:
+                    logging.warning(f"Discarding malformed JSON object from stream: {e}")
+                    return self._abandon()
+                self._current = []
+                if isinstance(parsed, dict):
+                    completed.append(parsed)
+        return []
+
+    def _abandon(self) -> list[str]:
+        """Drops the current candidate and returns the text after its opening brace for rescanning."""
+        replay = self._current[1:]
+        self._reset()
+        return replay
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from typing import Optional
+
+from scripts import database
+from scripts.async_database import async_db
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def normalize_task(task: str) -> str:
+    """Normalizes task text so trivially different phrasings share a cache entry."""
+    task = re.sub(r"\s+", " ", task.strip().lower())
+    return task.rstrip(" .!?")
+
+def cache_key(agent_name: str, model: str, system_prompt: str, task: str) -> str:
+    """Returns the content address for an agent call."""
+    system_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    material = json.dumps([agent_name, model, system_hash, normalize_task(task)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of agent responses stored in the hub's SQLite
+    database, with TTL expiry and LRU eviction by entry count and total size.
+    Reads go through the async_db reader pool and writes through its writer
+    thread, so cache lookups never run SQLite on the event loop.
+    """
+
+    def __init__(self, ttl: float = 86400.0, max_entries: int = 1000, max_bytes: int = 10_000_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Returns the cached response for a key, or None on a miss or expired entry."""
+        response = await async_db.read(self._get_entry, key, time.time() - self.ttl)
+        if response is None:
+            self.misses += 1
+            return None
+        await async_db.write(self._touch_entry, key)
+        self.hits += 1
+        return response
+
+    async def put(self, key: str, agent_name: str, model: str, response: dict):
+        """Stores a response and evicts expired and least-recently-used entries."""
+        await async_db.write(self._put_entry, key, agent_name, model, json.dumps(response))
+
+    async def clear(self) -> int:
+        return await async_db.write(self._delete_all)
+
+    async def stats(self) -> dict:
+        entries, total = await async_db.read(self._totals)
+        return {"entries": entries, "bytes": total, "hits": self.hits, "misses": self.misses}
+
+    def _get_entry(self, key: str, created_after: float) -> Optional[dict]:
+        conn = database.get_db_connection()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?", (key, created_after)
+            ).fetchone()
+            return json.loads(row["response"]) if row else None
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logging.error(f"Failed to read LLM cache entry: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def _touch_entry(self, key: str):
+        conn = database.get_db_connection()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute("UPDATE llm_cache SET last_accessed = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            logging.error(f"Failed to update LLM cache entry: {e}")
+        finally:
+            conn.close()
+
+    def _put_entry(self, key: str, agent_name: str, model: str, payload: str):
+        conn = database.get_db_connection()
+        if conn is None:
+            return
+        try:
+            now = time.time()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, agent_name, model, response, size, created_at, last_accessed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, agent_name, model, payload, len(payload), now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write LLM cache entry: {e}")
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_accessed ASC").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        logging.info(f"Evicted {evicted} LLM cache entries")
+
+    def _delete_all(self) -> int:
+        conn = database.get_db_connection()
+        if conn is None:
+            return 0
+        try:
+            with conn:
+                return conn.execute("DELETE FROM llm_cache").rowcount
+        except sqlite3.Error as e:
+            logging.error(f"Failed to clear LLM cache: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def _totals(self) -> tuple[int, int]:
+        conn = database.get_db_connection()
+        if conn is None:
+            return 0, 0
+        try:
+            return tuple(conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone())
+        except sqlite3.Error as e:
+            logging.error(f"Failed to read LLM cache stats: {e}")
+            return 0, 0
+        finally:
+            conn.close()
@@ -6,10 +6,12 @@ import aiohttp
 import requests
 import logging
 import re
+import random
+import time
 from datetime import datetime
 from fastapi import FastAPI, Request, WebSocket, Depends, HTTPException, BackgroundTasks
 from pydantic import BaseModel
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -17,10 +19,36 @@ from scripts.config import settings
 from scripts.database import (
     initialize_database, log_chat_message, log_asset_creation,
     update_asset_status, get_asset, update_asset_source_path,
-    get_db_connection, get_approved_assets
+    get_approved_assets, get_asset_by_source_path,
+    load_project_history, close_db_connections, get_generation_batch,
+    update_asset_statuses, get_trace_spans
 )
-from scripts.project_integrator import move_asset, compile_gb_studio_project, launch_in_emulator
-from scripts.gbsproj_editor import add_asset_to_project
+from scripts.project_integrator import move_asset, launch_in_emulator
+from scripts.integration_pipeline import IntegrationPipeline
+from scripts.metrics import (
+    REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, OLLAMA_REQUEST_SECONDS, OLLAMA_IN_FLIGHT,
+    GENERATION_SECONDS, GENERATION_STAGE_SECONDS, GENERATIONS_IN_FLIGHT, COMFYUI_POLL_SECONDS,
+    COMFYUI_POLLS, DB_WRITE_QUEUE, WS_CLIENTS
+)
+from scripts.gbsproj_editor import ProjectSession
+from scripts import tracing
+from scripts.traffic_capture import TrafficCaptureMiddleware, TrafficRecorder, record_job_ids
+from scripts.async_database import async_db
+from scripts.http_clients import HTTPClientPool
+from scripts.comfyui_tracker import ComfyUITrackerDisconnected
+from scripts.comfyui_backends import ComfyUIBackendPool
+from scripts.job_queue import GenerationScheduler, PermanentJobError
+from scripts.json_stream import JSONObjectScanner
+from scripts.llm_cache import LLMResponseCache, cache_key
+from scripts.model_warmup import ModelWarmer, WarmupSkipped, warmup_prompt
+from scripts.project_history import project_history
+from scripts.gb_postprocess import convert_to_game_boy
+from scripts.tile_indexer import merge_tiles_in_file
+from scripts.asset_inspector import asset_inspector
+from scripts.result_cache import GenerationResultCache, workflow_key
+from scripts.event_bus import create_event_bus
+from scripts.workflow_registry import WorkflowRegistry, WorkflowError
+from scripts.ws_manager import ConnectionManager
 
 # --- FastAPI App Setup ---
 app = FastAPI()
@@ -35,27 +63,94 @@ app.add_middleware(
     allow_headers=["*"],  # Headers can remain permissive for development
 )
 
+# --- Traffic Capture (opt-in) ---
+traffic_recorder = TrafficRecorder(
+    settings.traffic_capture_path,
+    max_bytes=settings.traffic_capture_max_bytes,
+    backups=settings.traffic_capture_backups
+)
+if settings.traffic_capture_enabled:
+    app.add_middleware(TrafficCaptureMiddleware, recorder=traffic_recorder)
+
+# --- Shared HTTP Clients ---
+http_clients = HTTPClientPool(
+    limit=settings.http_pool_limit,
+    limit_per_host=settings.http_pool_limit_per_host,
+    keepalive_timeout=settings.http_keepalive_timeout,
+    connect_timeout=settings.http_connect_timeout
+)
+comfyui_backends = ComfyUIBackendPool(
+    settings.comfyui_backends,
+    http_clients.session_for,
+    catalog_ttl=settings.comfyui_catalog_ttl,
+    request_timeout=settings.comfyui_request_timeout,
+    health_interval=settings.comfyui_health_interval,
+    failure_threshold=settings.comfyui_failure_threshold,
+    use_websocket=settings.comfyui_use_websocket
+)
+result_cache = GenerationResultCache(settings.comfyui_output_path, max_bytes=settings.result_cache_max_bytes)
+workflow_registry = WorkflowRegistry(
+    os.path.join(os.path.dirname(settings.gb_project_path), "workflows"),
+    reload_interval=settings.workflow_reload_interval
+)
+
 @app.on_event("startup")
-def on_startup():
-    """Initialize the database when the application starts."""
+async def on_startup():
+    """Initialize the database and the pooled HTTP clients when the application starts."""
     initialize_database()
+    async_db.start()
+    if settings.traffic_capture_enabled:
+        traffic_recorder.start()
+    await async_db.read(load_project_history, settings.project_history_conversations, settings.project_history_assets)
+    await http_clients.start(settings.ollama_api_url, *comfyui_backends.urls)
+    workflow_registry.load_all()
+    workflow_registry.start()
+    comfyui_backends.start()
+    await manager.start()
+    await generation_scheduler.start()
+    if settings.warmup_enabled:
+        model_warmer.start()
     logging.info("Pixel art workflow is available at /ComfyUI/workflows/workflow_pixel_art.json")
 
-app.mount("/output", StaticFiles(directory=settings.comfyui_output_path), name="output")
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Stop the scheduler and ComfyUI listeners and close pooled HTTP and database connections when the application stops."""
+    await model_warmer.stop()
+    await generation_scheduler.stop()
+    await workflow_registry.stop()
+    await manager.stop()
+    await comfyui_backends.stop()
+    integration_pipeline.close()
+    await http_clients.close()
+    await async_db.stop()
+    close_db_connections()
+    traffic_recorder.stop()
+
+project_history.configure(
+    max_conversations=settings.project_history_conversations,
+    max_assets=settings.project_history_assets,
+    token_budget=settings.project_history_token_budget,
+    response_chars=settings.project_history_response_chars
+)
+
+llm_cache = LLMResponseCache(
+    ttl=settings.llm_cache_ttl,
+    max_entries=settings.llm_cache_max_entries,
+    max_bytes=settings.llm_cache_max_bytes
+)
 
 # --- WebSocket Connection Manager ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
-manager = ConnectionManager()
+manager = ConnectionManager(
+    queue_size=settings.ws_send_queue_size,
+    send_timeout=settings.ws_send_timeout,
+    heartbeat_interval=settings.ws_heartbeat_interval,
+    heartbeat_timeout=settings.ws_heartbeat_timeout,
+    bus=create_event_bus(
+        settings.event_bus_backend,
+        poll_interval=settings.event_bus_poll_interval,
+        retention=settings.event_bus_retention
+    )
+)
 
 # --- Agent Prompts ---
 CONVERSATIONAL_AGENTS = {
@@ -127,75 +222,79 @@ Please review this prompt and let me know if you'd like me to send it to the Art
 }
 
 def get_project_history() -> str:
-    """Retrieves a summary of recent conversations and assets from the database."""
-    history_parts = []
-    conn = get_db_connection()
-    if conn is None:
-        return "No project history found."
+    """
+    Returns the summary of recent conversations and assets for the PM prompt.
 
+    The summary is loaded from the database on first use and afterwards kept
+    current in memory by the database write functions.
+    """
     try:
-        # Get last 10 conversations
-        conv_rows = conn.execute("""
-            SELECT user_message, agent_response
-            FROM conversations
-            ORDER BY timestamp DESC
-            LIMIT 10
-        """).fetchall()
-        if conv_rows:
-            history_parts.append("== Recent Conversations ==")
-            conv_history = "\n".join([
-                f"- User: {row['user_message']}\n  - Agent: {row['agent_response']}"
-                for row in reversed(conv_rows)
-            ])
-            history_parts.append(conv_history)
-
-        # Get last 10 assets
-        asset_rows = conn.execute("""
-            SELECT task_name, asset_type, status, timestamp
-            FROM assets
-            ORDER BY timestamp DESC
-            LIMIT 10
-        """).fetchall()
-        if asset_rows:
-            history_parts.append("\n== Recent Assets ==")
-            asset_history = "\n".join([
-                f"- [{row['timestamp']}] {row['task_name']} (Type: {row['asset_type']}, Status: {row['status']})"
-                for row in asset_rows
-            ])
-            history_parts.append(asset_history)
-
-        return "\n".join(history_parts) if history_parts else "No project history found."
-
+        if not project_history.loaded and not load_project_history(
+            settings.project_history_conversations, settings.project_history_assets
+        ):
+            return "No project history found."
+        return project_history.render()
     except Exception as e:
         logging.error(f"Error getting project history: {e}")
         return "Error retrieving project history."
-    finally:
-        if conn:
-            conn.close()
 
 
 # --- Helper Functions ---
-async def call_ollama_agent(agent_name: str, task: str) -> dict:
-    """Calls the Ollama agent and returns the parsed JSON response."""
+def build_system_prompt(agent_name: str) -> str:
+    """Builds an agent's system prompt, including project history for the PM."""
     system_prompt = CONVERSATIONAL_AGENTS[agent_name]
     if agent_name == "PM":
         history = get_project_history()
         system_prompt = system_prompt.replace("{history}", history)
+    return system_prompt
 
+def agent_cache_key(agent_name: str, system_prompt: str, task: str):
+    """Returns the response cache key for an agent call, or None if caching is disabled."""
+    if not settings.llm_cache_enabled:
+        return None
+    return cache_key(agent_name, settings.ollama_model, system_prompt, task)
+
+async def call_ollama_agent(agent_name: str, task: str, use_cache: bool = True) -> dict:
+    """
+    Calls the Ollama agent and returns the parsed JSON response.
+
+    When the response cache is enabled and use_cache is True, identical calls
+    (same agent, model, system prompt and normalized task) are served from it.
+    """
+    with OLLAMA_IN_FLIGHT.track_inprogress(agent=agent_name), OLLAMA_REQUEST_SECONDS.time(agent=agent_name) as labels, \
+            tracing.span("ollama.request", agent=agent_name, model=settings.ollama_model) as span:
+        response_data = await _call_ollama_agent(agent_name, task, use_cache)
+        labels["outcome"] = "error" if "error" in response_data else "cached" if response_data.get("cached") else "ok"
+        if span is not None:
+            span["attributes"]["outcome"] = labels["outcome"]
+        return response_data
+
+async def _call_ollama_agent(agent_name: str, task: str, use_cache: bool) -> dict:
+    system_prompt = build_system_prompt(agent_name)
     full_prompt = f"{system_prompt}\n\nUSER TASK: {task}"
-    payload = {"model": "qwen3:1.7b", "prompt": full_prompt, "stream": False}
+    key = agent_cache_key(agent_name, system_prompt, task) if use_cache else None
+    if key:
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            logging.info(f"Serving {agent_name} response from the LLM cache")
+            return {**cached, "cached": True}
+    payload = {"model": settings.ollama_model, "prompt": full_prompt, "stream": False, "keep_alive": settings.ollama_keep_alive}
     response_text = ""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(settings.ollama_api_url, json=payload, timeout=300) as response:
-                response.raise_for_status()
-                response_text = await response.text()
-                ollama_payload = json.loads(response_text)
-                model_response_str = ollama_payload.get("response", "")
-                
-                # Return the full response for natural conversation
-                # Frontend can detect and handle JSON if present
-                return {"response": model_response_str, "type": "conversation"}
+        session = http_clients.session_for(settings.ollama_api_url)
+        timeout = aiohttp.ClientTimeout(total=settings.ollama_request_timeout)
+        async with session.post(settings.ollama_api_url, json=payload, timeout=timeout) as response:
+            response.raise_for_status()
+            response_text = await response.text()
+            ollama_payload = json.loads(response_text)
+            model_response_str = ollama_payload.get("response", "")
+
+            # Return the full response for natural conversation
+            # Frontend can detect and handle JSON if present
+            response_data = {"response": model_response_str, "type": "conversation"}
+            if key:
+                await llm_cache.put(key, agent_name, settings.ollama_model, response_data)
+            return response_data
     except aiohttp.ClientConnectorError as e:
         logging.error(f"Ollama Connection Error: {e}")
         return {"error": "Could not connect to the Ollama service."}
@@ -212,143 +311,396 @@ async def call_ollama_agent(agent_name: str, task: str) -> dict:
         logging.error(f"Unexpected error calling agent: {e}")
         return {"error": f"Unexpected error: {str(e)}"}
 
-async def validate_comfyui_models(workflow: dict) -> tuple[bool, str]:
+async def stream_ollama_agent(agent_name: str, task: str, use_cache: bool = True):
+    """
+    Calls the Ollama agent in streaming mode and yields response text chunks
+    as Ollama emits its NDJSON lines. A cached response is yielded as a
+    single chunk, and a completed stream is stored in the cache.
+    """
+    system_prompt = build_system_prompt(agent_name)
+    full_prompt = f"{system_prompt}\n\nUSER TASK: {task}"
+    key = agent_cache_key(agent_name, system_prompt, task) if use_cache else None
+    if key:
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            logging.info(f"Serving streamed {agent_name} response from the LLM cache")
+            yield cached.get("response", "")
+            return
+    payload = {"model": settings.ollama_model, "prompt": full_prompt, "stream": True, "keep_alive": settings.ollama_keep_alive}
+    chunks = []
+    session = http_clients.session_for(settings.ollama_api_url)
+    timeout = aiohttp.ClientTimeout(total=settings.ollama_request_timeout)
+    async with session.post(settings.ollama_api_url, json=payload, timeout=timeout) as response:
+        response.raise_for_status()
+        async for line in response.content:
+            line = line.strip()
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise Exception(f"Ollama API returned an error: {chunk['error']}")
+            if chunk.get("response"):
+                chunks.append(chunk["response"])
+                yield chunk["response"]
+            if chunk.get("done"):
+                break
+    if key:
+        await llm_cache.put(key, agent_name, settings.ollama_model, {"response": "".join(chunks), "type": "conversation"})
+
+async def validate_comfyui_models(workflow: dict, backend_url: str = None) -> tuple[bool, str]:
     """
     Validates that all models referenced in the workflow are available in ComfyUI.
-    
+
+    Lookups are served from the backend's cached model catalog, which is only
+    refetched from /object_info when its TTL has expired or a model is missing.
+
     Args:
         workflow: The ComfyUI workflow dictionary
-        
+        backend_url: The ComfyUI host the workflow will run on (defaults to the first backend)
+
     Returns:
-        Tuple of (is_valid, error_message)
+        Tuple of (is_valid, error_message); False only when a freshly fetched
+        catalog lacks a model the workflow needs
+
+    Raises:
+        Whatever fetching the catalog raised (connection errors, timeouts, an
+        /object_info error status), so callers can retry a ComfyUI outage
     """
+    backend = comfyui_backends.get(backend_url)
     try:
-        async with aiohttp.ClientSession() as session:
-            # Get available models from ComfyUI
-            async with session.get(f"{settings.comfyui_api_url}/object_info") as response:
-                if response.status != 200:
-                    return False, f"Failed to get ComfyUI model info: {response.status}"
-                
-                object_info = await response.json()
-                
-                # Extract available models
-                available_checkpoints = set()
-                available_loras = set()
-                
-                if "CheckpointLoaderSimple" in object_info:
-                    checkpoint_info = object_info["CheckpointLoaderSimple"]
-                    if "input" in checkpoint_info and "required" in checkpoint_info["input"]:
-                        if "ckpt_name" in checkpoint_info["input"]["required"]:
-                            available_checkpoints = set(checkpoint_info["input"]["required"]["ckpt_name"][0])
-                
-                if "LoraLoader" in object_info:
-                    lora_info = object_info["LoraLoader"]
-                    if "input" in lora_info and "required" in lora_info["input"]:
-                        if "lora_name" in lora_info["input"]["required"]:
-                            available_loras = set(lora_info["input"]["required"]["lora_name"][0])
-                
-                # Check workflow for model references
-                for node_id, node in workflow.items():
-                    if node.get("class_type") == "CheckpointLoaderSimple":
-                        ckpt_name = node.get("inputs", {}).get("ckpt_name")
-                        if ckpt_name and ckpt_name not in available_checkpoints:
-                            return False, f"Checkpoint model '{ckpt_name}' not found. Available: {list(available_checkpoints)[:5]}"
-                    
-                    elif node.get("class_type") == "LoraLoader":
-                        lora_name = node.get("inputs", {}).get("lora_name")
-                        if lora_name and lora_name not in available_loras:
-                            return False, f"LoRA model '{lora_name}' not found. Available: {list(available_loras)[:5]}"
-                
-                return True, "All models validated successfully"
-                
-    except Exception as e:
-        return False, f"Model validation failed: {str(e)}"
-
-async def call_comfyui(prompt_payload: dict):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(f"{settings.comfyui_api_url}/prompt", json=prompt_payload) as response:
-            if response.status != 200:
-                raise Exception(f"ComfyUI Error: {await response.text()}")
-            return await response.json()
-
-async def poll_comfyui_for_result(prompt_id: str):
-    async with aiohttp.ClientSession() as session:
-        start_time = asyncio.get_event_loop().time()
-        while asyncio.get_event_loop().time() - start_time < 900:  # 15 minute timeout
-            async with session.get(f"{settings.comfyui_api_url}/history/{prompt_id}") as response:
+        return await backend.catalog.validate_workflow(workflow)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        comfyui_backends.record_failure(backend.url, str(e) or type(e).__name__)
+        raise
+
+async def call_comfyui(prompt_payload: dict, backend_url: str = None):
+    backend_url = comfyui_backends.get(backend_url).url
+    session = http_clients.session_for(backend_url)
+    timeout = aiohttp.ClientTimeout(total=settings.comfyui_request_timeout)
+    async with session.post(f"{backend_url}/prompt", json=prompt_payload, timeout=timeout) as response:
+        if response.status != 200:
+            raise Exception(f"ComfyUI Error: {await response.text()}")
+        return await response.json()
+
+def select_output_image(outputs: dict, output_node: str = None):
+    """Returns the first image from a prompt's outputs, preferring the template's SaveImage node."""
+    if output_node in outputs and outputs[output_node].get('images'):
+        return outputs[output_node]['images'][0]
+    for output in outputs.values():
+        if output.get('images'):
+            return output['images'][0]
+    return None
+
+async def poll_comfyui_for_result(prompt_id: str, backend_url: str = None, output_node: str = None):
+    backend_url = comfyui_backends.get(backend_url).url
+    session = http_clients.session_for(backend_url)
+    timeout = aiohttp.ClientTimeout(total=settings.comfyui_request_timeout)
+    start_time = asyncio.get_event_loop().time()
+    with COMFYUI_POLL_SECONDS.time(backend=backend_url):
+        while asyncio.get_event_loop().time() - start_time < settings.comfyui_result_timeout:
+            COMFYUI_POLLS.inc(backend=backend_url)
+            async with session.get(f"{backend_url}/history/{prompt_id}", timeout=timeout) as response:
                 if response.status == 200:
                     history = await response.json()
                     if prompt_id in history and history[prompt_id].get("outputs"):
-                        outputs = history[prompt_id]["outputs"]
-                        if '9' in outputs and 'images' in outputs['9']:
-                            return outputs['9']['images'][0]
-            await asyncio.sleep(2)
-    raise Exception("Polling for ComfyUI result timed out.")
+                        image = select_output_image(history[prompt_id]["outputs"], output_node)
+                        if image:
+                            return image
+            await asyncio.sleep(settings.comfyui_poll_interval)
+        raise Exception("Polling for ComfyUI result timed out.")
+
+async def wait_for_comfyui_result(
+    prompt_id: str, backend_url: str = None, on_progress=None, output_node: str = None, on_start=None
+):
+    """
+    Waits for a submitted prompt to finish using the WebSocket tracker of the
+    ComfyUI host that accepted it, falling back to polling that host's
+    /history when the WebSocket is unavailable. `on_start` is called when
+    the tracker sees the prompt begin executing (not when polling).
+    """
+    tracker = comfyui_backends.get(backend_url).tracker
+    if tracker.connected:
+        try:
+            outputs = await tracker.wait(
+                prompt_id, timeout=settings.comfyui_result_timeout, on_progress=on_progress, on_start=on_start
+            )
+            image = select_output_image(outputs, output_node)
+            if image:
+                return image
+            logging.info(f"Prompt {prompt_id} finished without image outputs over WebSocket; fetching history.")
+        except ComfyUITrackerDisconnected as e:
+            logging.warning(f"{e} Falling back to polling for prompt {prompt_id}.")
+        except asyncio.TimeoutError:
+            raise Exception("Waiting for ComfyUI result timed out.")
+    return await poll_comfyui_for_result(prompt_id, backend_url, output_node)
+
+async def cancel_comfyui_prompt(prompt_id: str, backend_url: str = None):
+    """Best-effort removal of a pending prompt from the ComfyUI queue."""
+    try:
+        backend_url = comfyui_backends.get(backend_url).url
+        session = http_clients.session_for(backend_url)
+        timeout = aiohttp.ClientTimeout(total=settings.comfyui_request_timeout)
+        async with session.post(f"{backend_url}/queue", json={"delete": [prompt_id]}, timeout=timeout):
+            pass
+    except Exception as e:
+        logging.warning(f"Failed to remove prompt {prompt_id} from the ComfyUI queue: {e}")
 
-async def run_generation_task(subject_prompt: str, task_name: str, asset_type: str, workflow_filename: str):
+async def run_generation_task(job: dict):
     """
-    Runs the full asset generation pipeline: logs creation, loads the correct
+    Runs one generation job claimed by the scheduler: loads the job's
     workflow, injects the dynamic subject and asset type into the prompt
     template, calls ComfyUI, and broadcasts updates via WebSocket.
+
+    Raises on failure so the scheduler can retry or fail the job.
     """
-    await manager.broadcast({"event": "NEW", "name": task_name, "status": "QUEUED", "asset_type": asset_type})
-    asset_id = -1
+    labels = {"workflow": job['workflow'], "backend": comfyui_backends.get(job.get('backend')).url}
+    trace_id = tracing.job_trace_id(job['id'], job.get('trace_id'))
+    async with tracing.trace("generation", trace_id, job['id'], attempt=job.get('attempts'), **labels):
+        # Time between the job becoming runnable (queued, or due for a retry) and a worker claiming it
+        runnable_since = job.get('queued_at') or job['timestamp']
+        tracing.record_span("scheduler.queue", datetime.fromisoformat(runnable_since).timestamp(), time.time())
+        with GENERATIONS_IN_FLIGHT.track_inprogress(**labels), GENERATION_SECONDS.time(**labels) as timer_labels:
+            cached = await _run_generation_task(job)
+            timer_labels["outcome"] = "cached" if cached else "ok"
+
+async def _run_generation_task(job: dict) -> bool:
+    """Runs a generation job and returns True if its result came from the result cache."""
+    asset_id = job['id']
+    task_name = job['task_name']
+    asset_type = job['asset_type']
+    subject_prompt = job['final_prompt']
+    workflow_filename = job['workflow']
+    parent_id = job.get('parent_id')
+    backend = comfyui_backends.get(job.get('backend'))
+
+    await manager.broadcast({"event": "UPDATE", "name": task_name, "status": "GENERATING", "asset_id": asset_id, "parent_id": parent_id, "asset_type": asset_type})
+
+    # Copy the preloaded template with the subject, asset type and seed filled in
     try:
-        # Log the asset creation attempt first
-        asset_id = log_asset_creation(
-            task_name=task_name,
-            asset_type=asset_type,
-            final_prompt=subject_prompt, # Log the subject prompt for context
-            source_path="placeholder"
-        )
-        if asset_id == -1:
-            raise Exception("Failed to log asset creation in the database.")
-
-        await manager.broadcast({"event": "UPDATE", "name": task_name, "status": "GENERATING", "asset_id": asset_id, "asset_type": asset_type})
-
-        # Load the specified workflow
-        workflow_path = os.path.join(os.path.dirname(settings.gb_project_path), "workflows", workflow_filename)
-        with open(workflow_path, 'r') as f:
-            workflow = json.load(f)
-
-        # Get the prompt template from the workflow
-        prompt_template = workflow["6"]["inputs"]["text"]
-
-        # Replace placeholders with dynamic content
-        final_prompt = prompt_template.replace("[SUBJECT]", subject_prompt).replace("[ASSET_TYPE]", asset_type)
-        
-        # Update the workflow with the final, combined prompt
-        workflow["6"]["inputs"]["text"] = final_prompt
-
-        # Validate models before sending to ComfyUI
-        is_valid, validation_message = await validate_comfyui_models(workflow)
-        if not is_valid:
-            raise Exception(f"Model validation failed: {validation_message}")
-        
-        logging.info(f"Model validation passed: {validation_message}")
-
-        # Send the job to ComfyUI
-        comfy_response = await call_comfyui({"prompt": workflow})
-        prompt_id = comfy_response.get("prompt_id")
-        if not prompt_id:
-            raise Exception(f"ComfyUI did not return a prompt_id. Response: {comfy_response}")
-
-        # Poll for the result
-        image_result = await poll_comfyui_for_result(prompt_id)
-        update_asset_source_path(asset_id, image_result['filename'])
-
-        # Broadcast completion
+        template = workflow_registry.get(workflow_filename)
+    except WorkflowError as e:
+        raise PermanentJobError(str(e))
+    workflow = template.instantiate(subject_prompt, asset_type, job.get('seed'))
+
+    # Identical workflows (prompt, seed, models) produce identical images
+    result_key = None
+    if settings.result_cache_enabled:
+        result_key = workflow_key(workflow)
+        with tracing.span("result_cache.lookup") as span:
+            cached_filename = await result_cache.lookup(result_key, asset_id)
+            if span is not None:
+                span["attributes"]["hit"] = bool(cached_filename)
+        if cached_filename:
+            logging.info(f"Result cache hit for asset {asset_id}; skipping ComfyUI")
+            with tracing.span("finish", cached=True):
+                await finish_generated_asset(job, cached_filename, cached=True)
+            return True
+
+    stage_labels = {"workflow": workflow_filename, "backend": backend.url}
+    # Validate models before sending to ComfyUI; an unreachable catalog raises and is retried
+    with GENERATION_STAGE_SECONDS.time(stage="validate", **stage_labels), tracing.span("comfyui.validate"):
+        is_valid, validation_message = await validate_comfyui_models(workflow, backend.url)
+    if not is_valid:
+        raise PermanentJobError(f"Model validation failed: {validation_message}")
+
+    logging.info(f"Model validation passed: {validation_message}")
+
+    # Send the job to the ComfyUI host the scheduler picked, tagged with that
+    # host's tracker client id so its progress messages reach our listener
+    try:
+        with GENERATION_STAGE_SECONDS.time(stage="submit", **stage_labels), tracing.span("comfyui.submit"):
+            comfy_response = await call_comfyui({"prompt": workflow, "client_id": backend.tracker.client_id}, backend.url)
+    except aiohttp.ClientError as e:
+        comfyui_backends.record_failure(backend.url, str(e))
+        raise
+    prompt_id = comfy_response.get("prompt_id")
+    if not prompt_id:
+        raise Exception(f"ComfyUI did not return a prompt_id. Response: {comfy_response}")
+
+    async def report_progress(progress: dict):
         await manager.broadcast({
             "event": "UPDATE",
             "name": task_name,
-            "status": "COMPLETED",
+            "status": "GENERATING",
             "asset_id": asset_id,
+            "parent_id": parent_id,
             "asset_type": asset_type,
-            "image_url": f"/output/{image_result['filename']}"
+            "progress": progress
         })
-    except Exception as e:
-        logging.error(f"Generation task failed for asset {asset_id}: {e}")
-        await manager.broadcast({"event": "ERROR", "name": task_name, "asset_id": asset_id, "message": str(e), "asset_type": asset_type})
+
+    # Wait for the result, splitting the wait into time queued inside ComfyUI
+    # and time executing when the tracker reports the prompt starting
+    execution = {"submitted": time.time()}
+
+    def mark_started():
+        execution.setdefault("started", time.time())
+
+    try:
+        with GENERATION_STAGE_SECONDS.time(stage="wait", **stage_labels):
+            image_result = await wait_for_comfyui_result(
+                prompt_id, backend.url, on_progress=report_progress, output_node=template.output_node, on_start=mark_started
+            )
+    except asyncio.CancelledError:
+        await cancel_comfyui_prompt(prompt_id, backend.url)
+        raise
+    finally:
+        finished = time.time()
+        if "started" in execution:
+            tracing.record_span("comfyui.queue", execution["submitted"], execution["started"], prompt_id=prompt_id)
+            tracing.record_span("comfyui.execute", execution["started"], finished, prompt_id=prompt_id)
+        else:
+            tracing.record_span("comfyui.wait", execution["submitted"], finished, prompt_id=prompt_id)
+    with GENERATION_STAGE_SECONDS.time(stage="finish", **stage_labels), tracing.span("finish"):
+        if result_key:
+            try:
+                await result_cache.store(result_key, workflow_filename, await ensure_local_output(image_result['filename'], backend.url))
+            except HTTPException as e:
+                logging.warning(f"Could not cache the result of asset {asset_id}: {e.detail}")
+        await finish_generated_asset(job, image_result['filename'], backend.url)
+    return False
+
+async def postprocess_output(filename: str, asset_type: str, backend_url: str = None) -> str:
+    """
+    Converts a generated image into a Game Boy-ready indexed PNG saved next
+    to it and returns the new output filename, or the original filename if
+    the conversion fails.
+    """
+    try:
+        source_path = await ensure_local_output(filename, backend_url)
+        gb_filename = f"{os.path.splitext(filename)[0]}_gb.png"
+        details = await asyncio.to_thread(
+            convert_to_game_boy,
+            source_path,
+            os.path.join(settings.comfyui_output_path, gb_filename),
+            asset_type,
+            resample=settings.gb_postprocess_resample,
+            dither=settings.gb_postprocess_dither
+        )
+    except (HTTPException, OSError, ValueError) as e:
+        logging.error(f"Game Boy post-processing failed for {filename}: {getattr(e, 'detail', e)}")
+        return filename
+    logging.info(
+        f"Converted {filename} to {details['width']}x{details['height']} DMG image "
+        f"({details['bytes_in']} -> {details['bytes_out']} bytes in {details['seconds']}s)"
+    )
+    return gb_filename
+
+async def finish_generated_asset(job: dict, filename: str, backend_url: str = None, cached: bool = False):
+    """Post-processes a job's image, records it as the asset's source and broadcasts completion."""
+    if settings.gb_postprocess_enabled:
+        with tracing.span("postprocess"):
+            filename = await postprocess_output(filename, job['asset_type'], backend_url)
+    await async_db.write(update_asset_source_path, job['id'], filename)
+
+    # Broadcast completion
+    message = {
+        "event": "UPDATE",
+        "name": job['task_name'],
+        "status": "COMPLETED",
+        "asset_id": job['id'],
+        "parent_id": job.get('parent_id'),
+        "asset_type": job['asset_type'],
+        "image_url": f"/output/{filename}"
+    }
+    if cached:
+        message["cached"] = True
+    await manager.broadcast(message)
+
+generation_scheduler = GenerationScheduler(
+    execute=run_generation_task,
+    broadcast=manager.broadcast,
+    concurrency={url: settings.generation_concurrency for url in comfyui_backends.urls},
+    max_attempts=settings.generation_max_attempts,
+    retry_backoff=settings.generation_retry_backoff,
+    retry_backoff_max=settings.generation_retry_backoff_max,
+    default_job_duration=settings.generation_default_duration,
+    backend_load=comfyui_backends.load
+)
+
+async def warm_ollama_model():
+    """Loads the Ollama model without generating anything, which also restarts its keep_alive timer."""
+    payload = {"model": settings.ollama_model, "prompt": "", "stream": False, "keep_alive": settings.ollama_keep_alive}
+    session = http_clients.session_for(settings.ollama_api_url)
+    timeout = aiohttp.ClientTimeout(total=settings.ollama_request_timeout)
+    async with session.post(settings.ollama_api_url, json=payload, timeout=timeout) as response:
+        response.raise_for_status()
+        await response.read()
+
+async def warm_comfyui_template(backend_url: str, workflow_filename: str):
+    """Runs a throwaway one-step, 64x64 prompt of a workflow template so the host loads its models."""
+    backend = comfyui_backends.get(backend_url)
+    template = workflow_registry.get(workflow_filename)
+    # A fresh seed makes ComfyUI sample again rather than answer from its node cache
+    workflow = warmup_prompt(template.instantiate("warm-up", "sprite", random.randrange(2 ** 32)))
+    is_valid, validation_message = await validate_comfyui_models(workflow, backend.url)
+    if not is_valid:
+        raise WarmupSkipped(validation_message)
+    comfy_response = await call_comfyui({"prompt": workflow, "client_id": backend.tracker.client_id}, backend.url)
+    prompt_id = comfy_response.get("prompt_id")
+    if not prompt_id:
+        raise Exception(f"ComfyUI did not return a prompt_id. Response: {comfy_response}")
+    try:
+        await wait_for_comfyui_result(prompt_id, backend.url, output_node=template.output_node)
+    except asyncio.CancelledError:
+        await cancel_comfyui_prompt(prompt_id, backend.url)
+        raise
+
+def comfyui_warmup_targets() -> list[tuple[str, str]]:
+    if not settings.warmup_comfyui_enabled:
+        return []
+    return [
+        (backend.url, workflow_filename)
+        for backend in comfyui_backends.backends.values() if backend.available
+        for workflow_filename in workflow_registry.templates
+    ]
+
+def comfyui_backend_idle(backend_url: str) -> bool:
+    return generation_scheduler.running_on(backend_url) == 0 and comfyui_backends.get(backend_url).queue_depth == 0
+
+model_warmer = ModelWarmer(
+    warm_ollama=warm_ollama_model,
+    warm_comfyui=warm_comfyui_template,
+    comfyui_targets=comfyui_warmup_targets,
+    comfyui_idle=comfyui_backend_idle,
+    interval=settings.warmup_interval,
+    timeout=settings.warmup_timeout,
+    ollama_label=settings.ollama_model
+)
+
+def _save_output(local_path: str, data: bytes):
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    with open(local_path, "wb") as f:
+        f.write(data)
+
+async def ensure_local_output(filename: str, backend_url: str = None) -> str:
+    """
+    Returns the local path of a ComfyUI output image, downloading it through
+    /view from the host that produced it when that host is not this machine.
+    """
+    output_dir = os.path.abspath(settings.comfyui_output_path)
+    local_path = os.path.abspath(os.path.join(output_dir, filename))
+    if os.path.commonpath([output_dir, local_path]) != output_dir:
+        raise HTTPException(status_code=400, detail="Invalid output filename.")
+    if os.path.exists(local_path):
+        return local_path
+
+    if backend_url is None:
+        asset = await async_db.read(get_asset_by_source_path, filename)
+        backend_url = asset['backend'] if asset else None
+    backend = comfyui_backends.get(backend_url)
+    session = http_clients.session_for(backend.url)
+    timeout = aiohttp.ClientTimeout(total=settings.comfyui_request_timeout)
+    params = {"filename": os.path.basename(filename), "subfolder": os.path.dirname(filename), "type": "output"}
+    try:
+        async with session.get(f"{backend.url}/view", params=params, timeout=timeout) as response:
+            if response.status != 200:
+                raise HTTPException(status_code=404, detail=f"Output '{filename}' not found on {backend.url}.")
+            data = await response.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch output '{filename}' from {backend.url}: {e}")
+    await asyncio.to_thread(_save_output, local_path, data)
+    logging.info(f"Fetched output {filename} from ComfyUI backend {backend.url}")
+    return local_path
 
 async def generate_writing_asset(prompt: str, task_name: str):
     """Saves generated text to a file and logs it to the database."""
@@ -362,10 +714,10 @@ async def generate_writing_asset(prompt: str, task_name: str):
         filepath = os.path.join(asset_dir, filename)
         with open(filepath, "w") as f:
             f.write(prompt)
-        asset_id = log_asset_creation(
-            task_name=task_name, asset_type='writing', final_prompt=prompt, source_path=filepath
+        asset_id = await async_db.write(
+            log_asset_creation, task_name=task_name, asset_type='writing', final_prompt=prompt, source_path=filepath
         )
-        update_asset_status(asset_id, 'approved')
+        await async_db.write(update_asset_status, asset_id, 'approved')
         await manager.broadcast({"event": "UPDATE", "name": task_name, "status": "COMPLETED", "asset_id": asset_id})
     except Exception as e:
         logging.error(f"Failed to generate writing asset: {e}")
@@ -383,10 +735,10 @@ async def generate_code_asset(prompt: str, task_name: str):
         filepath = os.path.join(asset_dir, filename)
         with open(filepath, "w") as f:
             f.write(prompt)
-        asset_id = log_asset_creation(
-            task_name=task_name, asset_type='code', final_prompt=prompt, source_path=filepath
+        asset_id = await async_db.write(
+            log_asset_creation, task_name=task_name, asset_type='code', final_prompt=prompt, source_path=filepath
         )
-        update_asset_status(asset_id, 'approved')
+        await async_db.write(update_asset_status, asset_id, 'approved')
         await manager.broadcast({"event": "UPDATE", "name": task_name, "status": "COMPLETED", "asset_id": asset_id})
     except Exception as e:
         logging.error(f"Failed to generate code asset: {e}")
@@ -404,43 +756,63 @@ async def generate_sound_asset(prompt: str, task_name: str):
         filepath = os.path.join(asset_dir, filename)
         with open(filepath, "w") as f:
             f.write(prompt)
-        asset_id = log_asset_creation(
-            task_name=task_name, asset_type='sound', final_prompt=prompt, source_path=filepath
+        asset_id = await async_db.write(
+            log_asset_creation, task_name=task_name, asset_type='sound', final_prompt=prompt, source_path=filepath
         )
-        update_asset_status(asset_id, 'approved')
+        await async_db.write(update_asset_status, asset_id, 'approved')
         await manager.broadcast({"event": "UPDATE", "name": task_name, "status": "COMPLETED", "asset_id": asset_id})
     except Exception as e:
         logging.error(f"Failed to generate sound asset: {e}")
         await manager.broadcast({"event": "ERROR", "name": task_name, "message": str(e)})
 
 # --- API Endpoints ---
+@app.get("/output/{filename:path}")
+async def get_output_image(filename: str):
+    """Serves a generated image, fetching it from whichever ComfyUI host produced it."""
+    return FileResponse(await ensure_local_output(filename))
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, topics: str = ""):
+    """
+    Streams job events. Pass `?topics=job:1,job:2` or send
+    {"action": "subscribe", "topics": [...]} to follow specific jobs only.
+    """
+    client = await manager.connect(websocket, [topic for topic in topics.split(",") if topic])
     try:
         while True:
-            await websocket.receive_text()
-    except:
+            manager.handle_client_message(client, await websocket.receive_text())
+    except Exception:
         manager.disconnect(websocket)
 
 class ChatMessage(BaseModel):
     message: str
     history: list = []
+    priority: int = 0
+    bypass_cache: bool = False
 
 @app.post("/api/v1/chat/{agent_name}")
-async def chat_with_agent(agent_name: str, chat_message: ChatMessage, background_tasks: BackgroundTasks):
+async def chat_with_agent(agent_name: str, chat_message: ChatMessage, background_tasks: BackgroundTasks, response: Response):
     """
     Handles a chat message with a specified agent, logs the interaction,
     and can trigger different generation pipelines.
+
+    The turn is traced; its trace id is returned in the X-Trace-Id header
+    and carried by any generation job it queues.
     """
     if agent_name not in CONVERSATIONAL_AGENTS:
         raise HTTPException(status_code=404, detail="Agent not found")
 
+    async with tracing.trace("chat", agent=agent_name) as chat_trace:
+        response.headers["X-Trace-Id"] = chat_trace.trace_id
+        return await _chat_with_agent(agent_name, chat_message, background_tasks)
+
+async def _chat_with_agent(agent_name: str, chat_message: ChatMessage, background_tasks: BackgroundTasks) -> dict:
     # Get the initial response from the LLM
-    response_data = await call_ollama_agent(agent_name, chat_message.message)
+    response_data = await call_ollama_agent(agent_name, chat_message.message, use_cache=not chat_message.bypass_cache)
 
     # Log the conversation
     background_tasks.add_task(
+        async_db.write,
         log_chat_message,
         user_message=chat_message.message,
         agent_response=json.dumps(response_data),
@@ -450,26 +822,7 @@ async def chat_with_agent(agent_name: str, chat_message: ChatMessage, background
     # Trigger different pipelines based on the agent
     if agent_name == "Art":
         # Extract JSON from conversational response
-        art_json = None
-        response_text = response_data.get("response", "")
-        
-        # Look for JSON in the response text
-        logging.info(f"Searching for JSON in Art agent response: {response_text[:200]}...")
-        # Find JSON objects that contain Art agent fields
-        json_matches = re.findall(r'\{[^{}]*(?:"workflow"|"asset_type"|"prompt")[^{}]*\}', response_text, re.DOTALL)
-        logging.info(f"Found {len(json_matches)} potential JSON matches")
-        if json_matches:
-            # Try to parse each match until we find a valid one
-            for i, match in enumerate(json_matches):
-                logging.info(f"Trying to parse JSON match {i+1}: {match}")
-                try:
-                    art_json = json.loads(match)
-                    if art_json.get("workflow") and art_json.get("asset_type") and art_json.get("prompt"):
-                        logging.info(f"Successfully extracted JSON from Art agent: {art_json}")
-                        break
-                except json.JSONDecodeError as e:
-                    logging.warning(f"Failed to parse JSON match {i+1}: {e}")
-                    continue
+        art_json = extract_art_json(response_data.get("response", ""))
         
         # Get fields from extracted JSON
         workflow = art_json.get("workflow") if art_json else None
@@ -479,8 +832,7 @@ async def chat_with_agent(agent_name: str, chat_message: ChatMessage, background
         logging.info(f"Art agent response: workflow={workflow}, asset_type={asset_type}, prompt={prompt}")
         if workflow and asset_type and prompt:
             task_name = chat_message.message # Use the user's message as the task name
-            logging.info(f"Starting generation task: {task_name} with workflow {workflow}")
-            background_tasks.add_task(run_generation_task, prompt, task_name, asset_type, workflow)
+            await queue_art_generation(art_json, task_name, chat_message.priority)
         else:
             logging.warning(f"Art agent missing required fields: workflow={workflow}, asset_type={asset_type}, prompt={prompt}")
     elif agent_name == "Writing":
@@ -501,112 +853,411 @@ async def chat_with_agent(agent_name: str, chat_message: ChatMessage, background
 
     return response_data
 
+def extract_art_json(response_text: str):
+    """Finds the Art agent's JSON object in its conversational response, or returns None."""
+    art_json = None
+    logging.info(f"Searching for JSON in Art agent response: {response_text[:200]}...")
+    # Find JSON objects that contain Art agent fields
+    json_matches = re.findall(r'\{[^{}]*(?:"workflow"|"asset_type"|"prompt")[^{}]*\}', response_text, re.DOTALL)
+    logging.info(f"Found {len(json_matches)} potential JSON matches")
+    # Try to parse each match until we find a valid one
+    for i, match in enumerate(json_matches):
+        logging.info(f"Trying to parse JSON match {i+1}: {match}")
+        try:
+            art_json = json.loads(match)
+            if art_json.get("workflow") and art_json.get("asset_type") and art_json.get("prompt"):
+                logging.info(f"Successfully extracted JSON from Art agent: {art_json}")
+                break
+        except json.JSONDecodeError as e:
+            logging.warning(f"Failed to parse JSON match {i+1}: {e}")
+            continue
+    return art_json
+
+async def queue_art_generation(art_json: dict, task_name: str, priority: int = 0) -> int:
+    """Queues the image generation requested by an Art agent JSON object."""
+    workflow = art_json["workflow"]
+    logging.info(f"Queueing generation task: {task_name} with workflow {workflow}")
+    with tracing.span("generation.queue", workflow=workflow) as span:
+        asset_id = await generation_scheduler.submit(
+            art_json["prompt"], task_name, art_json["asset_type"], workflow,
+            priority=priority, trace_id=tracing.current_trace_id()
+        )
+        if span is not None:
+            span["attributes"]["asset_id"] = asset_id
+        record_job_ids(asset_id)
+        return asset_id
+
+def sse_event(event: str, data: dict) -> str:
+    """Formats a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/v1/chat/{agent_name}/stream")
+async def stream_chat_with_agent(agent_name: str, chat_message: ChatMessage):
+    """
+    Streams an agent's response as server-sent events while Ollama generates it.
+
+    Emits `token` events with text chunks, a `job` event as soon as an Art
+    agent's JSON object has closed and its generation has been queued (even
+    if the model is still producing trailing text), then a final `done`
+    event with the full response, or an `error` event. If no object was
+    picked up while streaming, the full Art response is searched the way
+    /chat does before `done`.
+    """
+    if agent_name not in CONVERSATIONAL_AGENTS:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    trace_id = tracing.new_trace_id()
+
+    async def event_stream():
+        scanner = JSONObjectScanner()
+        chunks = []
+        art_queued = False
+        async with tracing.trace("chat", trace_id, agent=agent_name, stream=True):
+            try:
+                with tracing.span("ollama.stream", agent=agent_name, model=settings.ollama_model) as span:
+                    async for chunk in stream_ollama_agent(agent_name, chat_message.message, use_cache=not chat_message.bypass_cache):
+                        if not chunks and span is not None:
+                            span["attributes"]["first_token_seconds"] = round(time.time() - span["start"], 4)
+                        chunks.append(chunk)
+                        yield sse_event("token", {"text": chunk})
+                        if agent_name != "Art" or art_queued:
+                            continue
+                        for art_json in scanner.feed(chunk):
+                            if art_json.get("workflow") and art_json.get("asset_type") and art_json.get("prompt"):
+                                asset_id = await queue_art_generation(art_json, chat_message.message, chat_message.priority)
+                                art_queued = True
+                                yield sse_event("job", {"asset_id": asset_id, **art_json})
+                                break
+                response_data = {"response": "".join(chunks), "type": "conversation"}
+                if agent_name == "Art" and not art_queued:
+                    # The scanner found no usable object; fall back to the non-streaming extraction
+                    art_json = extract_art_json(response_data["response"])
+                    if art_json and art_json.get("workflow") and art_json.get("asset_type") and art_json.get("prompt"):
+                        asset_id = await queue_art_generation(art_json, chat_message.message, chat_message.priority)
+                        art_queued = True
+                        yield sse_event("job", {"asset_id": asset_id, **art_json})
+                yield sse_event("done", response_data)
+            except Exception as e:
+                logging.error(f"Streaming chat with {agent_name} failed: {e}")
+                response_data = {"error": f"Streaming from the Ollama agent failed: {e}"}
+                yield sse_event("error", response_data)
+            await async_db.write(
+                log_chat_message,
+                user_message=chat_message.message,
+                agent_response=json.dumps(response_data),
+                agent_name=agent_name
+            )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Trace-Id": trace_id}
+    )
+
 class AssetApproval(BaseModel):
     asset_id: int
     asset_type: str
 
-@app.post("/api/v1/approve_asset")
-async def approve_asset(approval: AssetApproval):
+async def check_tile_budget(image_path: str, asset_name: str) -> dict:
     """
-    Approves an asset, moving it to the project folder, adding it to the
-    .gbsproj file, and updating its status in the database.
+    Counts a background's unique 8x8 tiles before it is written into the
+    project, merging near-duplicate tiles first if that is enabled. Raises
+    a 422 with the tile report when the background is still over budget.
     """
-    asset = get_asset(approval.asset_id)
+    report = await asyncio.to_thread(asset_inspector.tile_stats, image_path, settings.background_tile_budget)
+    if report["over_budget"] and settings.tile_merge_enabled:
+        report = await asyncio.to_thread(
+            merge_tiles_in_file, image_path, settings.tile_merge_max_distance, settings.background_tile_budget
+        )
+    logging.info(
+        f"Background '{asset_name}' uses {report['unique_tiles']}/{report['budget']} unique tiles "
+        f"({report['unique_tiles_with_flips']} counting flipped duplicates)"
+    )
+    if report["over_budget"]:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": f"Background '{asset_name}' exceeds the unique tile budget.", "tiles": report}
+        )
+    return report
+
+def write_assets_to_project(assets: list[dict]) -> list[dict]:
+    """
+    Adds moved assets to the .gbsproj in one session, so any number of them
+    costs one parse, one backup and one write. Returns the assets that could
+    not be added.
+    """
+    failed = []
+    with ProjectSession(settings.gb_project_path, settings.gbsproj_max_backups) as session:
+        for asset in assets:
+            if not session.add_asset(asset['filename'], asset['asset_type'], asset['task_name']):
+                failed.append(asset)
+    return failed
+
+async def add_moved_assets_to_project(assets: list[dict]) -> list[dict]:
+    if not assets:
+        return []
+    try:
+        return await asyncio.to_thread(write_assets_to_project, assets)
+    except Exception as e:
+        logging.error(f"Failed to add assets to the .gbsproj file: {e}")
+        return list(assets)
+
+async def read_asset_for_approval(asset_id: int):
+    asset = await async_db.read(get_asset, asset_id)
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found in database.")
+    return asset
 
+async def stage_approval(approval: AssetApproval, asset) -> dict:
+    """Validates an asset, checks its tile budget and moves it into the project folder."""
     if not asset['source_path'] or asset['source_path'] == 'placeholder':
         raise HTTPException(status_code=400, detail="Asset has no source path to move.")
 
-    source_file_path = os.path.join(settings.comfyui_output_path, asset['source_path'])
-    gb_project_path = settings.gb_project_path
+    with tracing.span("fetch_output"):
+        source_file_path = await ensure_local_output(asset['source_path'], asset['backend'])
 
-    # Step 1: Move the asset to the correct project subfolder
-    success = move_asset(
-        source_path=source_file_path,
-        asset_type=approval.asset_type,
-        project_path=gb_project_path
-    )
+    # Check a background's tile budget before it reaches the project
+    tile_report = None
+    if approval.asset_type == "background":
+        with tracing.span("tile_budget"):
+            tile_report = await check_tile_budget(source_file_path, asset['task_name'])
+
+    with tracing.span("move"):
+        success = move_asset(
+            source_path=source_file_path,
+            asset_type=approval.asset_type,
+            project_path=settings.gb_project_path
+        )
     if not success:
         raise HTTPException(status_code=500, detail=f"Failed to move asset file from {source_file_path}.")
+    return {
+        "id": approval.asset_id,
+        "filename": os.path.basename(source_file_path),
+        "asset_type": approval.asset_type,
+        "task_name": asset['task_name'],
+        "tiles": tile_report,
+    }
 
-    # Step 2: Add the asset to the .gbsproj file
-    gbsproj_success = add_asset_to_project(
-        project_path=gb_project_path,
-        asset_filename=asset['source_path'],
-        asset_type=approval.asset_type,
-        task_name=asset['task_name']
-    )
-    if not gbsproj_success:
-        # Note: The file is moved but not in the project file. This is a partial failure.
-        # For now, we'll raise an error. A more robust system might try to revert the move.
-        raise HTTPException(status_code=500, detail="Failed to add asset to the .gbsproj file after moving.")
+@app.post("/api/v1/approve_asset")
+async def approve_asset(approval: AssetApproval):
+    """
+    Approves an asset, moving it to the project folder, adding it to the
+    .gbsproj file, and updating its status in the database.
+    """
+    asset = await read_asset_for_approval(approval.asset_id)
+    trace_id = tracing.job_trace_id(asset['id'], asset['trace_id'])
+    async with tracing.trace("approve", trace_id, asset['id'], asset_type=approval.asset_type):
+        # Step 1: Move the asset to the correct project subfolder
+        staged = await stage_approval(approval, asset)
+
+        # Step 2: Add the asset to the .gbsproj file
+        with tracing.span("gbsproj.write"):
+            not_added = await add_moved_assets_to_project([staged])
+        if not_added:
+            # Note: The file is moved but not in the project file. This is a partial failure.
+            # For now, we'll raise an error. A more robust system might try to revert the move.
+            raise HTTPException(status_code=500, detail="Failed to add asset to the .gbsproj file after moving.")
+
+        # Step 3: Update the asset's status in the database
+        with tracing.span("db.status"):
+            updated = await async_db.write(update_asset_status, approval.asset_id, "approved")
+        if not updated:
+            # This is also a partial failure state.
+            raise HTTPException(status_code=500, detail="Failed to update asset status in database after project file update.")
+
+    response = {"status": "success", "message": f"Asset {approval.asset_id} approved and moved.", "task_name": staged['task_name']}
+    if staged['tiles'] is not None:
+        response["tiles"] = staged['tiles']
+    return response
+
+class AssetApprovalBatch(BaseModel):
+    approvals: list[AssetApproval]
+
+@app.post("/api/v1/approve_assets")
+async def approve_assets(batch: AssetApprovalBatch):
+    """
+    Approves many assets at once: each is moved into the project, then all
+    of them are added to the .gbsproj with a single write and marked
+    approved in one transaction. Assets that fail are reported individually.
+    """
+    staged, failed = [], []
+    for approval in batch.approvals:
+        try:
+            asset = await read_asset_for_approval(approval.asset_id)
+            trace_id = tracing.job_trace_id(asset['id'], asset['trace_id'])
+            async with tracing.trace("approve", trace_id, asset['id'], asset_type=approval.asset_type, batch=True):
+                staged.append(await stage_approval(approval, asset))
+        except HTTPException as e:
+            failed.append({"asset_id": approval.asset_id, "error": e.detail})
+
+    not_added = {asset['id'] for asset in await add_moved_assets_to_project(staged)}
+    failed.extend({"asset_id": asset_id, "error": "Failed to add asset to the .gbsproj file after moving."} for asset_id in not_added)
+    approved = [asset for asset in staged if asset['id'] not in not_added]
+    if approved and not await async_db.write(update_asset_statuses, [asset['id'] for asset in approved], "approved"):
+        raise HTTPException(status_code=500, detail="Failed to update asset statuses in database after project file update.")
 
-    # Step 3: Update the asset's status in the database
-    if not update_asset_status(approval.asset_id, "approved"):
-        # This is also a partial failure state.
-        raise HTTPException(status_code=500, detail="Failed to update asset status in database after project file update.")
+    return {
+        "status": "success" if not failed else "partial",
+        "approved": [{"asset_id": asset['id'], "task_name": asset['task_name']} for asset in approved],
+        "failed": failed,
+    }
+
+@app.get("/api/v1/assets/{asset_id}/tiles")
+async def get_asset_tiles(asset_id: int):
+    """Reports an asset image's unique tile count against the background tile budget."""
+    asset = await async_db.read(get_asset, asset_id)
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found in database.")
+    if not asset['source_path'] or asset['source_path'] == 'placeholder':
+        raise HTTPException(status_code=400, detail="Asset has no image yet.")
+    image_path = await ensure_local_output(asset['source_path'], asset['backend'])
+    try:
+        return await asyncio.to_thread(asset_inspector.tile_stats, image_path, settings.background_tile_budget)
+    except OSError as e:
+        raise HTTPException(status_code=400, detail=f"Cannot read asset image: {e}")
 
-    return {"status": "success", "message": f"Asset {approval.asset_id} approved and moved.", "task_name": asset['task_name']}
 
+@app.get("/api/v1/jobs/{asset_id}/trace")
+async def get_job_trace(asset_id: int):
+    """
+    Returns a job's trace as a waterfall: the chat turn that queued it (if
+    any), its time queued, ComfyUI submit/queue/execute, post-processing
+    and approval, with offsets from the start of the trace.
+    """
+    asset = await async_db.read(get_asset, asset_id)
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found in database.")
+    trace_id = tracing.job_trace_id(asset_id, asset['trace_id'])
+    spans = await async_db.read(get_trace_spans, trace_id, asset_id)
+    return {"asset_id": asset_id, "trace_id": trace_id, "status": asset['status'], **tracing.waterfall(spans)}
+
+@app.get("/ready")
+async def get_readiness():
+    """Readiness probe: 503 until the Ollama model and every workflow template have warmed up."""
+    if not settings.warmup_enabled:
+        return {"ready": True, "warmup": "disabled"}
+    status = model_warmer.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Exposes latency histograms, counters and in-flight gauges in the Prometheus text format."""
+    WS_CLIENTS.set(len(manager.clients))
+    DB_WRITE_QUEUE.set(async_db.stats()["queued"])
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/v1/comfyui/models")
+async def get_comfyui_models(backend: str = None):
+    """Returns a ComfyUI host's cached model catalog, refreshing it if its TTL has expired."""
+    catalog = comfyui_backends.get(backend).catalog
+    try:
+        await catalog.refresh()
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to refresh ComfyUI model catalog: {e}")
+    return catalog.as_dict()
+
+@app.post("/api/v1/admin/comfyui/models/refresh")
+async def refresh_comfyui_models():
+    """Forces a refresh of every ComfyUI host's model catalog, e.g. after installing new models."""
+    catalogs = {}
+    for backend in comfyui_backends.backends.values():
+        try:
+            await backend.catalog.refresh(force=True)
+            catalogs[backend.url] = backend.catalog.as_dict()
+        except Exception as e:
+            catalogs[backend.url] = {"error": f"Failed to refresh ComfyUI model catalog: {e}"}
+    return catalogs
+
+@app.get("/api/v1/llm_cache")
+async def get_llm_cache_stats():
+    """Returns agent response cache size and hit/miss counters."""
+    return {"enabled": settings.llm_cache_enabled, **(await llm_cache.stats())}
+
+@app.delete("/api/v1/admin/llm_cache")
+async def clear_llm_cache():
+    """Drops every cached agent response."""
+    return {"status": "success", "cleared": await llm_cache.clear()}
+
+@app.get("/api/v1/result_cache")
+async def get_result_cache_stats():
+    """Returns generated image cache size and hit/miss counters."""
+    return {"enabled": settings.result_cache_enabled, **(await result_cache.stats())}
+
+@app.delete("/api/v1/admin/result_cache")
+async def clear_result_cache():
+    """Drops every cached generated image."""
+    return {"status": "success", "cleared": await result_cache.clear()}
+
+@app.get("/api/v1/workflows")
+async def get_workflows():
+    """Returns the loaded workflow templates with their discovered nodes, and any invalid files."""
+    return workflow_registry.status()
+
+@app.post("/api/v1/admin/workflows/reload")
+async def reload_workflows():
+    """Reloads changed workflow templates immediately instead of waiting for the file watcher."""
+    workflow_registry.load_all()
+    return workflow_registry.status()
+
+@app.get("/api/v1/comfyui/backends")
+async def get_comfyui_backends():
+    """Returns health, queue depth and drain state for every ComfyUI host."""
+    return comfyui_backends.status()
+
+class BackendDrain(BaseModel):
+    url: str
+    draining: bool = True
+
+@app.post("/api/v1/admin/comfyui/backends/drain")
+async def drain_comfyui_backend(drain: BackendDrain):
+    """Stops (or resumes) routing new generation jobs to a ComfyUI host."""
+    if not comfyui_backends.set_draining(drain.url, drain.draining):
+        raise HTTPException(status_code=404, detail="Unknown ComfyUI backend.")
+    return comfyui_backends.status()
+
+integration_pipeline = IntegrationPipeline(
+    project_path=settings.gb_project_path,
+    gbs_cli_path=settings.gbs_cli_path,
+    broadcast=manager.broadcast,
+    fetch=lambda asset: ensure_local_output(asset['source_path'], asset['backend']),
+    register=add_moved_assets_to_project,
+    workers=settings.integration_workers,
+    build_timeout=settings.gbs_build_timeout
+)
 
 @app.post("/api/v1/integrate_and_playtest")
 async def integrate_and_playtest(background_tasks: BackgroundTasks):
     """
     Integrates all 'approved' assets into the GB Studio project,
-    compiles it, and launches it in an emulator.
+    compiles it, and launches it in an emulator. The build runs as a
+    subprocess with its output streamed to /ws as BUILD events.
     """
     # 1. Get all approved assets from the database
-    approved_assets = get_approved_assets()
+    approved_assets = await async_db.read(get_approved_assets)
     if not approved_assets:
         return JSONResponse(
             status_code=404,
             content={"status": "error", "message": "No approved assets found to integrate."}
         )
 
-    # 2. Move each asset to the project folder
-    moved_assets = []
-    moved_asset_details = []
-    for asset in approved_assets:
-        # Skip if source_path is missing or a placeholder
-        if not asset['source_path'] or asset['source_path'] == 'placeholder':
-            logging.warning(f"Skipping asset ID {asset['id']} due to missing source path.")
-            continue
-
-        source_path = os.path.join(settings.comfyui_output_path, asset['source_path'])
-        success = move_asset(
-            source_path=source_path,
-            asset_type=asset['asset_type'],
-            project_path=settings.gb_project_path
-        )
-        if success:
-            moved_assets.append(asset['task_name'])
-            moved_asset_details.append({'name': asset['task_name'], 'type': asset['asset_type']})
-            # IMPORTANT: Update status to 'integrated' to prevent re-integration
-            update_asset_status(asset['id'], 'integrated')
-        else:
-            logging.error(f"Failed to move asset: {asset['task_name']} (ID: {asset['id']})")
-
+    # 2. Move the assets into the project folder and register them in the .gbsproj
+    moved_assets, timings = await integration_pipeline.integrate([dict(asset) for asset in approved_assets])
     if not moved_assets:
         return JSONResponse(
             status_code=500,
-            content={"status": "error", "message": "Failed to move any of the approved assets."}
+            content={"status": "error", "message": "Failed to move any of the approved assets.", "timings": timings}
         )
 
     # 3. Compile the project
     logging.info("Starting GB Studio project compilation...")
-    compile_success, rom_path = compile_gb_studio_project(
-        project_path=settings.gb_project_path,
-        gbs_cli_path=settings.gbs_cli_path
-    )
+    compile_success, rom_path = await integration_pipeline.build(timings)
 
     if not compile_success:
         logging.error("GB Studio project compilation failed.")
         return JSONResponse(
             status_code=500,
-            content={"status": "error", "message": "GB Studio project compilation failed."}
+            content={"status": "error", "message": "GB Studio project compilation failed.", "timings": timings}
         )
-    logging.info(f"GB Studio project compiled successfully. ROM at: {rom_path}")
+    logging.info(f"GB Studio project compiled successfully. ROM at: {rom_path} (stage timings: {timings})")
 
     # 4. Launch in emulator (as a background task)
     background_tasks.add_task(
@@ -618,8 +1269,9 @@ async def integrate_and_playtest(background_tasks: BackgroundTasks):
     return {
         "status": "success",
         "message": "Integration and playtesting process initiated.",
-        "moved_assets": moved_asset_details,
-        "rom_path": rom_path
+        "moved_assets": [{'name': asset['task_name'], 'type': asset['asset_type']} for asset in moved_assets],
+        "rom_path": rom_path,
+        "timings": timings
     }
 
 @app.post("/api/v1/execute_generation")
@@ -628,8 +1280,77 @@ async def execute_generation(request: Request, background_tasks: BackgroundTasks
     final_prompt = data.get("prompt")
     task_name = data.get("task_name", "Untitled Asset")
     asset_type = data.get("asset_type", "sprite")
-    background_tasks.add_task(run_generation_task, final_prompt, task_name, asset_type)
-    return JSONResponse(content={"message": "Generation has started."})
+    workflow = data.get("workflow", "workflow_pixel_art.json")
+    priority = int(data.get("priority", 0))
+    try:
+        workflow_registry.get(workflow)
+    except WorkflowError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    asset_id = await generation_scheduler.submit(final_prompt, task_name, asset_type, workflow, priority=priority)
+    record_job_ids(asset_id)
+    return JSONResponse(content={"message": "Generation has been queued.", "asset_id": asset_id})
+
+class GenerationBatch(BaseModel):
+    subjects: list[str]
+    seeds: list[int] = []
+    variations: int = 1
+    workflow: str = "workflow_pixel_art.json"
+    asset_type: str = "sprite"
+    name: str = "Batch"
+    priority: int = 0
+
+@app.post("/api/v1/generation/batch")
+async def create_generation_batch(batch: GenerationBatch):
+    """
+    Queues every subject x seed combination of a workflow as one batch.
+
+    Uses the given seeds, or `variations` random seeds per subject. Items are
+    recorded together and broadcast with the batch's `parent_id`, so clients
+    can follow the whole batch with the `job:<parent_id>` topic.
+    """
+    seeds = batch.seeds or [random.randint(0, 2**32 - 1) for _ in range(max(batch.variations, 1))]
+    items = [(subject, seed) for subject in batch.subjects for seed in seeds]
+    if not items:
+        raise HTTPException(status_code=400, detail="A batch needs at least one subject.")
+    if len(items) > settings.generation_batch_max_items:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {settings.generation_batch_max_items} items.")
+    try:
+        workflow_registry.get(batch.workflow)
+    except WorkflowError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    batch_id, asset_ids = await generation_scheduler.submit_batch(
+        batch.name, batch.asset_type, batch.workflow, items, priority=batch.priority
+    )
+    record_job_ids(*asset_ids)
+    return {
+        "message": "Generation batch has been queued.",
+        "batch_id": batch_id,
+        "items": [
+            {"asset_id": asset_id, "subject": subject, "seed": seed}
+            for asset_id, (subject, seed) in zip(asset_ids, items)
+        ]
+    }
+
+@app.get("/api/v1/generation/batch/{batch_id}")
+async def get_generation_batch_status(batch_id: int):
+    """Returns a batch's per-status counts and items."""
+    batch = await async_db.read(get_generation_batch, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return batch
+
+@app.get("/api/v1/jobs/queue")
+async def get_generation_queue():
+    """Returns generation queue depth, running jobs and the estimated wait."""
+    return await generation_scheduler.queue_status()
+
+@app.post("/api/v1/jobs/{asset_id}/cancel")
+async def cancel_generation_job(asset_id: int):
+    """Cancels a queued or running generation job, whichever worker is running it."""
+    if not await generation_scheduler.cancel(asset_id):
+        raise HTTPException(status_code=404, detail="No queued or running job with that ID.")
+    return {"status": "success", "message": f"Job {asset_id} cancelled.", "asset_id": asset_id}
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
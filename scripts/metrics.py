@@ -0,0 +1,234 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Seconds, from a fast SQLite read up to a long generation or build
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _format_labels(names: tuple, values: tuple, extra: Optional[tuple] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Metric:
+    """Base class for a labelled metric. Label values are stored per label set, in `labelnames` order."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"Unknown labels for {self.name}: {', '.join(sorted(unknown))}")
+        return tuple("" if labels.get(name) is None else str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items: list) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Counts the block as in flight while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state["buckets"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state["count"] if state else 0
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the duration of the block. Yields the label dict so the
+        block can fill in labels known only at the end, such as `outcome`,
+        which otherwise becomes "error" if the block raises and "ok" if not.
+        """
+        labels = dict(labels)
+        started = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            if "outcome" in self.labelnames:
+                labels.setdefault("outcome", "error")
+            raise
+        finally:
+            if "outcome" in self.labelnames:
+                labels.setdefault("outcome", "ok")
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_samples(self, items: list) -> list[str]:
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, state["buckets"]):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+class MetricsRegistry:
+    """Holds the hub's metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def clear(self):
+        """Resets every metric's values (used by tests)."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+REGISTRY = MetricsRegistry()
+
+# Agents (Ollama)
+OLLAMA_REQUEST_SECONDS = REGISTRY.histogram(
+    "hub_ollama_request_seconds", "Agent calls through call_ollama_agent, by outcome (ok, cached, error).", ("agent", "outcome")
+)
+OLLAMA_IN_FLIGHT = REGISTRY.gauge("hub_ollama_requests_in_flight", "Agent calls currently waiting on Ollama.", ("agent",))
+
+# Generation (ComfyUI)
+GENERATION_SECONDS = REGISTRY.histogram(
+    "hub_generation_seconds", "Generation jobs from start to finished asset, by outcome (ok, cached, error).",
+    ("workflow", "backend", "outcome")
+)
+GENERATION_STAGE_SECONDS = REGISTRY.histogram(
+    "hub_generation_stage_seconds", "Time spent in each stage of a generation job.", ("stage", "workflow", "backend")
+)
+GENERATIONS_IN_FLIGHT = REGISTRY.gauge("hub_generations_in_flight", "Generation jobs currently running.", ("workflow", "backend"))
+COMFYUI_POLL_SECONDS = REGISTRY.histogram(
+    "hub_comfyui_poll_seconds", "Time spent polling ComfyUI /history for a result.", ("backend", "outcome")
+)
+COMFYUI_POLLS = REGISTRY.counter("hub_comfyui_polls_total", "Requests made to ComfyUI /history while polling.", ("backend",))
+
+# Model warm-up
+WARMUP_SECONDS = REGISTRY.histogram(
+    "hub_warmup_seconds", "Loading a model ahead of use, per Ollama model or workflow template and host.", ("target", "backend", "outcome")
+)
+
+# Database
+DB_CALL_SECONDS = REGISTRY.histogram(
+    "hub_db_call_seconds", "Database calls as seen by the caller, including time queued for the writer thread.",
+    ("function", "kind")
+)
+DB_WRITE_BATCH_SIZE = REGISTRY.histogram(
+    "hub_db_write_batch_size", "Writes committed per database transaction.", (), buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+DB_WRITE_QUEUE = REGISTRY.gauge("hub_db_write_queue", "Database writes waiting for the writer thread.")
+
+# Project integration
+GBSPROJ_WRITE_SECONDS = REGISTRY.histogram("hub_gbsproj_write_seconds", "Backing up and rewriting the .gbsproj file.", ("outcome",))
+GBSPROJ_ASSETS_ADDED = REGISTRY.counter("hub_gbsproj_assets_added_total", "Assets added to the .gbsproj file.", ("asset_type",))
+GBS_COMPILE_SECONDS = REGISTRY.histogram("hub_gbs_compile_seconds", "GB Studio CLI builds.", ("outcome",))
+GBS_COMPILES_IN_FLIGHT = REGISTRY.gauge("hub_gbs_compiles_in_flight", "GB Studio CLI builds currently running.")
+
+# WebSocket fan-out
+WS_CLIENTS = REGISTRY.gauge("hub_ws_clients", "Connected dashboard WebSocket clients.")
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from typing import Callable
+
+import aiohttp
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# (node class, input name) pairs that list the models ComfyUI has on disk
+CATALOG_SOURCES = {
+    "checkpoints": ("CheckpointLoaderSimple", "ckpt_name"),
+    "loras": ("LoraLoader", "lora_name"),
+    "vaes": ("VAELoader", "vae_name"),
+}
+
+# Workflow node class -> (catalog key, input name) used when validating a workflow
+VALIDATED_NODES = {
+    "CheckpointLoaderSimple": ("checkpoints", "ckpt_name", "Checkpoint"),
+    "LoraLoader": ("loras", "lora_name", "LoRA"),
+    "VAELoader": ("vaes", "vae_name", "VAE"),
+}
+
+def parse_model_options(object_info: dict, node_class: str, input_name: str) -> set:
+    """
+    Extracts the list of selectable values for a combo input from /object_info.
+
+    Handles both the legacy `[[...options]]` shape and the newer
+    `["COMBO", {"options": [...]}]` shape.
+    """
+    spec = object_info.get(node_class, {}).get("input", {}).get("required", {}).get(input_name)
+    if not spec:
+        return set()
+    if isinstance(spec[0], list):
+        return set(spec[0])
+    if len(spec) > 1 and isinstance(spec[1], dict):
+        return set(spec[1].get("options", []))
+    return set()
+
+class ModelCatalog:
+    """
+    In-memory cache of the checkpoint, LoRA and VAE names a ComfyUI server
+    exposes through /object_info. The catalog is refreshed when its TTL expires
+    or on demand, and concurrent callers share a single in-flight refresh.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        session_provider: Callable[[str], aiohttp.ClientSession],
+        ttl: float = 300.0,
+        request_timeout: float = 60.0,
+        miss_refresh_interval: float = 30.0
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.request_timeout = request_timeout
+        self.miss_refresh_interval = miss_refresh_interval
+        self._session_provider = session_provider
+        self._models: dict[str, set] = {key: set() for key in CATALOG_SOURCES}
+        self._fetched_at: float = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_fresh(self) -> bool:
+        return self._fetched_at > 0 and time.monotonic() - self._fetched_at < self.ttl
+
+    def invalidate(self):
+        """Marks the catalog as stale so the next lookup refetches it."""
+        self._fetched_at = 0.0
+
+    async def refresh(self, force: bool = False) -> dict[str, set]:
+        """Fetches /object_info if the catalog is stale (or forced) and returns the model sets."""
+        if not force and self.is_fresh:
+            return self._models
+        requested_at = time.monotonic()
+        async with self._lock:
+            # Another caller may have refreshed while we waited for the lock
+            if self._fetched_at >= requested_at or (not force and self.is_fresh):
+                return self._models
+            session = self._session_provider(self.base_url)
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+            async with session.get(f"{self.base_url}/object_info", timeout=timeout) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to get ComfyUI model info: {response.status}")
+                object_info = await response.json()
+            self._models = {
+                key: parse_model_options(object_info, node_class, input_name)
+                for key, (node_class, input_name) in CATALOG_SOURCES.items()
+            }
+            self._fetched_at = time.monotonic()
+            logging.info(
+                f"Refreshed ComfyUI model catalog: {len(self._models['checkpoints'])} checkpoints, "
+                f"{len(self._models['loras'])} LoRAs, {len(self._models['vaes'])} VAEs"
+            )
+            return self._models
+
+    async def validate_workflow(self, workflow: dict) -> tuple[bool, str]:
+        """
+        Validates that all models referenced in an API-format workflow are available.
+
+        A miss triggers one forced refresh (rate-limited by miss_refresh_interval)
+        so that models added to ComfyUI since the last refresh are picked up.
+
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        models = await self.refresh()
+        missing = self._find_missing(workflow, models)
+        if missing and time.monotonic() - self._fetched_at >= self.miss_refresh_interval:
+            models = await self.refresh(force=True)
+            missing = self._find_missing(workflow, models)
+        if missing:
+            return False, missing
+        return True, "All models validated successfully"
+
+    @staticmethod
+    def _find_missing(workflow: dict, models: dict[str, set]):
+        for node_id, node in workflow.items():
+            target = VALIDATED_NODES.get(node.get("class_type"))
+            if not target:
+                continue
+            catalog_key, input_name, label = target
+            value = node.get("inputs", {}).get(input_name)
+            if value and value not in models[catalog_key]:
+                return f"{label} model '{value}' not found. Available: {sorted(models[catalog_key])[:5]}"
+        return None
+
+    def as_dict(self) -> dict:
+        """Returns a JSON-serialisable view of the catalog."""
+        age = time.monotonic() - self._fetched_at if self._fetched_at else None
+        return {
+            **{key: sorted(values) for key, values in self._models.items()},
+            "age_seconds": round(age, 1) if age is not None else None,
+            "ttl_seconds": self.ttl,
+        }
@@ -0,0 +1,185 @@
+import asyncio
+import copy
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from scripts.metrics import WARMUP_SECONDS
+from scripts.workflow_registry import LATENT_CLASSES, OUTPUT_CLASSES, SAMPLER_CLASSES, find_nodes
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Throwaway warm-up prompts render one small image in a single step; that is
+# enough for ComfyUI to load the checkpoint, LoRAs and VAE onto the GPU
+WARMUP_IMAGE_SIZE = 64
+WARMUP_STEPS = 1
+RESIZE_CLASSES = {"LatentUpscale", "ImageScale"}
+
+def warmup_prompt(workflow: dict) -> dict:
+    """
+    Returns a cheap copy of an instantiated workflow that still loads every
+    model it uses: latents and resizes shrunk to 64x64, samplers cut to one
+    step, and SaveImage swapped for PreviewImage so nothing is written to
+    the output folder.
+    """
+    workflow = copy.deepcopy(workflow)
+    for node_id in find_nodes(workflow, LATENT_CLASSES | RESIZE_CLASSES):
+        inputs = workflow[node_id]["inputs"]
+        for key in ("width", "height"):
+            if key in inputs:
+                inputs[key] = WARMUP_IMAGE_SIZE
+        if "batch_size" in inputs:
+            inputs["batch_size"] = 1
+    for node_id in find_nodes(workflow, SAMPLER_CLASSES):
+        inputs = workflow[node_id]["inputs"]
+        inputs["steps"] = WARMUP_STEPS
+        if "end_at_step" in inputs:
+            inputs["end_at_step"] = WARMUP_STEPS
+        if "start_at_step" in inputs:
+            inputs["start_at_step"] = 0
+    for node_id in find_nodes(workflow, OUTPUT_CLASSES):
+        workflow[node_id] = {"class_type": "PreviewImage", "inputs": {"images": workflow[node_id]["inputs"]["images"]}}
+    return workflow
+
+class WarmupSkipped(Exception):
+    """Raised by a warm-up callable when the target cannot be warmed as things stand, e.g. its models are not installed."""
+
+def _new_state() -> dict:
+    return {"status": "pending", "warming": False, "seconds": None, "warmed_at": None, "error": None}
+
+class ModelWarmer:
+    """
+    Loads the models the hub depends on before users need them and keeps
+    them resident: the Ollama model (`warm_ollama`) and, on every ComfyUI
+    host, the models of each workflow template (`warm_comfyui(backend,
+    template)` for each pair from `comfyui_targets()`).
+
+    The first pass runs in the background from startup; the hub is ready
+    once every target has warmed. Afterwards targets are re-warmed every
+    `interval` seconds (0 disables re-warming), ComfyUI ones only while
+    `comfyui_idle(backend)` says the host has no work of its own, since a
+    busy host keeps its models loaded anyway. Failed targets are retried
+    after `retry_delay` seconds. Targets raising WarmupSkipped (a template
+    whose models are missing) do not hold up readiness and are tried again
+    with the next re-warm.
+    """
+
+    def __init__(
+        self,
+        warm_ollama: Callable[[], Awaitable],
+        warm_comfyui: Callable[[str, str], Awaitable],
+        comfyui_targets: Callable[[], list[tuple[str, str]]],
+        comfyui_idle: Optional[Callable[[str], bool]] = None,
+        interval: float = 600.0,
+        timeout: float = 600.0,
+        retry_delay: float = 30.0,
+        ollama_label: str = "ollama"
+    ):
+        self._warm_ollama = warm_ollama
+        self._warm_comfyui = warm_comfyui
+        self._comfyui_targets = comfyui_targets
+        self._comfyui_idle = comfyui_idle or (lambda backend: True)
+        self.interval = interval
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.ollama_label = ollama_label
+        self.ollama = _new_state()
+        self.comfyui: dict[tuple[str, str], dict] = {}
+        self.passes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        states = [self.ollama, *self.comfyui.values()]
+        return self.passes > 0 and all(state["status"] in ("warm", "skipped") for state in states)
+
+    def start(self):
+        """Starts warming in the background; returns immediately."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.warm_all()
+            except Exception as e:
+                logging.error(f"Model warm-up pass failed: {e}")
+            failed = any(state["status"] == "error" for state in [self.ollama, *self.comfyui.values()])
+            if failed:
+                await asyncio.sleep(min(self.retry_delay, self.interval) if self.interval > 0 else self.retry_delay)
+            elif self.interval > 0:
+                await asyncio.sleep(self.interval)
+            else:
+                return
+
+    def _due(self, state: dict, now: float) -> bool:
+        if state["status"] in ("pending", "error"):
+            return True
+        return self.interval > 0 and now - (state["warmed_at"] or 0.0) >= self.interval
+
+    async def warm_all(self):
+        """Warms every target that has not warmed yet, failed, or is due for re-warming."""
+        now = time.time()
+        targets = list(self._comfyui_targets())
+        # Templates or hosts that went away no longer count towards readiness
+        self.comfyui = {target: self.comfyui.get(target) or _new_state() for target in targets}
+        by_backend: dict[str, list[str]] = {}
+        for backend, template in targets:
+            by_backend.setdefault(backend, []).append(template)
+
+        async def warm_backend(backend: str, templates: list[str]):
+            # One template at a time, so warm-up never competes with itself for the GPU
+            for template in templates:
+                state = self.comfyui[(backend, template)]
+                if not self._due(state, now):
+                    continue
+                if state["status"] == "warm" and not self._comfyui_idle(backend):
+                    continue
+                await self._warm(state, lambda: self._warm_comfyui(backend, template), template, backend)
+
+        jobs = [warm_backend(backend, templates) for backend, templates in by_backend.items()]
+        if self._due(self.ollama, now):
+            jobs.append(self._warm(self.ollama, self._warm_ollama, self.ollama_label, "ollama"))
+        await asyncio.gather(*jobs)
+        self.passes += 1
+
+    async def _warm(self, state: dict, warm: Callable[[], Awaitable], target: str, backend: str):
+        state["warming"] = True
+        started = time.perf_counter()
+        with WARMUP_SECONDS.time(target=target, backend=backend) as labels:
+            try:
+                await asyncio.wait_for(warm(), timeout=self.timeout)
+            except WarmupSkipped as e:
+                labels["outcome"] = "skipped"
+                state.update(status="skipped", error=str(e), warmed_at=time.time())
+                logging.warning(f"Not warming {target} on {backend}: {e}")
+            except Exception as e:
+                labels["outcome"] = "error"
+                state.update(status="error", error=str(e) or type(e).__name__)
+                logging.warning(f"Warming {target} on {backend} failed: {state['error']}")
+            else:
+                state.update(status="warm", error=None, warmed_at=time.time())
+                logging.info(f"Warmed {target} on {backend} in {time.perf_counter() - started:.1f}s")
+            finally:
+                state["warming"] = False
+                state["seconds"] = round(time.perf_counter() - started, 3)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "passes": self.passes,
+            "ollama": {"model": self.ollama_label, **self.ollama},
+            "comfyui": [
+                {"backend": backend, "workflow": template, **state}
+                for (backend, template), state in self.comfyui.items()
+            ],
+        }
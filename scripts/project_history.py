@@ -0,0 +1,129 @@
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict, deque
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def summarize_agent_response(agent_response: str, max_chars: int) -> str:
+    """
+    Reduces a logged agent response (usually the raw JSON payload returned by
+    call_ollama_agent) to its readable text, without <think> blocks, collapsed
+    to a single line and truncated to max_chars.
+    """
+    text = agent_response or ""
+    try:
+        payload = json.loads(text)
+        if isinstance(payload, dict):
+            text = payload.get("response") or payload.get("error") or text
+    except (json.JSONDecodeError, TypeError):
+        pass
+    text = re.sub(r"<think>.*?</think>", "", str(text), flags=re.DOTALL)
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars - 3].rstrip() + "..."
+    return text
+
+class ProjectHistory:
+    """
+    In-memory summary of recent conversations and assets for the PM prompt.
+
+    The summary is loaded from the database once and then kept up to date by
+    the database write functions, so building the PM prompt needs no queries.
+    Rendering drops the oldest conversations until the text fits the
+    approximate token budget (about four characters per token).
+    """
+
+    def __init__(self, max_conversations: int = 10, max_assets: int = 10, token_budget: int = 1500, response_chars: int = 400):
+        self._lock = threading.Lock()
+        self.configure(max_conversations, max_assets, token_budget, response_chars)
+
+    def configure(self, max_conversations: int, max_assets: int, token_budget: int, response_chars: int):
+        with self._lock:
+            self.max_conversations = max_conversations
+            self.max_assets = max_assets
+            self.token_budget = token_budget
+            self.response_chars = response_chars
+            self.loaded = False
+            self._conversations: deque = deque(maxlen=max_conversations)
+            self._assets: OrderedDict[int, dict] = OrderedDict()
+            self._rendered = None
+
+    def load(self, conversation_rows: list, asset_rows: list):
+        """Seeds the summary from rows ordered newest first, as returned by the database."""
+        with self._lock:
+            self._conversations.clear()
+            for row in reversed(conversation_rows):
+                self._conversations.append(self._conversation_line(row['user_message'], row['agent_response']))
+            self._assets.clear()
+            for row in reversed(asset_rows):
+                self._assets[row['id']] = dict(row)
+            self._trim_assets()
+            self._rendered = None
+            self.loaded = True
+
+    def record_conversation(self, user_message: str, agent_response: str):
+        with self._lock:
+            if not self.loaded:
+                return
+            self._conversations.append(self._conversation_line(user_message, agent_response))
+            self._rendered = None
+
+    def record_asset(self, asset_id: int, task_name: str, asset_type: str, status: str, timestamp: str):
+        with self._lock:
+            if not self.loaded:
+                return
+            self._assets[asset_id] = {
+                "id": asset_id, "task_name": task_name, "asset_type": asset_type,
+                "status": status, "timestamp": timestamp
+            }
+            self._assets.move_to_end(asset_id)
+            self._trim_assets()
+            self._rendered = None
+
+    def record_asset_status(self, asset_id: int, status: str):
+        with self._lock:
+            if not self.loaded or asset_id not in self._assets:
+                return
+            self._assets[asset_id]["status"] = status
+            self._rendered = None
+
+    def render(self) -> str:
+        """Returns the history text, rebuilding it only after a change."""
+        with self._lock:
+            if self._rendered is None:
+                self._rendered = self._build()
+            return self._rendered
+
+    def _conversation_line(self, user_message: str, agent_response: str) -> str:
+        user_text = summarize_agent_response(user_message, self.response_chars)
+        agent_text = summarize_agent_response(agent_response, self.response_chars)
+        return f"- User: {user_text}\n  - Agent: {agent_text}"
+
+    def _trim_assets(self):
+        while len(self._assets) > self.max_assets:
+            self._assets.popitem(last=False)
+
+    def _build(self) -> str:
+        asset_part = ""
+        if self._assets:
+            asset_part = "\n== Recent Assets ==\n" + "\n".join(
+                f"- [{a['timestamp']}] {a['task_name']} (Type: {a['asset_type']}, Status: {a['status']})"
+                for a in reversed(self._assets.values())
+            )
+
+        budget_chars = self.token_budget * 4 - len(asset_part)
+        conversation_lines = list(self._conversations)
+        while conversation_lines and sum(len(line) + 1 for line in conversation_lines) > budget_chars:
+            conversation_lines.pop(0)
+
+        history_parts = []
+        if conversation_lines:
+            history_parts.append("== Recent Conversations ==")
+            history_parts.append("\n".join(conversation_lines))
+        if asset_part:
+            history_parts.append(asset_part)
+        return "\n".join(history_parts) if history_parts else "No project history found."
+
+project_history = ProjectHistory()
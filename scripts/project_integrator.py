@@ -1,23 +1,32 @@
+import asyncio
 import subprocess
 import shutil
 import os
 import logging
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from scripts.metrics import GBS_COMPILE_SECONDS, GBS_COMPILES_IN_FLIGHT
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+ASSET_DESTINATIONS = {
+    "sprite": "assets/sprites",
+    "background": "assets/backgrounds",
+    "music": "assets/music",
+    "ui": "assets/ui"
+}
+
+# Longest line of build output read in one piece; asyncio's default is 64 KiB
+BUILD_OUTPUT_LINE_LIMIT = 1024 * 1024
+
 def move_asset(source_path: str, asset_type: str, project_path: str) -> bool:
     """Moves a file to the correct asset subfolder based on its type."""
     if not os.path.exists(source_path):
         logging.error(f"Asset move failed: Source file not found at {source_path}")
         return False
 
-    destination_map = {
-        "sprite": "assets/sprites",
-        "background": "assets/backgrounds",
-        "music": "assets/music",
-        "ui": "assets/ui"
-    }
-    subfolder = destination_map.get(asset_type.lower())
+    subfolder = ASSET_DESTINATIONS.get(asset_type.lower())
     if not subfolder:
         logging.error(f"Asset move failed: Unknown asset type '{asset_type}'")
         return False
@@ -37,6 +46,12 @@ def compile_gb_studio_project(project_path: str, gbs_cli_path: str) -> (bool, st
     if not os.path.exists(gbs_cli_path):
         logging.error(f"GB Studio CLI not found at the configured path: {gbs_cli_path}")
         return False, ""
+    with GBS_COMPILES_IN_FLIGHT.track_inprogress(), GBS_COMPILE_SECONDS.time() as labels:
+        success, rom_path = _run_gb_studio_build(project_path, gbs_cli_path)
+        labels["outcome"] = "ok" if success else "error"
+    return success, rom_path
+
+def _run_gb_studio_build(project_path: str, gbs_cli_path: str) -> (bool, str):
     try:
         process = subprocess.run(
             [gbs_cli_path, "build", "--destination", "build/web"],
@@ -49,6 +64,77 @@ def compile_gb_studio_project(project_path: str, gbs_cli_path: str) -> (bool, st
         logging.error(f"GB Studio compilation failed: {e.stderr}")
         return False, ""
 
+async def compile_gb_studio_project_async(
+    project_path: str,
+    gbs_cli_path: str,
+    on_output: Optional[Callable[[str], Awaitable[None]]] = None,
+    timeout: Optional[float] = None
+) -> (bool, str):
+    """
+    Compiles the GB Studio project like compile_gb_studio_project, but runs
+    the CLI as an asyncio subprocess so the event loop keeps serving
+    requests during the build. Each line of build output is passed to
+    `on_output` as it is produced. The build is killed after `timeout` seconds.
+    """
+    if not os.path.exists(gbs_cli_path):
+        logging.error(f"GB Studio CLI not found at the configured path: {gbs_cli_path}")
+        return False, ""
+    with GBS_COMPILES_IN_FLIGHT.track_inprogress(), GBS_COMPILE_SECONDS.time() as labels:
+        success, rom_path = await _run_gb_studio_build_async(project_path, gbs_cli_path, on_output, timeout)
+        labels["outcome"] = "ok" if success else "error"
+    return success, rom_path
+
+async def _run_gb_studio_build_async(project_path: str, gbs_cli_path: str, on_output, timeout: Optional[float]) -> (bool, str):
+    try:
+        process = await asyncio.create_subprocess_exec(
+            gbs_cli_path, "build", "--destination", "build/web",
+            cwd=project_path, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            limit=BUILD_OUTPUT_LINE_LIMIT
+        )
+    except OSError as e:
+        logging.error(f"Failed to start GB Studio CLI: {e}")
+        return False, ""
+
+    tail = deque(maxlen=50)
+
+    async def pump_output():
+        async for raw_line in process.stdout:
+            line = raw_line.decode("utf-8", errors="replace").rstrip()
+            tail.append(line)
+            if on_output is not None:
+                await on_output(line)
+
+    async def kill():
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        await process.wait()
+
+    try:
+        await asyncio.wait_for(asyncio.gather(pump_output(), process.wait()), timeout=timeout)
+    except asyncio.TimeoutError:
+        await kill()
+        logging.error(f"GB Studio compilation timed out after {timeout}s")
+        return False, ""
+    except ValueError as e:
+        # A line of output longer than BUILD_OUTPUT_LINE_LIMIT; the build would keep running unread
+        await kill()
+        logging.error(f"GB Studio compilation aborted, unreadable build output: {e}")
+        return False, ""
+    except asyncio.CancelledError:
+        await kill()
+        raise
+
+    if process.returncode != 0:
+        output = "\n".join(tail)
+        logging.error(f"GB Studio compilation failed with exit code {process.returncode}: {output}")
+        return False, ""
+    logging.info("GB Studio project compiled successfully.")
+    rom_path = os.path.join(project_path, "build/web/game.gb")
+    return True, rom_path
+
 def launch_in_emulator(rom_path: str, emulator_path: str) -> bool:
     """Launches a given ROM file in a specific emulator application on macOS."""
     if not os.path.exists(rom_path):
@@ -0,0 +1,234 @@
+"""
+Replays API traffic captured by the hub's traffic capture middleware
+(TRAFFIC_CAPTURE_ENABLED) against a hub, keeping the captured timing at
+1x, N times faster, or as fast as possible. With --fake-backends the hub
+is started locally against fake Ollama and ComfyUI servers, as in
+benchmark.py, so studio burst patterns can be reproduced on any machine.
+
+    python -m scripts.replay captures/requests.jsonl --target http://127.0.0.1:8000 --speed 1
+    python -m scripts.replay captures/requests.jsonl.1 captures/requests.jsonl --speed 10 --fake-backends
+    python -m scripts.replay captures/requests.jsonl --speed max --fake-backends --comfyui-latency 2.0
+
+Approvals are sent only for jobs the replay itself queued (captured asset
+IDs are mapped to the new ones), so a replay never approves unrelated assets.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Optional
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import httpx
+
+from scripts.benchmark import add_fake_backend_arguments, fake_counts, fake_hub, summarize
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+APPROVAL_PATHS = ("/api/v1/approve_asset", "/api/v1/approve_assets")
+
+def load_capture(paths: list[str]) -> list[dict]:
+    """Reads captured requests from one or more JSONL files (e.g. rotated ones), in arrival order."""
+    entries = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping malformed line {line_number} of {path}")
+                    continue
+                if entry.get("method") and entry.get("path") and entry.get("ts") is not None:
+                    entries.append(entry)
+    return sorted(entries, key=lambda entry: entry["ts"])
+
+def parse_speed(value: str) -> float:
+    """'max' (or 0) replays without waiting; otherwise a multiple of the captured pace, e.g. 1 or 10."""
+    if value.lower() in ("max", "0"):
+        return 0.0
+    speed = float(value.lower().rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+def schedule(entries: list[dict], speed: float) -> list[float]:
+    """Seconds after the start of the replay at which each entry is sent."""
+    if not entries or speed == 0:
+        return [0.0] * len(entries)
+    first = entries[0]["ts"]
+    return [(entry["ts"] - first) / speed for entry in entries]
+
+def route_name(entry: dict) -> str:
+    """Groups requests by endpoint; IDs in paths are collapsed so per-job calls share a row."""
+    parts = [("{id}" if part.isdigit() else part) for part in entry["path"].split("/")]
+    return f"{entry['method']} {'/'.join(parts)}"
+
+class Replayer:
+    """Sends captured requests on schedule and collects per-endpoint latencies."""
+
+    def __init__(self, target: str, speed: float, concurrency: int = 64, timeout: float = 600.0):
+        self.target = target.rstrip("/")
+        self.speed = speed
+        self.concurrency = max(concurrency, 1)
+        self.timeout = timeout
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+        self.send_lag: list[float] = []
+        self.job_map: dict[int, int] = {}
+        self.captured_jobs = 0
+        self.replayed_jobs = 0
+        self.skipped = 0
+        self._limit = asyncio.Semaphore(self.concurrency)
+
+    def _map_approval(self, entry: dict) -> Optional[dict]:
+        """Rewrites an approval's captured asset IDs to the jobs this replay queued, or returns None to skip it."""
+        body = dict(entry.get("body") or {})
+        if entry["path"].endswith("/approve_assets"):
+            approvals = [
+                {**approval, "asset_id": self.job_map[approval["asset_id"]]}
+                for approval in body.get("approvals", []) if approval.get("asset_id") in self.job_map
+            ]
+            return {**body, "approvals": approvals} if approvals else None
+        if body.get("asset_id") not in self.job_map:
+            return None
+        return {**body, "asset_id": self.job_map[body["asset_id"]]}
+
+    def _record_jobs(self, entry: dict, new_ids: list[int]):
+        captured = entry.get("job_ids") or []
+        self.captured_jobs += len(captured)
+        self.replayed_jobs += len(new_ids)
+        self.job_map.update(zip(captured, new_ids))
+
+    async def _send(self, client: httpx.AsyncClient, entry: dict, body) -> tuple[int, list[int]]:
+        url = entry["path"] + (f"?{entry['query']}" if entry.get("query") else "")
+        kwargs = {"json": body} if body is not None else {}
+        if entry["path"].endswith("/stream"):
+            new_ids, event = [], None
+            async with client.stream(entry["method"], url, **kwargs) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[7:]
+                    elif line.startswith("data: ") and event == "job":
+                        new_ids.append(json.loads(line[6:])["asset_id"])
+            return response.status_code, new_ids
+        response = await client.request(entry["method"], url, **kwargs)
+        new_ids = []
+        if response.headers.get("content-type", "").startswith("application/json"):
+            payload = response.json()
+            if isinstance(payload, dict):
+                if isinstance(payload.get("asset_id"), int):
+                    new_ids.append(payload["asset_id"])
+                new_ids.extend(item["asset_id"] for item in payload.get("items", []) if isinstance(item, dict) and "asset_id" in item)
+        return response.status_code, new_ids
+
+    async def _replay_one(self, client: httpx.AsyncClient, entry: dict, at: float, started: float):
+        delay = at - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with self._limit:
+            self.send_lag.append(max(time.perf_counter() - started - at, 0.0))
+            body = entry.get("body")
+            if entry["path"] in APPROVAL_PATHS:
+                body = self._map_approval(entry)
+                if body is None:
+                    self.skipped += 1
+                    return
+            name = route_name(entry)
+            sent = time.perf_counter()
+            try:
+                status, new_ids = await self._send(client, entry, body)
+                outcome = str(status)
+            except httpx.HTTPError as e:
+                new_ids, outcome = [], type(e).__name__
+            self.latencies.setdefault(name, []).append(time.perf_counter() - sent)
+            counts = self.statuses.setdefault(name, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+            self._record_jobs(entry, new_ids)
+
+    async def run(self, entries: list[dict]) -> dict:
+        offsets = schedule(entries, self.speed)
+        limits = httpx.Limits(max_connections=self.concurrency + 10)
+        async with httpx.AsyncClient(base_url=self.target, timeout=httpx.Timeout(self.timeout), limits=limits) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(self._replay_one(client, entry, at, started) for entry, at in zip(entries, offsets)))
+            elapsed = time.perf_counter() - started
+        return {
+            "requests": len(entries),
+            "skipped_approvals": self.skipped,
+            "speed": self.speed or "max",
+            "captured_seconds": round(entries[-1]["ts"] - entries[0]["ts"], 3) if entries else 0.0,
+            "duration_seconds": round(elapsed, 3),
+            "captured_jobs": self.captured_jobs,
+            "replayed_jobs": self.replayed_jobs,
+            "send_lag": summarize(self.send_lag),
+            "routes": {
+                name: {**summarize(values), "statuses": self.statuses.get(name, {})}
+                for name, values in sorted(self.latencies.items())
+            },
+        }
+
+def format_report(report: dict) -> str:
+    lines = [f"{'':<40}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses"]
+    for name, stats in report["routes"].items():
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(stats["statuses"].items()))
+        lines.append(f"{name:<40}{stats['count']:>7}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}  {statuses}")
+    pace = "max speed" if report["speed"] == "max" else f"{report['speed']}x"
+    lines.append(
+        f"{report['requests']} requests ({report['skipped_approvals']} approvals skipped) captured over "
+        f"{report['captured_seconds']}s, replayed at {pace} in {report['duration_seconds']}s; "
+        f"jobs {report['replayed_jobs']}/{report['captured_jobs']}; send lag p99 {report['send_lag']['p99_ms']} ms"
+    )
+    if "event_loop_lag" in report:
+        lines.append(f"hub event-loop lag p50 {report['event_loop_lag']['p50_ms']} ms, p99 {report['event_loop_lag']['p99_ms']} ms")
+    return "\n".join(lines)
+
+async def replay(options: argparse.Namespace) -> dict:
+    entries = load_capture(options.captures)
+    if options.limit:
+        entries = entries[:options.limit]
+    if not options.fake_backends:
+        return await Replayer(options.target, options.speed, options.concurrency, options.timeout).run(entries)
+    async with fake_hub(options) as (hub, ollama, comfyuis):
+        report = await Replayer(hub.url, options.speed, options.concurrency, options.timeout).run(entries)
+        report["event_loop_lag"] = summarize(list(hub.lag.samples))
+    report["fakes"] = fake_counts(ollama, comfyuis)
+    return report
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay captured hub API traffic.")
+    parser.add_argument("captures", nargs="+", help="capture files, oldest first (e.g. requests.jsonl.1 requests.jsonl)")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="hub to replay against")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1 for real time, N for N times faster, or 'max'")
+    parser.add_argument("--concurrency", type=int, default=64, help="most requests in flight at once")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=600.0, help="per-request timeout in seconds")
+    parser.add_argument("--fake-backends", action="store_true", help="start a local hub against fake Ollama and ComfyUI instead of --target")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    add_fake_backend_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv: Optional[list[str]] = None) -> int:
+    options = parse_args(argv)
+    if options.fake_backends:
+        # The hub serves /static relative to the working directory
+        options.captures = [os.path.abspath(path) for path in options.captures]
+        options.output = options.output and os.path.abspath(options.output)
+        os.chdir(REPO_ROOT)
+    report = asyncio.run(replay(options))
+    print(format_report(report))
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
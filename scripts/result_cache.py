@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from typing import Optional
+
+from PIL import Image
+
+from scripts import database
+from scripts.async_database import async_db
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def workflow_key(workflow: dict) -> str:
+    """Returns the content address of a fully substituted API-format workflow."""
+    material = json.dumps(workflow, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def link_or_copy(source: str, destination: str) -> bool:
+    """Hard-links a file (copying across filesystems). Returns False if the source is gone."""
+    if not os.path.exists(source):
+        return False
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+    return True
+
+class GenerationResultCache:
+    """
+    Content-addressed cache of generated images.
+
+    Each result is kept as `<key>.png` in a cache directory under the
+    ComfyUI output folder, keyed by the hash of the workflow that produced
+    it (prompt, seed, models and all other inputs). A hit hard-links the
+    cached image back into the output folder under a new name, so the new
+    asset can be approved and moved without affecting the cache. The least
+    recently used images are deleted once the cache exceeds `max_bytes`.
+    """
+
+    def __init__(self, output_dir: str, max_bytes: int = 1_000_000_000, subdir: str = ".result_cache"):
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.subdir = subdir
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache_dir(self) -> str:
+        return os.path.join(self.output_dir, self.subdir)
+
+    async def lookup(self, key: str, asset_id: int) -> Optional[str]:
+        """Returns the output-relative filename of a fresh copy of a cached result, or None on a miss."""
+        entry = await async_db.read(self._get_entry, key)
+        if entry is not None:
+            filename = f"cached_{key[:16]}_{asset_id}.png"
+            cached_path = os.path.join(self.cache_dir, entry["filename"])
+            if await asyncio.to_thread(link_or_copy, cached_path, os.path.join(self.output_dir, filename)):
+                await async_db.write(self._touch_entry, key)
+                self.hits += 1
+                return filename
+            logging.warning(f"Cached result {entry['filename']} is missing on disk; dropping the entry")
+            await async_db.write(self._delete_entry, key)
+        self.misses += 1
+        return None
+
+    async def store(self, key: str, workflow_name: str, image_path: str):
+        """Adds a generated image to the cache and evicts the oldest entries beyond the size limit."""
+        cache_name = f"{key}.png"
+        cache_path = os.path.join(self.cache_dir, cache_name)
+        try:
+            if not await asyncio.to_thread(link_or_copy, image_path, cache_path):
+                logging.warning(f"Cannot cache missing result {image_path}")
+                return
+            size, width, height = await asyncio.to_thread(self._describe, cache_path)
+        except OSError as e:
+            logging.error(f"Failed to cache generated image {image_path}: {e}")
+            return
+        evicted = await async_db.write(self._put_entry, key, workflow_name, cache_name, size, width, height)
+        if evicted:
+            await asyncio.to_thread(self._remove_files, evicted)
+            logging.info(f"Evicted {len(evicted)} cached generation results")
+
+    async def clear(self) -> int:
+        filenames = await async_db.write(self._delete_all)
+        await asyncio.to_thread(self._remove_files, filenames)
+        return len(filenames)
+
+    async def stats(self) -> dict:
+        entries, total = await async_db.read(self._totals)
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _describe(path: str) -> tuple[int, Optional[int], Optional[int]]:
+        size = os.path.getsize(path)
+        try:
+            with Image.open(path) as img:
+                width, height = img.size
+        except (OSError, ValueError):
+            width, height = None, None
+        return size, width, height
+
+    def _remove_files(self, filenames: list[str]):
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:
+                pass
+
+    def _get_entry(self, key: str):
+        conn = database.get_db_connection()
+        if conn is None:
+            return None
+        try:
+            return conn.execute("SELECT * FROM generation_cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to read result cache entry: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def _touch_entry(self, key: str):
+        conn = database.get_db_connection()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE generation_cache SET last_accessed = ?, hits = hits + 1 WHERE key = ?",
+                    (time.time(), key)
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Failed to update result cache entry: {e}")
+        finally:
+            conn.close()
+
+    def _delete_entry(self, key: str):
+        conn = database.get_db_connection()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logging.error(f"Failed to delete result cache entry: {e}")
+        finally:
+            conn.close()
+
+    def _put_entry(self, key: str, workflow_name: str, filename: str, size: int, width, height) -> list[str]:
+        """Records an entry and returns the filenames of the entries evicted to stay within max_bytes."""
+        conn = database.get_db_connection()
+        if conn is None:
+            return []
+        try:
+            now = time.time()
+            evicted = []
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO generation_cache (key, workflow, filename, size, width, height, created_at, last_accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, workflow_name, filename, size, width, height, now, now)
+                )
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM generation_cache").fetchone()[0]
+                if total > self.max_bytes:
+                    for row in conn.execute("SELECT key, filename, size FROM generation_cache ORDER BY last_accessed ASC").fetchall():
+                        if total <= self.max_bytes:
+                            break
+                        conn.execute("DELETE FROM generation_cache WHERE key = ?", (row["key"],))
+                        evicted.append(row["filename"])
+                        total -= row["size"]
+            return evicted
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write result cache entry: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def _delete_all(self) -> list[str]:
+        conn = database.get_db_connection()
+        if conn is None:
+            return []
+        try:
+            with conn:
+                filenames = [row["filename"] for row in conn.execute("SELECT filename FROM generation_cache").fetchall()]
+                conn.execute("DELETE FROM generation_cache")
+            return filenames
+        except sqlite3.Error as e:
+            logging.error(f"Failed to clear result cache: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def _totals(self) -> tuple[int, int]:
+        conn = database.get_db_connection()
+        if conn is None:
+            return 0, 0
+        try:
+            return tuple(conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generation_cache").fetchone())
+        except sqlite3.Error as e:
+            logging.error(f"Failed to read result cache stats: {e}")
+            return 0, 0
+        finally:
+            conn.close()
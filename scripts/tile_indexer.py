@@ -0,0 +1,134 @@
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from scripts.gb_postprocess import DMG_PALETTE, quantize, snap_to_tiles, to_luminance, write_indexed_png
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+TILE_SIZE = 8
+# Unique 8x8 tiles GB Studio can load for one background
+DEFAULT_TILE_BUDGET = 192
+
+def load_indices(path: str) -> np.ndarray:
+    """
+    Returns an image as DMG palette indices (0 = lightest). Indexed PNGs
+    written with the DMG palette are read as-is; anything else is mapped to
+    the nearest shade by luminance.
+    """
+    with Image.open(path) as img:
+        palette = img.getpalette() if img.mode == "P" else None
+        dmg = [channel for color in DMG_PALETTE for channel in color]
+        if palette is not None and palette[:len(dmg)] == dmg:
+            indices = np.asarray(img, dtype=np.uint8)
+            if indices.max(initial=0) < len(DMG_PALETTE):
+                return indices
+        return quantize(to_luminance(img))
+
+def tile_view(indices: np.ndarray, tile: int = TILE_SIZE) -> np.ndarray:
+    """Returns a (rows, cols, tile, tile) view of an index array padded to whole tiles."""
+    indices = snap_to_tiles(indices, tile)
+    rows, cols = indices.shape[0] // tile, indices.shape[1] // tile
+    return indices.reshape(rows, tile, cols, tile).swapaxes(1, 2)
+
+def _tile_keys(tiles: np.ndarray) -> np.ndarray:
+    """Packs each (tile, tile) block into one opaque bytes value that np.unique can compare."""
+    flat = np.ascontiguousarray(tiles.reshape(len(tiles), -1), dtype=np.uint8)
+    return flat.view(np.dtype((np.void, flat.shape[1]))).ravel()
+
+def unique_tiles(tiles: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Deduplicates a (n, tile, tile) stack of tiles.
+
+    Returns:
+        The unique tiles, each input tile's index into them, and how often each unique tile occurs.
+    """
+    _, first, inverse, counts = np.unique(_tile_keys(tiles), return_index=True, return_inverse=True, return_counts=True)
+    return tiles[first], inverse.ravel(), counts
+
+def count_flip_unique(tiles: np.ndarray) -> int:
+    """Counts tiles that stay distinct when horizontal and vertical flips of a tile count as the same tile."""
+    variants = np.stack([tiles, tiles[:, :, ::-1], tiles[:, ::-1, :], tiles[:, ::-1, ::-1]])
+    # Rank every variant in one pass; a tile's canonical form is its lowest-ranked variant
+    _, ranks = np.unique(_tile_keys(variants.reshape(-1, *tiles.shape[1:])), return_inverse=True)
+    canonical = ranks.reshape(4, len(tiles)).min(axis=0)
+    return int(len(np.unique(canonical)))
+
+def analyze_indices(indices: np.ndarray, budget: int = DEFAULT_TILE_BUDGET, tile: int = TILE_SIZE) -> dict:
+    """Reports the tile grid and unique tile counts of an index array against a tile budget."""
+    grid = tile_view(indices, tile)
+    rows, cols = grid.shape[:2]
+    tiles = grid.reshape(-1, tile, tile)
+    unique, _, _ = unique_tiles(tiles)
+    return {
+        "width": cols * tile,
+        "height": rows * tile,
+        "tiles": rows * cols,
+        "unique_tiles": len(unique),
+        "unique_tiles_with_flips": count_flip_unique(unique),
+        "budget": budget,
+        "over_budget": len(unique) > budget,
+    }
+
+def analyze_tiles(path: str, budget: int = DEFAULT_TILE_BUDGET) -> dict:
+    return analyze_indices(load_indices(path), budget)
+
+def merge_similar_tiles(
+    indices: np.ndarray,
+    max_distance: int,
+    budget: Optional[int] = None,
+    tile: int = TILE_SIZE
+) -> tuple[np.ndarray, int]:
+    """
+    Remaps near-duplicate tiles onto each other to reduce the unique tile
+    count. Tiles are visited from most to least frequent and each one is
+    replaced by the closest kept tile if they differ in at most
+    `max_distance` pixels. With a budget, the distance is raised one pixel at a time and
+    the first result within budget is returned.
+
+    Returns:
+        The remapped index array (padded to whole tiles) and its unique tile count.
+    """
+    grid = tile_view(indices, tile)
+    rows, cols = grid.shape[:2]
+    unique, inverse, counts = unique_tiles(grid.reshape(-1, tile, tile))
+    order = np.argsort(-counts, kind="stable")
+    distances = range(1, max_distance + 1) if budget is not None else (max_distance,)
+
+    mapping, kept = np.arange(len(unique)), list(order)
+    for distance in distances:
+        mapping = np.empty(len(unique), dtype=np.intp)
+        kept_ids: list[int] = []
+        for tile_id in order:
+            if kept_ids:
+                differences = (unique[kept_ids] != unique[tile_id]).sum(axis=(1, 2))
+                nearest = int(np.argmin(differences))
+                if differences[nearest] <= distance:
+                    mapping[tile_id] = kept_ids[nearest]
+                    continue
+            mapping[tile_id] = tile_id
+            kept_ids.append(int(tile_id))
+        kept = kept_ids
+        if budget is not None and len(kept) <= budget:
+            break
+
+    merged = unique[mapping[inverse]].reshape(rows, cols, tile, tile).swapaxes(1, 2).reshape(rows * tile, cols * tile)
+    return merged, len(kept)
+
+def merge_tiles_in_file(path: str, max_distance: int, budget: Optional[int] = None) -> dict:
+    """Merges near-duplicate tiles of an image in place, writing it back as a DMG indexed PNG."""
+    indices = load_indices(path)
+    before = analyze_indices(indices, budget or DEFAULT_TILE_BUDGET)
+    merged, unique_count = merge_similar_tiles(indices, max_distance, budget)
+    if unique_count < before["unique_tiles"]:
+        # Replace rather than overwrite, so hard-linked copies (e.g. in the result cache) keep the original
+        temp_path = f"{path}.merge.png"
+        write_indexed_png(merged, temp_path)
+        os.replace(temp_path, path)
+        logging.info(f"Merged near-duplicate tiles in {path}: {before['unique_tiles']} -> {unique_count} unique tiles")
+    report = analyze_indices(merged, budget or DEFAULT_TILE_BUDGET)
+    report["merged_from"] = before["unique_tiles"]
+    return report
@@ -0,0 +1,127 @@
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from scripts.async_database import async_db
+from scripts.database import record_trace_spans
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def job_trace_id(asset_id: int, trace_id: Optional[str] = None) -> str:
+    """Returns a job's trace id; jobs queued outside a traced request get one derived from their ID."""
+    return trace_id or f"asset-{asset_id}"
+
+class Trace:
+    """The spans recorded for one trace id within one request or job, saved together when it ends."""
+
+    def __init__(self, trace_id: str, asset_id: Optional[int] = None):
+        self.trace_id = trace_id
+        self.asset_id = asset_id
+        self.spans: list[dict] = []
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+def current_trace_id() -> Optional[str]:
+    active = _current_trace.get()
+    return active.trace_id if active else None
+
+def _new_span(name: str, start: float, attributes: dict) -> dict:
+    return {
+        "span_id": uuid.uuid4().hex[:8],
+        "parent_id": _current_span.get(),
+        "name": name,
+        "start": start,
+        "duration": None,
+        "attributes": attributes,
+        "error": None,
+    }
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times a block as a child of the current span. Yields the span so the
+    block can add attributes. Does nothing outside a trace.
+    """
+    active = _current_trace.get()
+    if active is None:
+        yield None
+        return
+    current = _new_span(name, time.time(), attributes)
+    token = _current_span.set(current["span_id"])
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current["error"] = f"{type(e).__name__}: {e}".strip()
+        raise
+    finally:
+        current["duration"] = time.perf_counter() - started
+        _current_span.reset(token)
+        active.spans.append(current)
+
+def record_span(name: str, start: float, end: float, **attributes):
+    """Adds an already finished span (wall-clock start and end) under the current span, e.g. time spent queued."""
+    active = _current_trace.get()
+    if active is None:
+        return
+    finished = _new_span(name, start, attributes)
+    finished["duration"] = max(end - start, 0.0)
+    active.spans.append(finished)
+
+@asynccontextmanager
+async def trace(name: str, trace_id: Optional[str] = None, asset_id: Optional[int] = None, **attributes):
+    """
+    Runs a block as the root span of a trace (a new one unless `trace_id`
+    continues an existing one) and persists its spans when the block ends,
+    whether or not it succeeded.
+    """
+    current = Trace(trace_id or new_trace_id(), asset_id)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(None)
+    try:
+        with span(name, **attributes):
+            yield current
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        try:
+            await async_db.write(record_trace_spans, current.trace_id, current.asset_id, current.spans)
+        except Exception as e:
+            logging.error(f"Failed to save trace {current.trace_id}: {e}")
+
+def waterfall(spans: list[dict]) -> dict:
+    """Lays stored spans out as a waterfall: offsets from the first span's start and nesting depth."""
+    if not spans:
+        return {"start": None, "total_seconds": 0.0, "spans": []}
+    origin = min(span["start"] for span in spans)
+    end = max(span["start"] + (span["duration"] or 0.0) for span in spans)
+    parents = {span["span_id"]: span["parent_id"] for span in spans}
+
+    def depth_of(span_id: str) -> int:
+        depth, parent = 0, parents.get(span_id)
+        while parent in parents and depth < len(parents):
+            depth, parent = depth + 1, parents[parent]
+        return depth
+
+    rows = []
+    for item in sorted(spans, key=lambda span: span["start"]):
+        depth = depth_of(item["span_id"])
+        rows.append({
+            "name": item["name"],
+            "span_id": item["span_id"],
+            "parent_id": item["parent_id"],
+            "asset_id": item.get("asset_id"),
+            "depth": depth,
+            "offset_seconds": round(item["start"] - origin, 4),
+            "duration_seconds": round(item["duration"], 4) if item["duration"] is not None else None,
+            "attributes": item["attributes"],
+            "error": item["error"],
+        })
+    return {"start": origin, "total_seconds": round(end - origin, 4), "spans": rows}
@@ -0,0 +1,143 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Request bodies larger than this are recorded as their size only
+MAX_CAPTURED_BODY = 65536
+CAPTURED_METHODS = ("POST", "PUT", "DELETE")
+
+_job_ids: ContextVar[Optional[list]] = ContextVar("captured_job_ids", default=None)
+
+def record_job_ids(*asset_ids: int):
+    """Notes generation jobs queued by the request being captured, if any."""
+    captured = _job_ids.get()
+    if captured is not None:
+        captured.extend(asset_ids)
+
+class TrafficRecorder:
+    """
+    Appends one JSON line per captured request to a size-rotated file
+    (`path`, `path.1`, ... `path.<backups>`). Lines are handed to a
+    background thread so the event loop never waits on the disk.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10_000_000, backups: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.recorded = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._handler: Optional[logging.Handler] = None
+
+    def start(self):
+        if self._listener is not None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8"
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._listener = logging.handlers.QueueListener(self._queue, self._handler)
+        self._listener.start()
+        logging.info(f"Capturing API traffic to {self.path}")
+
+    def stop(self):
+        """Flushes queued lines and closes the file."""
+        if self._listener is None:
+            return
+        self._listener.stop()
+        self._handler.close()
+        self._listener = None
+        self._handler = None
+
+    def record(self, entry: dict):
+        if self._listener is None:
+            return
+        line = json.dumps(entry, separators=(",", ":"), default=str)
+        self._queue.put(logging.LogRecord("traffic", logging.INFO, "", 0, line, None, None))
+        self.recorded += 1
+
+def _parse_body(body: bytes):
+    if len(body) > MAX_CAPTURED_BODY:
+        return None
+    try:
+        return json.loads(body) if body else None
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+def _agent_for(path: str) -> Optional[str]:
+    parts = path.strip("/").split("/")
+    if len(parts) >= 4 and parts[:3] == ["api", "v1", "chat"]:
+        return parts[3]
+    return None
+
+class TrafficCaptureMiddleware:
+    """
+    ASGI middleware recording the API calls that change state (POST, PUT
+    and DELETE under `prefix`): when each arrived, the agent and message
+    for chats, the request body, status, duration, trace id and the
+    generation jobs it queued. Streaming responses are recorded once their
+    body has finished.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder, prefix: str = "/api/v1/"):
+        self.app = app
+        self.recorder = recorder
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in CAPTURED_METHODS or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        received_at = time.time()
+        started = time.perf_counter()
+        body = bytearray()
+        response = {"status": None, "trace_id": None, "body_bytes": 0}
+
+        async def capture_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                response["body_bytes"] += len(chunk)
+                if len(body) <= MAX_CAPTURED_BODY:
+                    body.extend(chunk)
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"x-trace-id":
+                        response["trace_id"] = value.decode("latin-1")
+            await send(message)
+
+        job_ids = []
+        token = _job_ids.set(job_ids)
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            _job_ids.reset(token)
+            payload = _parse_body(bytes(body))
+            self.recorder.record({
+                "ts": received_at,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "agent": _agent_for(scope["path"]),
+                "message": payload.get("message") if isinstance(payload, dict) else None,
+                "body": payload,
+                "body_bytes": response["body_bytes"],
+                "status": response["status"],
+                "duration": round(time.perf_counter() - started, 4),
+                "trace_id": response["trace_id"],
+                "job_ids": job_ids,
+            })
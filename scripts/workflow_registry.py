@@ -0,0 +1,271 @@
+import asyncio
+import copy
+import glob
+import json
+import logging
+import os
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Widget order of the node types our templates use, needed to turn a UI
+# export's positional `widgets_values` into named API inputs. None marks
+# UI-only widgets that are not sent to the server.
+WIDGET_NAMES = {
+    "CheckpointLoaderSimple": ["ckpt_name"],
+    "VAELoader": ["vae_name"],
+    "LoraLoader": ["lora_name", "strength_model", "strength_clip"],
+    "CLIPSetLastLayer": ["stop_at_clip_layer"],
+    "CLIPTextEncode": ["text"],
+    "EmptyLatentImage": ["width", "height", "batch_size"],
+    "KSampler": ["seed", None, "steps", "cfg", "sampler_name", "scheduler", "denoise"],
+    "KSamplerAdvanced": [
+        "add_noise", "noise_seed", None, "steps", "cfg", "sampler_name", "scheduler",
+        "start_at_step", "end_at_step", "return_with_leftover_noise"
+    ],
+    "VAEDecode": [],
+    "VAEEncode": [],
+    "LatentUpscale": ["upscale_method", "width", "height", "crop"],
+    "ImageScale": ["upscale_method", "width", "height", "crop"],
+    "SaveImage": ["filename_prefix"],
+    "PreviewImage": [],
+}
+IGNORED_UI_NODES = {"Note", "MarkdownNote"}
+# UI node modes that exclude a node from execution (muted, bypassed)
+INACTIVE_UI_MODES = {2, 4}
+
+SAMPLER_CLASSES = {"KSampler", "KSamplerAdvanced"}
+PROMPT_CLASSES = {"CLIPTextEncode"}
+LATENT_CLASSES = {"EmptyLatentImage"}
+OUTPUT_CLASSES = {"SaveImage"}
+SEED_INPUTS = ("seed", "noise_seed")
+
+class WorkflowError(Exception):
+    """Raised for a workflow template that is missing, malformed or cannot be used."""
+
+def is_ui_workflow(data: dict) -> bool:
+    return isinstance(data.get("nodes"), list) and "links" in data
+
+def ui_to_api(data: dict) -> dict:
+    """Converts a ComfyUI UI/graph export into the API prompt format."""
+    links = {}
+    for link in data.get("links", []):
+        link_id, from_node, from_slot = link[0], link[1], link[2]
+        links[link_id] = [str(from_node), from_slot]
+
+    workflow = {}
+    for node in data["nodes"]:
+        class_type = node.get("type")
+        if class_type in IGNORED_UI_NODES or node.get("mode") in INACTIVE_UI_MODES:
+            continue
+        if class_type not in WIDGET_NAMES:
+            raise WorkflowError(f"Node {node.get('id')} ({class_type}) has an unknown widget layout; export the workflow in API format instead.")
+        inputs = {}
+        for name, value in zip(WIDGET_NAMES[class_type], node.get("widgets_values") or []):
+            if name is not None:
+                inputs[name] = value
+        for node_input in node.get("inputs", []):
+            link_id = node_input.get("link")
+            if link_id is None:
+                continue
+            if link_id not in links:
+                raise WorkflowError(f"Node {node.get('id')} input '{node_input.get('name')}' references missing link {link_id}.")
+            inputs[node_input["name"]] = links[link_id]
+        workflow[str(node["id"])] = {"class_type": class_type, "inputs": inputs}
+    return workflow
+
+def find_nodes(workflow: dict, class_types: set) -> list[str]:
+    return sorted((node_id for node_id, node in workflow.items() if node.get("class_type") in class_types), key=_node_sort_key)
+
+def _node_sort_key(node_id: str):
+    return (0, int(node_id)) if node_id.isdigit() else (1, node_id)
+
+class WorkflowTemplate:
+    """
+    A validated, API-format workflow with the nodes a job needs to fill in,
+    found by class type: the positive and negative prompts, the seeds, the
+    latent size and the image output.
+    """
+
+    def __init__(self, name: str, path: str, mtime: float, workflow: dict, source_format: str):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.workflow = workflow
+        self.source_format = source_format
+        self._validate_links()
+
+        samplers = find_nodes(workflow, SAMPLER_CLASSES)
+        self.prompt_node = self._linked_prompt(samplers, "positive")
+        self.negative_node = self._linked_prompt(samplers, "negative")
+        if self.prompt_node is None:
+            self.prompt_node = next(
+                (node_id for node_id in find_nodes(workflow, PROMPT_CLASSES) if "[SUBJECT]" in str(workflow[node_id]["inputs"].get("text", ""))),
+                None
+            )
+        if self.prompt_node is None:
+            raise WorkflowError(f"Workflow '{name}' has no prompt node feeding a sampler.")
+        outputs = find_nodes(workflow, OUTPUT_CLASSES)
+        if not outputs:
+            raise WorkflowError(f"Workflow '{name}' has no SaveImage output node.")
+        self.output_node = outputs[0]
+        self.seed_nodes = [
+            node_id for node_id, node in workflow.items()
+            if any(key in node.get("inputs", {}) and not isinstance(node["inputs"][key], list) for key in SEED_INPUTS)
+        ]
+        latents = find_nodes(workflow, LATENT_CLASSES)
+        self.size_node = latents[0] if latents else None
+
+    def _validate_links(self):
+        for node_id, node in self.workflow.items():
+            if "class_type" not in node or not isinstance(node.get("inputs"), dict):
+                raise WorkflowError(f"Workflow '{self.name}' node {node_id} is missing class_type or inputs.")
+            for input_name, value in node["inputs"].items():
+                if isinstance(value, list) and len(value) == 2 and str(value[0]) not in self.workflow:
+                    raise WorkflowError(f"Workflow '{self.name}' node {node_id} input '{input_name}' links to missing node {value[0]}.")
+
+    def _linked_prompt(self, samplers: list[str], input_name: str) -> Optional[str]:
+        for sampler_id in samplers:
+            link = self.workflow[sampler_id]["inputs"].get(input_name)
+            if isinstance(link, list) and self.workflow.get(str(link[0]), {}).get("class_type") in PROMPT_CLASSES:
+                return str(link[0])
+        return None
+
+    @property
+    def size(self) -> Optional[tuple[int, int]]:
+        if self.size_node is None:
+            return None
+        inputs = self.workflow[self.size_node]["inputs"]
+        return inputs.get("width"), inputs.get("height")
+
+    @property
+    def prompt_template(self) -> str:
+        return self.workflow[self.prompt_node]["inputs"].get("text", "")
+
+    def instantiate(self, subject: str, asset_type: str, seed: Optional[int] = None) -> dict:
+        """
+        Returns a job's copy of the workflow with the subject and asset type
+        substituted into the prompt and, if given, the seed applied. Templates
+        without a [SUBJECT] placeholder get the subject prepended.
+        """
+        workflow = copy.deepcopy(self.workflow)
+        text = self.prompt_template
+        if "[SUBJECT]" not in text:
+            text = f"{subject}, {text}"
+        workflow[self.prompt_node]["inputs"]["text"] = text.replace("[SUBJECT]", subject).replace("[ASSET_TYPE]", asset_type)
+        if seed is not None:
+            for node_id in self.seed_nodes:
+                inputs = workflow[node_id]["inputs"]
+                for key in SEED_INPUTS:
+                    if key in inputs:
+                        inputs[key] = seed
+        return workflow
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "format": self.source_format,
+            "prompt_node": self.prompt_node,
+            "negative_node": self.negative_node,
+            "seed_nodes": self.seed_nodes,
+            "size_node": self.size_node,
+            "size": self.size,
+            "output_node": self.output_node,
+        }
+
+def load_template(path: str) -> WorkflowTemplate:
+    name = os.path.basename(path)
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise WorkflowError(f"Could not read workflow '{name}': {e}")
+    if not isinstance(data, dict):
+        raise WorkflowError(f"Workflow '{name}' is not a JSON object.")
+    if is_ui_workflow(data):
+        return WorkflowTemplate(name, path, mtime, ui_to_api(data), "ui")
+    return WorkflowTemplate(name, path, mtime, data, "api")
+
+class WorkflowRegistry:
+    """
+    Loads every workflow template in a directory once, validates it and
+    keeps it in memory, reloading files whose modification time changes.
+    Invalid files are reported through `errors` instead of failing jobs late.
+    """
+
+    def __init__(self, directory: str, reload_interval: float = 2.0):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.templates: dict[str, WorkflowTemplate] = {}
+        self.errors: dict[str, str] = {}
+        self._mtimes: dict[str, float] = {}
+        self.loaded = False
+        self._watcher: Optional[asyncio.Task] = None
+
+    def load_all(self) -> dict[str, WorkflowTemplate]:
+        """Loads new and changed templates and forgets deleted ones. Returns the current templates."""
+        seen = set()
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            name = os.path.basename(path)
+            seen.add(name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if self._mtimes.get(name) == mtime:
+                continue
+            self._mtimes[name] = mtime
+            try:
+                self.templates[name] = load_template(path)
+                self.errors.pop(name, None)
+                logging.info(f"Loaded workflow template {name} ({self.templates[name].source_format} format)")
+            except WorkflowError as e:
+                self.templates.pop(name, None)
+                self.errors[name] = str(e)
+                logging.error(f"Invalid workflow template {name}: {e}")
+        for name in set(self._mtimes) - seen:
+            self._mtimes.pop(name)
+            self.templates.pop(name, None)
+            self.errors.pop(name, None)
+            logging.info(f"Workflow template {name} was removed")
+        self.loaded = True
+        return self.templates
+
+    def get(self, name: str) -> WorkflowTemplate:
+        if not self.loaded:
+            self.load_all()
+        template = self.templates.get(name)
+        if template is not None:
+            return template
+        if name in self.errors:
+            raise WorkflowError(f"Workflow '{name}' is invalid: {self.errors[name]}")
+        raise WorkflowError(f"Workflow '{name}' not found.")
+
+    def start(self):
+        """Starts watching the directory for changed templates."""
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch_loop())
+
+    async def stop(self):
+        if self._watcher:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def _watch_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                self.load_all()
+            except Exception as e:
+                logging.error(f"Reloading workflow templates failed: {e}")
+
+    def status(self) -> dict:
+        return {
+            "templates": {name: template.as_dict() for name, template in self.templates.items()},
+            "errors": dict(self.errors),
+        }
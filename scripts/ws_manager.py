@@ -0,0 +1,233 @@
+import asyncio
+import itertools
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import WebSocket
+
+from scripts.event_bus import InProcessEventBus
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def message_topics(message: dict) -> set[str]:
+    """
+    Returns the topics a broadcast belongs to: its job and, for batch items,
+    the parent batch. Events with no topics go to every client.
+    """
+    return {f"job:{message[key]}" for key in ("asset_id", "parent_id") if message.get(key) is not None}
+
+def coalesce_key(message: dict) -> Optional[tuple]:
+    """
+    Returns a key shared by progress events that supersede each other, so
+    only the newest pending one is sent. Other events return None.
+    """
+    if message.get("event") in ("QUEUE", "PING"):
+        return (message["event"].lower(),)
+    if message.get("event") == "UPDATE" and message.get("status") == "GENERATING" and "progress" in message:
+        return ("progress", message.get("asset_id"))
+    return None
+
+class ClientConnection:
+    """
+    One WebSocket client with its own bounded send queue and sender task.
+
+    Progress events are coalesced per job while they wait and are the first
+    to be dropped when the queue is full. If the queue is still full of
+    events that must not be lost, the client is too slow to keep up and is
+    disconnected; the dashboard reconnects and picks up fresh state.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int, send_timeout: float):
+        self.websocket = websocket
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.topics: set[str] = set()
+        self.last_seen = time.monotonic()
+        self.closed = False
+        self.dropped = 0
+        self.coalesced = 0
+        self._pending: OrderedDict = OrderedDict()
+        self._counter = itertools.count()
+        self._ready = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+
+    def wants(self, topics: set[str]) -> bool:
+        """Clients without subscriptions receive every event."""
+        return not topics or not self.topics or not self.topics.isdisjoint(topics)
+
+    def enqueue(self, message: dict) -> bool:
+        """Queues a message without waiting. Returns False if the client has to be evicted."""
+        if self.closed:
+            return False
+        key = coalesce_key(message)
+        if key is not None and key in self._pending:
+            self._pending[key] = message
+            self.coalesced += 1
+            return True
+        if len(self._pending) >= self.queue_size and not self._drop_droppable():
+            return False
+        self._pending[key if key is not None else ("event", next(self._counter))] = message
+        self._ready.set()
+        return True
+
+    def _drop_droppable(self) -> bool:
+        for key in self._pending:
+            if key[0] != "event":
+                del self._pending[key]
+                self.dropped += 1
+                return True
+        return False
+
+    def start(self, on_failure):
+        self._sender = asyncio.create_task(self._send_loop(on_failure))
+
+    async def _send_loop(self, on_failure):
+        while True:
+            await self._ready.wait()
+            while self._pending:
+                _, message = self._pending.popitem(last=False)
+                try:
+                    await asyncio.wait_for(self.websocket.send_json(message), timeout=self.send_timeout)
+                except Exception as e:
+                    on_failure(self, f"send failed: {type(e).__name__} {e}".strip())
+                    return
+            self._ready.clear()
+
+    async def close(self):
+        self.closed = True
+        if self._sender and self._sender is not asyncio.current_task():
+            self._sender.cancel()
+        try:
+            await asyncio.wait_for(self.websocket.close(), timeout=self.send_timeout)
+        except Exception:
+            pass
+
+class ConnectionManager:
+    """
+    Fans broadcasts out to WebSocket clients without waiting on any of them.
+
+    broadcast() only places the message in each interested client's queue,
+    so a slow or dead browser tab cannot delay other clients or the
+    generation task that produced the event. A heartbeat pings clients and
+    evicts those that have not been heard from within `heartbeat_timeout`.
+    Clients may subscribe to `job:<id>` topics (an asset or batch ID) to receive only the
+    events for jobs they follow; events without a job go to everyone.
+
+    Broadcasts go through `bus`, so with a shared backend an event raised
+    in one worker process reaches the clients connected to every worker.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 100,
+        send_timeout: float = 5.0,
+        heartbeat_interval: float = 20.0,
+        heartbeat_timeout: float = 60.0,
+        bus: Optional[InProcessEventBus] = None
+    ):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.clients: dict[WebSocket, ClientConnection] = {}
+        self.evicted = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.bus = bus or InProcessEventBus()
+        self.bus.subscribe(self.deliver)
+
+    @property
+    def active_connections(self) -> list[WebSocket]:
+        return list(self.clients)
+
+    async def start(self):
+        await self.bus.start()
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        await self.bus.stop()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        await asyncio.gather(*(client.close() for client in self.clients.values()))
+        self.clients.clear()
+
+    async def connect(self, websocket: WebSocket, topics: Optional[list[str]] = None) -> ClientConnection:
+        await websocket.accept()
+        client = ClientConnection(websocket, self.queue_size, self.send_timeout)
+        client.topics.update(topics or [])
+        self.clients[websocket] = client
+        client.start(self._on_send_failure)
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client:
+            client.closed = True
+            if client._sender:
+                client._sender.cancel()
+
+    async def broadcast(self, message: dict):
+        """Publishes a message to the clients of every process sharing the event bus."""
+        try:
+            await self.bus.publish(message)
+        except Exception as e:
+            logging.error(f"Failed to publish broadcast: {e}")
+
+    async def deliver(self, message: dict):
+        """Queues a message for this process's interested clients. Never blocks on, or raises for, a client."""
+        topics = message_topics(message)
+        for client in list(self.clients.values()):
+            if client.wants(topics) and not client.enqueue(message):
+                self._evict(client, "send queue full")
+
+    def handle_client_message(self, client: ClientConnection, text: str):
+        """Handles pongs and subscription changes sent by a client."""
+        client.last_seen = time.monotonic()
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(data, dict):
+            return
+        topics = data.get("topics") or []
+        if data.get("action") == "subscribe":
+            client.topics.update(topics)
+        elif data.get("action") == "unsubscribe":
+            client.topics.difference_update(topics)
+
+    def _on_send_failure(self, client: ClientConnection, reason: str):
+        self._evict(client, reason)
+
+    def _evict(self, client: ClientConnection, reason: str):
+        if self.clients.pop(client.websocket, None) is None:
+            return
+        self.evicted += 1
+        logging.warning(f"Evicting WebSocket client: {reason}")
+        asyncio.create_task(client.close())
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            for client in list(self.clients.values()):
+                if now - client.last_seen > self.heartbeat_timeout:
+                    self._evict(client, "heartbeat timeout")
+                elif not client.enqueue({"event": "PING", "time": time.time()}):
+                    self._evict(client, "send queue full")
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.clients),
+            "queued": sum(len(client._pending) for client in self.clients.values()),
+            "dropped": sum(client.dropped for client in self.clients.values()),
+            "coalesced": sum(client.coalesced for client in self.clients.values()),
+            "evicted": self.evicted,
+        }
@@ -55,6 +55,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (agentId === App.selectedAgent) {
             renderChatHistory();
         }
+        return message;
     }
 
     function renderChatHistory() {
@@ -91,7 +92,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const typingIndicator = showTypingIndicator();
 
         try {
-            const response = await fetch(`/api/v1/chat/${agent}`, {
+            const response = await fetch(`/api/v1/chat/${agent}/stream`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ message: messageText, history: App.chatHistory[agent] })
@@ -102,14 +103,33 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(err.detail || `Server Error: ${response.statusText}`);
             }
 
-            const result = await response.json();
-            
-            let responseContent = `<pre>${JSON.stringify(result, null, 2)}</pre>`;
-            if(result.response) {
-                responseContent = result.response;
+            // Render tokens as they arrive from the server-sent event stream
+            let agentMessage = null;
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let separator;
+                while ((separator = buffer.indexOf('\n\n')) !== -1) {
+                    const { event, data } = parseServerSentEvent(buffer.slice(0, separator));
+                    buffer = buffer.slice(separator + 2);
+                    if (event === 'token') {
+                        if (!agentMessage) {
+                            typingIndicator.remove();
+                            agentMessage = addMessage(agent, 'agent', '');
+                        }
+                        agentMessage.content += data.text;
+                        if (agent === App.selectedAgent) renderChatHistory();
+                    } else if (event === 'job') {
+                        addMessage(agent, 'system', `Generation queued for "${messageText}" (ID: ${data.asset_id}).`);
+                    } else if (event === 'error') {
+                        throw new Error(data.error);
+                    }
+                }
             }
-            
-            addMessage(agent, 'agent', responseContent, true);
 
         } catch (error) {
             addMessage(agent, 'error', `<b>Error:</b> ${error.message}`, true);
@@ -120,6 +140,16 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
+    function parseServerSentEvent(raw) {
+        let event = 'message';
+        let data = '';
+        raw.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+        });
+        return { event, data: data ? JSON.parse(data) : {} };
+    }
+
     function showTypingIndicator() {
         const typingEl = document.createElement('div');
         typingEl.className = 'typing-indicator';
@@ -145,6 +175,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
         ws.onmessage = (event) => {
             const data = JSON.parse(event.data);
+            if (data.event === 'PING') {
+                ws.send(JSON.stringify({ action: 'pong' }));
+                return;
+            }
             updateActiveTask(data);
         };
 
@@ -162,6 +196,37 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function updateActiveTask(data) {
+        if (data.event === 'QUEUE') {
+            websocketStatusEl.textContent = `Queue: ${data.queued} waiting, ${data.running} running, ETA ${Math.round(data.eta_seconds)}s`;
+            return;
+        }
+        if (data.event === 'INTEGRATION') {
+            const seconds = data.seconds !== undefined ? ` (${data.seconds}s)` : '';
+            websocketStatusEl.textContent = `Integration: ${data.stage} ${data.status.toLowerCase()}${seconds}`;
+            return;
+        }
+        if (data.event === 'BUILD') {
+            if (data.lines && data.lines.length) {
+                websocketStatusEl.textContent = `Build: ${data.lines[data.lines.length - 1]}`;
+            }
+            return;
+        }
+        if (data.event === 'BATCH') {
+            let batchEl = document.getElementById(`batch-${data.parent_id}`);
+            if (!batchEl) {
+                batchEl = document.createElement('div');
+                batchEl.id = `batch-${data.parent_id}`;
+                batchEl.className = 'task-item';
+                activeTasksList.prepend(batchEl);
+            }
+            const counts = data.counts || {};
+            batchEl.innerHTML = `
+                <header>${data.name || 'Batch'} (${data.total} items)</header>
+                <div class="status ${data.status}">${data.status}</div>
+                <div class="progress">${counts.generated || 0} done, ${counts.failed || 0} failed, ${(counts.queued || 0) + (counts.generating || 0)} pending</div>
+            `;
+            return;
+        }
         let taskEl = document.getElementById(`task-${data.asset_id}`);
         if (!taskEl) {
             taskEl = document.createElement('div');
@@ -181,6 +246,7 @@ document.addEventListener('DOMContentLoaded', () => {
         taskEl.innerHTML = `
             <header>${data.name || 'Untitled Task'}</header>
             <div class="status ${data.status}">${data.status}</div>
+            ${data.progress && data.progress.max ? `<div class="progress">Step ${data.progress.value}/${data.progress.max}</div>` : ''}
             ${assetImage}
             ${data.message ? `<p class="error-details">${data.message}</p>` : ''}
             ${approveButton}
@@ -0,0 +1,50 @@
+import os
+import numpy as np
+from PIL import Image
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import asset_inspector as inspector_module
+from scripts.asset_inspector import AssetInspector, read_png_header
+
+def test_png_header_and_cached_metadata(tmp_path, monkeypatch):
+    path = tmp_path / "hero.png"
+    Image.new("RGBA", (64, 32)).save(path)
+    assert read_png_header(str(path)) == {"width": 64, "height": 32, "bit_depth": 8, "color_type": "rgba"}
+    assert read_png_header(__file__) is None
+
+    reads = []
+    real_read = inspector_module.read_image_header
+    monkeypatch.setattr(inspector_module, "read_image_header", lambda p: reads.append(p) or real_read(p))
+    inspector = AssetInspector()
+    info = inspector.inspect(str(path))
+    assert (info["frames"], info["tiles"]) == (8, 32)
+    inspector.inspect(str(path))
+    assert len(reads) == 1
+
+    # A rewritten file is re-read; tile stats are computed once per version
+    Image.fromarray(np.zeros((16, 16), dtype=np.uint8)).save(path)
+    assert inspector.inspect(str(path))["frames"] == 1
+    assert len(reads) == 2
+    assert inspector.tile_stats(str(path))["unique_tiles"] == 1
+    monkeypatch.setattr(inspector_module, "analyze_tiles", lambda *args: {"unexpected": True})
+    assert inspector.tile_stats(str(path))["unique_tiles"] == 1
+
+def test_project_file_is_cached_until_it_moves(tmp_path, monkeypatch):
+    project = tmp_path / "project"
+    (project / "nested").mkdir(parents=True)
+    (project / "nested" / "game.gbsproj").write_text("{}")
+    inspector = AssetInspector()
+    assert inspector.project_file(str(project)).endswith("game.gbsproj")
+
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(inspector_module.os, "walk", lambda p: walks.append(p) or real_walk(p))
+    inspector.project_file(str(project))
+    assert walks == []
+
+    (project / "nested" / "game.gbsproj").rename(project / "renamed.gbsproj")
+    assert inspector.project_file(str(project)).endswith("renamed.gbsproj")
+    assert len(walks) == 1
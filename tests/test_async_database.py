@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database
+from scripts.async_database import AsyncDatabase
+
+def failing_insert():
+    conn = database.get_db_connection()
+    try:
+        with conn:
+            conn.execute("INSERT INTO conversations (timestamp, user_message, agent_response, agent_name) VALUES ('t', 'lost', '', 'PM')")
+            conn.execute("INSERT INTO no_such_table VALUES (1)")
+    finally:
+        conn.close()
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_are_batched_and_isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+    db = AsyncDatabase()
+    try:
+        writes = [
+            db.write(database.log_asset_creation, f"task {i}", "sprite", "prompt", f"out_{i}.png")
+            for i in range(20)
+        ]
+        results = await asyncio.gather(db.write(failing_insert), *writes, return_exceptions=True)
+        assert isinstance(results[0], Exception)
+        ids = results[1:]
+        assert all(isinstance(asset_id, int) and asset_id > 0 for asset_id in ids)
+
+        assets = await asyncio.gather(*(db.read(database.get_asset, asset_id) for asset_id in ids))
+        assert [asset["task_name"] for asset in assets] == [f"task {i}" for i in range(20)]
+        # The failed call's partial insert was rolled back without affecting the batch
+        conn = database.get_db_connection()
+        assert conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0] == 0
+        conn.close()
+        assert db.stats()["batches"] < 21
+    finally:
+        await db.stop()
@@ -0,0 +1,101 @@
+import asyncio
+import copy
+import json
+import subprocess
+import pytest
+import aiohttp
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.benchmark import REPO_ROOT, compare_to_baseline, percentile, summarize
+from scripts.comfyui_tracker import ComfyUITracker, ComfyUIExecutionError
+from scripts.fake_backends import FakeComfyUI, FakeOllama, workflow_models
+from scripts.http_clients import HTTPClientPool
+
+def test_percentiles_and_baseline_comparison():
+    assert percentile([], 50) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert summarize([0.1] * 99 + [1.0])["p99_ms"] == pytest.approx(109.0)
+
+    baseline = {
+        "latency": {"chat": summarize([0.1] * 10), "event_loop_lag": summarize([0.001] * 10)},
+        "jobs_per_minute": 100.0,
+    }
+    report = copy.deepcopy(baseline)
+    # Small absolute changes are noise, even when large relative to a tiny baseline
+    report["latency"]["event_loop_lag"] = summarize([0.004] * 10)
+    assert compare_to_baseline(report, baseline, tolerance=0.2) == []
+
+    report["latency"]["chat"] = summarize([0.2] * 10)
+    report["jobs_per_minute"] = 70.0
+    regressions = compare_to_baseline(report, baseline, tolerance=0.2)
+    assert [regression.split(" ")[:2] for regression in regressions] == [
+        ["chat", "p50_ms"], ["chat", "p95_ms"], ["jobs_per_minute", "70.0"]
+    ]
+
+@pytest.mark.asyncio
+async def test_fake_comfyui_queues_prompts_and_reports_over_websocket():
+    models = workflow_models(os.path.join(REPO_ROOT, "workflows"))
+    assert models["checkpoints"] and models["loras"]
+    comfyui = FakeComfyUI(latency=0.05, steps=2, workers=1, models=models, seed=3)
+    ollama = FakeOllama(latency=0.0, token_delay=0.0, failure_rate=1.0)
+    url = await comfyui.start()
+    await ollama.start()
+    pool = HTTPClientPool()
+    tracker = ComfyUITracker(url, pool.session_for, reconnect_delay=0.05)
+    try:
+        tracker.start()
+        for _ in range(100):
+            if tracker.connected:
+                break
+            await asyncio.sleep(0.01)
+        session = pool.session_for(url)
+        prompt = {"9": {"class_type": "SaveImage", "inputs": {"filename_prefix": "sprite"}}}
+        prompt_ids = []
+        for _ in range(3):
+            async with session.post(f"{url}/prompt", json={"prompt": prompt, "client_id": tracker.client_id}) as response:
+                prompt_ids.append((await response.json())["prompt_id"])
+        async with session.get(f"{url}/queue") as response:
+            queue = await response.json()
+        assert (len(queue["queue_running"]), len(queue["queue_pending"])) == (1, 2)
+
+        outputs = await asyncio.gather(*(tracker.wait(prompt_id, timeout=5) for prompt_id in prompt_ids))
+        filename = outputs[-1]["9"]["images"][0]["filename"]
+        async with session.get(f"{url}/view", params={"filename": filename}) as response:
+            assert response.status == 200 and (await response.read()).startswith(b"\x89PNG")
+
+        comfyui.failure_rate = 1.0
+        async with session.post(f"{url}/prompt", json={"prompt": prompt, "client_id": tracker.client_id}) as response:
+            failing = (await response.json())["prompt_id"]
+        with pytest.raises(ComfyUIExecutionError):
+            await tracker.wait(failing, timeout=5)
+
+        async with session.post(ollama.generate_url, json={"prompt": "x", "stream": False}) as response:
+            assert response.status == 500
+    finally:
+        await tracker.stop()
+        await pool.close()
+        await comfyui.stop()
+        await ollama.stop()
+
+def test_benchmark_run_reports_latencies_and_throughput(tmp_path):
+    report_path = tmp_path / "report.json"
+    result = subprocess.run(
+        [
+            sys.executable, "-m", "scripts.benchmark", "--chats", "4", "--generations", "2", "--concurrency", "2",
+            "--ws-clients", "2", "--comfyui-latency", "0.05", "--ollama-latency", "0.01", "--output", str(report_path)
+        ],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=90
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    report = json.loads(report_path.read_text())
+    assert report["latency"]["chat"]["count"] == 4
+    assert report["generation_completed"] == 2 and report["approval_errors"] == 0
+    assert report["jobs_per_minute"] > 0
+    assert report["ws_delivery_ratio"] == 1.0
+    assert report["latency"]["event_loop_lag"]["count"] > 0
+    # The hub warmed the model before the load started, and chats kept it loaded
+    assert report["warmup_seconds"] >= 0 and report["fakes"]["ollama_loads"] == 1
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from aiohttp import web
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database
+from scripts.comfyui_backends import ComfyUIBackendPool
+from scripts.http_clients import HTTPClientPool
+from scripts.job_queue import GenerationScheduler
+
+async def start_fake_comfyui(queue_depth: int, healthy: bool = True):
+    """Starts a fake ComfyUI host that only implements /queue."""
+    async def queue(request):
+        if not healthy:
+            return web.Response(status=500)
+        return web.json_response({"queue_running": [], "queue_pending": [[i] for i in range(queue_depth)]})
+
+    app = web.Application()
+    app.router.add_get("/queue", queue)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+@pytest.mark.asyncio
+async def test_scheduler_routes_jobs_to_least_loaded_healthy_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+
+    busy_runner, busy = await start_fake_comfyui(queue_depth=3)
+    idle_runner, idle = await start_fake_comfyui(queue_depth=0)
+    down_runner, down = await start_fake_comfyui(queue_depth=0, healthy=False)
+    http_clients = HTTPClientPool()
+    pool = ComfyUIBackendPool([busy, idle, down], http_clients.session_for, failure_threshold=1, use_websocket=False)
+
+    ran_on = []
+
+    async def execute(job):
+        ran_on.append(job["backend"])
+
+    async def broadcast(message):
+        pass
+
+    scheduler = GenerationScheduler(
+        execute, broadcast, {url: 1 for url in pool.urls}, poll_interval=0.01, backend_load=pool.load
+    )
+    try:
+        await pool.check_all()
+        assert pool.load(busy) == 3
+        assert pool.load(idle) == 0
+        assert pool.load(down) is None
+
+        pool.set_draining(idle, True)
+        assert pool.load(idle) is None
+        pool.set_draining(idle, False)
+
+        for i in range(3):
+            await scheduler.submit(f"subject {i}", f"task {i}", "sprite", "workflow_pixel_art.json")
+        await scheduler.start()
+        for _ in range(500):
+            if len(ran_on) == 3:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await scheduler.stop()
+        await pool.stop()
+        await http_clients.close()
+        for runner in (busy_runner, idle_runner, down_runner):
+            await runner.cleanup()
+
+    assert len(ran_on) == 3
+    assert down not in ran_on
+    assert ran_on.count(idle) >= 2
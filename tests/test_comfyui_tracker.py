@@ -0,0 +1,118 @@
+import asyncio
+import json
+import pytest
+from aiohttp import web
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.comfyui_tracker import ComfyUITracker, ComfyUIExecutionError
+from scripts.http_clients import HTTPClientPool
+
+async def start_fake_comfyui(messages_by_prompt: dict):
+    """Starts a fake ComfyUI whose /ws replays scripted messages when /prompt is posted."""
+    sockets = []
+
+    async def ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        sockets.append(ws)
+        await ws.send_json({"type": "status", "data": {"status": {"exec_info": {"queue_remaining": 0}}}})
+        async for _ in ws:
+            pass
+        return ws
+
+    async def replay(prompt_id: str):
+        for message in messages_by_prompt[prompt_id]:
+            for ws in sockets:
+                await ws.send_str(json.dumps(message))
+
+    app = web.Application()
+    app.router.add_get("/ws", ws_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", replay
+
+async def wait_connected(tracker: ComfyUITracker):
+    for _ in range(100):
+        if tracker.connected:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Tracker never connected")
+
+@pytest.mark.asyncio
+async def test_tracker_resolves_outputs_and_reports_progress():
+    image = {"filename": "pixel_art_output_00001_.png", "subfolder": "", "type": "output"}
+    runner, base_url, replay = await start_fake_comfyui({
+        "abc": [
+            {"type": "execution_start", "data": {"prompt_id": "abc"}},
+            {"type": "executing", "data": {"node": "3", "prompt_id": "abc"}},
+            {"type": "progress", "data": {"value": 1, "max": 2, "prompt_id": "abc", "node": "3"}},
+            {"type": "progress", "data": {"value": 2, "max": 2, "prompt_id": "abc", "node": "3"}},
+            {"type": "executed", "data": {"node": "9", "output": {"images": [image]}, "prompt_id": "abc"}},
+            {"type": "executing", "data": {"node": None, "prompt_id": "abc"}},
+        ]
+    })
+    pool = HTTPClientPool()
+    tracker = ComfyUITracker(base_url, pool.session_for, reconnect_delay=0.05)
+    progress = []
+    starts = []
+
+    async def on_progress(update):
+        progress.append((update["value"], update["max"]))
+
+    try:
+        tracker.start()
+        await wait_connected(tracker)
+        waiter = asyncio.create_task(
+            tracker.wait("abc", timeout=5, on_progress=on_progress, on_start=lambda: starts.append(len(progress)))
+        )
+        await asyncio.sleep(0)
+        await replay("abc")
+        outputs = await waiter
+    finally:
+        await tracker.stop()
+        await pool.close()
+        await runner.cleanup()
+
+    assert outputs == {"9": {"images": [image]}}
+    assert progress == [(1, 2), (2, 2)]
+    # Started once, before any progress
+    assert starts == [0]
+
+@pytest.mark.asyncio
+async def test_tracker_handles_results_that_finish_before_tracking_and_errors():
+    runner, base_url, replay = await start_fake_comfyui({
+        "early": [
+            {"type": "executed", "data": {"node": "9", "output": {"images": [{"filename": "a.png"}]}, "prompt_id": "early"}},
+            {"type": "executing", "data": {"node": None, "prompt_id": "early"}},
+        ],
+        "broken": [
+            {"type": "execution_error", "data": {"prompt_id": "broken", "exception_message": "out of memory"}},
+        ],
+    })
+    pool = HTTPClientPool()
+    tracker = ComfyUITracker(base_url, pool.session_for, reconnect_delay=0.05)
+    try:
+        tracker.start()
+        await wait_connected(tracker)
+        await replay("early")
+        await asyncio.sleep(0.05)
+        outputs = await tracker.wait("early", timeout=1)
+
+        waiter = asyncio.create_task(tracker.wait("broken", timeout=5))
+        await asyncio.sleep(0)
+        await replay("broken")
+        with pytest.raises(ComfyUIExecutionError, match="out of memory"):
+            await waiter
+    finally:
+        await tracker.stop()
+        await pool.close()
+        await runner.cleanup()
+
+    assert outputs["9"]["images"][0]["filename"] == "a.png"
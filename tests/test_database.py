@@ -0,0 +1,40 @@
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database
+
+def test_initialize_database_enables_wal_and_indexes(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+    database.initialize_database()
+
+    conn = database.get_db_connection()
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_MIGRATIONS[-1][0]
+        indexes = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN SELECT * FROM assets WHERE status = 'queued'"))
+    finally:
+        conn.close()
+
+    assert {"idx_assets_status", "idx_assets_timestamp", "idx_conversations_timestamp", "idx_llm_cache_last_accessed"} <= indexes
+    assert "USING INDEX" in plan
+    # The pooled connection is reused rather than reopened
+    assert database.get_db_connection()._conn is conn._conn
+
+def test_batch_helpers_write_in_one_call(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+
+    ids = database.log_asset_creations([
+        {"task_name": f"hero {i}", "asset_type": "sprite", "final_prompt": "p", "source_path": f"hero_{i}.png"}
+        for i in range(3)
+    ])
+    assert len(ids) == 3
+    assert database.update_asset_statuses(ids[:2], "approved") == 2
+
+    statuses = [database.get_asset(asset_id)["status"] for asset_id in ids]
+    assert statuses == ["approved", "approved", "generated"]
+    database.close_db_connections()
@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database
+from scripts.event_bus import SQLiteEventBus, create_event_bus
+from scripts.ws_manager import ConnectionManager
+from tests.test_ws_manager import FakeWebSocket
+
+@pytest.mark.asyncio
+async def test_sqlite_bus_delivers_events_across_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+
+    # Two managers with their own buses stand in for two uvicorn workers
+    worker_a = ConnectionManager(bus=SQLiteEventBus(poll_interval=0.01))
+    worker_b = ConnectionManager(bus=SQLiteEventBus(poll_interval=0.01))
+    ws_a, ws_b = FakeWebSocket(), FakeWebSocket()
+    await worker_a.connect(ws_a)
+    await worker_b.connect(ws_b)
+    await worker_a.start()
+    await worker_b.start()
+    try:
+        await worker_a.broadcast({"event": "UPDATE", "status": "COMPLETED", "asset_id": 7})
+        await worker_b.broadcast({"event": "QUEUE", "queued": 0})
+        for _ in range(200):
+            if len(ws_a.sent) == 2 and len(ws_b.sent) == 2:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await worker_a.stop()
+        await worker_b.stop()
+
+    # Each worker's clients see both events exactly once
+    assert [m["event"] for m in ws_a.sent] == ["UPDATE", "QUEUE"]
+    assert [m["event"] for m in ws_b.sent] == ["QUEUE", "UPDATE"]
+
+def test_unknown_event_bus_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_event_bus("carrier-pigeon")
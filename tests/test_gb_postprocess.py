@@ -0,0 +1,51 @@
+import os
+import numpy as np
+from PIL import Image
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.gb_postprocess import DMG_PALETTE, convert_to_game_boy, downscale_majority, quantize, snap_to_tiles
+
+def test_background_becomes_tile_aligned_two_bit_indexed_png(tmp_path):
+    gradient = np.tile(np.linspace(0, 255, 768, dtype=np.uint8), (512, 1))
+    source = tmp_path / "render.png"
+    Image.fromarray(np.stack([gradient] * 3, axis=-1)).save(source)
+
+    details = convert_to_game_boy(str(source), str(tmp_path / "render_gb.png"), "background", resample="mean", dither=True)
+
+    assert (details["width"], details["height"]) == (160, 144)
+    assert details["bytes_out"] < details["bytes_in"]
+    with Image.open(tmp_path / "render_gb.png") as img:
+        assert img.mode == "P" and img.size == (160, 144)
+        assert img.getpalette()[:12] == [c for color in DMG_PALETTE for c in color]
+        indices = np.asarray(img)
+    # Left is dark, right is light, and dithering uses all four shades
+    assert indices[:, 0].mean() >= 2 and indices[:, -1].mean() <= 1
+    assert set(np.unique(indices)) == {0, 1, 2, 3}
+
+def test_sprite_sheet_keeps_every_frame(tmp_path):
+    # Four 64x64 frames side by side, each a different shade
+    frames = np.repeat(np.array([0, 90, 170, 255], dtype=np.uint8), 64)
+    source = tmp_path / "sheet.png"
+    Image.fromarray(np.stack([np.tile(frames, (64, 1))] * 3, axis=-1)).save(source)
+
+    details = convert_to_game_boy(str(source), str(tmp_path / "sheet_gb.png"), "sprite")
+
+    assert (details["width"], details["height"]) == (64, 16)
+    assert details["tiles"] == (4, 1)
+    with Image.open(tmp_path / "sheet_gb.png") as img:
+        indices = np.asarray(img)
+    assert [int(indices[8, 16 * frame + 8]) for frame in range(4)] == [3, 2, 1, 0]
+    # A square render is still a single frame, and the frame count can be given explicitly
+    assert convert_to_game_boy(str(source), str(tmp_path / "two.png"), "sprite", frames=2)["width"] == 32
+    Image.new("RGB", (64, 64)).save(tmp_path / "square.png")
+    assert convert_to_game_boy(str(tmp_path / "square.png"), str(tmp_path / "one.png"), "sprite")["width"] == 16
+
+def test_majority_vote_keeps_dominant_shade_and_padding_fills_tiles():
+    indices = quantize(np.array([[0.0, 0.0, 1.0, 1.0], [0.0, 1.0, 1.0, 1.0]], dtype=np.float32))
+    assert downscale_majority(indices, (2, 1)).tolist() == [[3, 0]]
+    # A 1:1 tie is resolved towards the darker shade
+    assert downscale_majority(np.array([[0, 3]], dtype=np.uint8), (1, 1)).tolist() == [[3]]
+    assert snap_to_tiles(np.ones((10, 3), dtype=np.uint8), 8).shape == (16, 8)
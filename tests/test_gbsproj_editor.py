@@ -0,0 +1,54 @@
+import glob
+import json
+import os
+from unittest.mock import patch
+from PIL import Image
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import gbsproj_editor
+from scripts.gbsproj_editor import ProjectSession, add_asset_to_project
+
+def make_project(tmp_path, sprites: int) -> str:
+    project = tmp_path / "project"
+    (project / "assets" / "sprites").mkdir(parents=True)
+    (project / "game.gbsproj").write_text(json.dumps({"sprites": [], "backgrounds": []}))
+    for i in range(sprites):
+        Image.new("P", (32, 16)).save(project / "assets" / "sprites" / f"sprite_{i}.png")
+    return str(project)
+
+def test_session_adds_many_assets_with_one_write_and_skips_duplicates(tmp_path):
+    project = make_project(tmp_path, sprites=3)
+    assert add_asset_to_project(project, "sprite_0.png", "sprite", "Hero")
+
+    with patch.object(gbsproj_editor, "atomic_write_json", wraps=gbsproj_editor.atomic_write_json) as write:
+        with ProjectSession(project) as session:
+            for i in range(3):
+                assert session.add_asset(f"sprite_{i}.png", "sprite", f"Sprite {i}")
+            assert not session.add_asset("missing.png", "sprite", "Missing")
+    assert write.call_count == 1
+    assert session.added == [] and session.duplicates == ["sprite_0.png"]
+
+    with open(os.path.join(project, "game.gbsproj")) as f:
+        sprites = json.load(f)["sprites"]
+    assert [sprite["name"] for sprite in sprites] == ["Hero", "Sprite 1", "Sprite 2"]
+    assert sprites[1]["frames"] == 2
+
+    # Nothing new to add: no write, no backup
+    with patch.object(gbsproj_editor, "atomic_write_json") as write:
+        with ProjectSession(project) as session:
+            session.add_asset("sprite_1.png", "sprite", "Again")
+    write.assert_not_called()
+
+def test_backups_rotate(tmp_path):
+    project = make_project(tmp_path, sprites=4)
+    for i in range(4):
+        assert add_asset_to_project(project, f"sprite_{i}.png", "sprite", f"Sprite {i}", max_backups=2)
+    backups = sorted(glob.glob(os.path.join(project, "game.gbsproj.backup_*")))
+    assert len(backups) == 2
+    # The newest backup holds the project as it was before the last addition
+    with open(backups[-1]) as f:
+        assert len(json.load(f)["sprites"]) == 3
+    assert not glob.glob(os.path.join(project, "*.tmp"))
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import stat
+import pytest
+from PIL import Image
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database
+from scripts import project_integrator
+from scripts.gbsproj_editor import ProjectSession
+from scripts.integration_pipeline import IntegrationPipeline
+
+FAKE_CLI = """#!{python}
+import os, sys, time
+for i in range(30):
+    print(f"compiling {{i}}", flush=True)
+    time.sleep(0.01)
+os.makedirs("build/web", exist_ok=True)
+open("build/web/game.gb", "wb").close()
+sys.stdout.write("{last_line}")
+sys.exit({exit_code})
+"""
+
+def make_cli(path, exit_code=0, last_line="build finished") -> str:
+    path.write_text(FAKE_CLI.format(python=sys.executable, exit_code=exit_code, last_line=last_line))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+def make_pipeline(project, cli, events):
+    async def broadcast(message):
+        events.append(message)
+
+    async def fetch(asset):
+        return asset['source_path']
+
+    async def register(assets):
+        with ProjectSession(project) as session:
+            return [asset for asset in assets if not session.add_asset(asset['filename'], asset['asset_type'], asset['task_name'])]
+
+    return IntegrationPipeline(project, cli, broadcast, fetch, register, workers=4, build_timeout=30)
+
+@pytest.mark.asyncio
+async def test_integrates_assets_in_parallel_and_streams_build_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "game.gbsproj").write_text(json.dumps({"sprites": [], "backgrounds": []}))
+
+    assets = []
+    for i in range(5):
+        path = tmp_path / f"sprite_{i}.png"
+        Image.new("P", (16, 16)).save(path)
+        asset_id = database.log_asset_creation(f"Sprite {i}", "sprite", "prompt", str(path))
+        database.update_asset_status(asset_id, "approved")
+        assets.append(dict(database.get_asset(asset_id)))
+    assets.append({**assets[0], "id": 999, "source_path": str(tmp_path / "missing.png")})
+
+    events = []
+    pipeline = make_pipeline(str(project), make_cli(tmp_path / "gbs-cli"), events)
+    moved, timings = await pipeline.integrate(assets)
+    assert len(moved) == 5
+    assert {database.get_asset(asset['id'])['status'] for asset in moved} == {"integrated"}
+    with open(project / "game.gbsproj") as f:
+        assert len(json.load(f)["sprites"]) == 5
+
+    # The event loop keeps running while the CLI builds
+    ticks = 0
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+    ticking = asyncio.create_task(ticker())
+    success, rom_path = await pipeline.build(timings)
+    ticking.cancel()
+    pipeline.close()
+
+    assert success and os.path.exists(rom_path)
+    assert ticks > 10
+    assert set(timings) == {"fetch", "move", "database", "project", "compile"}
+    lines = [line for event in events if event["event"] == "BUILD" for line in event["lines"]]
+    # The last line has no trailing newline and is still sent when the build ends
+    assert lines == [f"compiling {i}" for i in range(30)] + ["build finished"]
+    assert len([event for event in events if event["event"] == "BUILD"]) < 30
+
+@pytest.mark.asyncio
+async def test_failed_build_reports_failure(tmp_path):
+    events = []
+    pipeline = make_pipeline(str(tmp_path), make_cli(tmp_path / "gbs-cli", exit_code=2), events)
+    timings = {}
+    assert await pipeline.build(timings) == (False, "")
+    assert "compile" in timings
+
+@pytest.mark.asyncio
+async def test_overlong_output_line_fails_the_build_and_stops_the_cli(tmp_path, monkeypatch):
+    monkeypatch.setattr(project_integrator, "BUILD_OUTPUT_LINE_LIMIT", 1024)
+    events = []
+    cli = tmp_path / "gbs-cli"
+    cli.write_text(f"#!{sys.executable}\nimport sys, time\nprint('x' * 4096, flush=True)\ntime.sleep(30)\n")
+    cli.chmod(cli.stat().st_mode | stat.S_IEXEC)
+    pipeline = make_pipeline(str(tmp_path), str(cli), events)
+    timings = {}
+    # Reported as a failed build well before the CLI's 30s sleep is over
+    assert await asyncio.wait_for(pipeline.build(timings), timeout=10) == (False, "")
+    assert "compile" in timings
@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database
+from scripts.job_queue import GenerationScheduler, PermanentJobError
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the database module at a fresh SQLite file."""
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+
+async def wait_until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("Condition not met in time")
+        await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_by_priority_with_bounded_concurrency(temp_db):
+    order = []
+    active = {"now": 0, "max": 0}
+    events = []
+
+    async def execute(job):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.02)
+        order.append(job["task_name"])
+        active["now"] -= 1
+
+    async def broadcast(message):
+        events.append(message)
+
+    scheduler = GenerationScheduler(execute, broadcast, {"gpu": 1}, poll_interval=0.01)
+    low = await scheduler.submit("a", "low", "sprite", "workflow_pixel_art.json", priority=0)
+    await scheduler.submit("b", "high", "sprite", "workflow_pixel_art.json", priority=5)
+    cancelled = await scheduler.submit("c", "cancelled", "sprite", "workflow_pixel_art.json")
+    assert await scheduler.cancel(cancelled)
+
+    await scheduler.start()
+    try:
+        await wait_until(lambda: len(order) == 2)
+        # Job results are committed by the database writer thread
+        await wait_until(lambda: database.get_asset(low)["status"] == "generated")
+    finally:
+        await scheduler.stop()
+
+    assert order == ["high", "low"]
+    assert active["max"] == 1
+    assert database.get_asset(low)["status"] == "generated"
+    assert database.get_asset(cancelled)["status"] == "cancelled"
+    assert any(event["event"] == "QUEUE" for event in events)
+
+@pytest.mark.asyncio
+async def test_scheduler_retries_transient_failures_and_stops_on_permanent_ones(temp_db):
+    attempts = {}
+    runnable_since = []
+
+    async def execute(job):
+        attempts[job["task_name"]] = attempts.get(job["task_name"], 0) + 1
+        if job["task_name"] == "flaky":
+            runnable_since.append(job["queued_at"])
+        if job["task_name"] == "flaky" and attempts["flaky"] < 2:
+            raise Exception("ComfyUI unavailable")
+        if job["task_name"] == "broken":
+            raise PermanentJobError("Model validation failed")
+
+    async def broadcast(message):
+        pass
+
+    scheduler = GenerationScheduler(
+        execute, broadcast, {"gpu": 2}, retry_backoff=0.01, poll_interval=0.01, max_attempts=3
+    )
+    flaky = await scheduler.submit("a", "flaky", "sprite", "workflow_pixel_art.json")
+    broken = await scheduler.submit("b", "broken", "sprite", "workflow_pixel_art.json")
+    await scheduler.start()
+    try:
+        await wait_until(lambda: database.get_asset(flaky)["status"] == "generated"
+                         and database.get_asset(broken)["status"] == "failed")
+    finally:
+        await scheduler.stop()
+
+    assert attempts == {"flaky": 2, "broken": 1}
+    # The retry was runnable from its backoff deadline, not from when the job was created
+    assert runnable_since[0] is None and runnable_since[1] > database.get_asset(flaky)["timestamp"]
+    assert database.get_asset(broken)["last_error"] == "Model validation failed"
+
+@pytest.mark.asyncio
+async def test_batch_items_share_a_parent_and_report_batch_progress(temp_db):
+    ran = []
+    events = []
+
+    async def execute(job):
+        ran.append((job["final_prompt"], job["seed"], job["parent_id"]))
+
+    async def broadcast(message):
+        events.append(message)
+
+    scheduler = GenerationScheduler(execute, broadcast, {"gpu": 2}, poll_interval=0.01)
+    items = [(subject, seed) for subject in ("knight", "wizard") for seed in (1, 2)]
+    batch_id, asset_ids = await scheduler.submit_batch("NPCs", "sprite", "workflow_pixel_art.json", items)
+    assert len(asset_ids) == 4
+
+    await scheduler.start()
+    try:
+        await wait_until(lambda: len(ran) == 4)
+        await wait_until(lambda: any(e["event"] == "BATCH" and e["status"] == "COMPLETED" for e in events))
+    finally:
+        await scheduler.stop()
+
+    assert sorted(ran) == sorted((subject, seed, batch_id) for subject, seed in items)
+    batch = database.get_generation_batch(batch_id)
+    assert batch["total"] == 4 and batch["counts"] == {"generated": 4}
+    assert [item["task_name"] for item in batch["items"]] == [f"NPCs #{i}" for i in range(1, 5)]
+
+@pytest.mark.asyncio
+async def test_cancel_reaches_a_job_running_in_another_worker(temp_db):
+    started = asyncio.Event()
+    events = []
+
+    async def execute(job):
+        started.set()
+        await asyncio.sleep(30)
+
+    async def broadcast(message):
+        events.append(message)
+
+    # Two workers sharing the queue; only the first has capacity, so it claims the job
+    owner = GenerationScheduler(execute, broadcast, {"gpu": 1}, poll_interval=0.01)
+    other = GenerationScheduler(execute, broadcast, {"gpu": 0}, poll_interval=0.01)
+    asset_id = await other.submit("a", "long", "sprite", "workflow_pixel_art.json")
+    await owner.start()
+    try:
+        await asyncio.wait_for(started.wait(), timeout=5)
+        assert await other.cancel(asset_id)
+        await wait_until(lambda: database.get_asset(asset_id)["status"] == "cancelled")
+    finally:
+        await owner.stop()
+
+    assert any(event.get("status") == "CANCELLED" and event.get("asset_id") == asset_id for event in events)
+    assert not await other.cancel(asset_id)
@@ -0,0 +1,38 @@
+import time
+import pytest
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database
+from scripts.llm_cache import LLMResponseCache, cache_key
+
+def test_cache_key_normalizes_task_text():
+    key = cache_key("Art", "qwen3:1.7b", "system", "Create an idle sprite for Jason.")
+    assert key == cache_key("Art", "qwen3:1.7b", "system", "  create an IDLE   sprite for jason ")
+    assert key != cache_key("Art", "qwen3:1.7b", "other system", "Create an idle sprite for Jason.")
+    assert key != cache_key("Art", "llama3", "system", "Create an idle sprite for Jason.")
+
+@pytest.mark.asyncio
+async def test_cache_expires_and_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+    cache = LLMResponseCache(ttl=60, max_entries=2)
+
+    await cache.put("a", "Art", "m", {"response": "A"})
+    await cache.put("b", "Art", "m", {"response": "B"})
+    assert await cache.get("a") == {"response": "A"}  # 'a' is now more recent than 'b'
+    await cache.put("c", "Art", "m", {"response": "C"})
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"response": "A"}
+    assert await cache.get("c") == {"response": "C"}
+
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert await cache.get("a") is None
+    stats = await cache.stats()
+    assert (stats["hits"], stats["entries"]) == (3, 2)
+    assert await cache.clear() == 2
@@ -1,5 +1,6 @@
 import pytest
-from unittest.mock import patch
+import aiohttp
+from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 from httpx import AsyncClient, ASGITransport
 
@@ -38,7 +39,7 @@ async def test_chat_with_pm_agent_mocked():
         assert response.json() == mock_response_payload
         
         # Verify that the mocked function was called exactly once with the correct arguments
-        mock_ollama_call.assert_called_once_with("PM", "Create a new character.")
+        mock_ollama_call.assert_called_once_with("PM", "Create a new character.", use_cache=True)
 
 @pytest.mark.asyncio
 async def test_integrate_and_playtest_endpoint():
@@ -50,4 +51,116 @@ async def test_integrate_and_playtest_endpoint():
 
     assert response.status_code == 200
     expected_json = {"status": "success", "message": "Integration process initiated."}
-    assert response.json() == expected_json
\ No newline at end of file
+    assert response.json() == expected_json
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_queues_art_generation_before_stream_ends():
+    """
+    Tests that /api/v1/chat/{agent_name}/stream relays tokens and queues the
+    Art generation as soon as the JSON object has closed.
+    """
+    chunks = [
+        'Here you go: {"workflow": "workflow_pixel_art.json", ',
+        '"asset_type": "sprite", "prompt": "a knight {idle}"}',
+        ' Let me know if you want changes.'
+    ]
+    submitted_before_end = []
+
+    async def fake_stream(agent_name, task, use_cache=True):
+        for i, chunk in enumerate(chunks):
+            if i == len(chunks) - 1:
+                submitted_before_end.append(mock_submit.called)
+            yield chunk
+
+    with patch('scripts.main.stream_ollama_agent', fake_stream), \
+         patch('scripts.main.generation_scheduler.submit', return_value=42) as mock_submit, \
+         patch('scripts.main.log_chat_message'):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/api/v1/chat/Art/stream", json={"message": "Knight idle sprite"})
+
+    assert response.status_code == 200
+    events = [block for block in response.text.split("\n\n") if block]
+    assert [e.split("\n")[0] for e in events] == ["event: token", "event: token", "event: job", "event: token", "event: done"]
+    assert submitted_before_end == [True]
+    mock_submit.assert_called_once_with(
+        "a knight {idle}", "Knight idle sprite", "sprite", "workflow_pixel_art.json",
+        priority=0, trace_id=response.headers["X-Trace-Id"]
+    )
+
+@pytest.mark.asyncio
+async def test_chat_stream_finds_art_json_after_think_block_and_stray_braces():
+    """
+    Tests that a stray brace, inside or outside a <think> block, does not keep
+    the streamed Art JSON from being queued, and that a response the scanner
+    cannot use falls back to the /chat extraction before `done`.
+    """
+    responses = {
+        "Knight idle sprite": [
+            '<think>The user wants {a sprite', ' of a knight...</thi', 'nk>\nSure {thing}! ',
+            '{"workflow": "workflow_pixel_art.json", "asset_type": "sprite", "prompt": "a knight"}'
+        ],
+        "Castle background": [
+            'Fields look like {"key": value. Here: ',
+            '{"workflow": "workflow_pixel_art.json", "asset_type": "background", "prompt": "a castle"}'
+        ],
+    }
+
+    async def fake_stream(agent_name, task, use_cache=True):
+        for chunk in responses[task]:
+            yield chunk
+
+    with patch('scripts.main.stream_ollama_agent', fake_stream), \
+         patch('scripts.main.generation_scheduler.submit', return_value=42) as mock_submit, \
+         patch('scripts.main.log_chat_message'):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            for message in responses:
+                response = await ac.post("/api/v1/chat/Art/stream", json={"message": message})
+                events = [block.split("\n")[0] for block in response.text.split("\n\n") if block]
+                assert events[-2:] == ["event: job", "event: done"]
+
+    assert [call.args[:3] for call in mock_submit.call_args_list] == [
+        ("a knight", "Knight idle sprite", "sprite"),
+        ("a castle", "Castle background", "background"),
+    ]
+
+def test_ready_endpoint_reports_warmup(client, monkeypatch):
+    """/ready answers 503 with per-model status until warm-up has finished, and 200 when warm-up is disabled."""
+    from scripts import main
+    monkeypatch.setattr(main.settings, "warmup_enabled", True)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False and response.json()["ollama"]["status"] == "pending"
+
+    monkeypatch.setattr(main.settings, "warmup_enabled", False)
+    response = client.get("/ready")
+    assert response.status_code == 200 and response.json()["ready"] is True
+
+@pytest.mark.asyncio
+async def test_generation_retries_unreachable_catalog_but_fails_missing_models(monkeypatch):
+    """A ComfyUI outage while validating models is retried; only a model the catalog lacks fails the job for good."""
+    from scripts import main
+    from scripts.job_queue import PermanentJobError
+    backend = main.comfyui_backends.default
+    monkeypatch.setattr(backend, "consecutive_failures", 0)
+    monkeypatch.setattr(backend, "last_error", None)
+    job = {
+        "id": 1, "task_name": "knight", "asset_type": "sprite", "final_prompt": "a knight",
+        "workflow": "workflow_pixel_art.json", "backend": backend.url
+    }
+
+    async def unreachable(workflow):
+        raise aiohttp.ClientConnectionError("Connection refused")
+
+    async def missing(workflow):
+        return False, "Checkpoint model 'x.safetensors' not found."
+
+    with patch("scripts.main.manager.broadcast", new=AsyncMock()):
+        monkeypatch.setattr(backend.catalog, "validate_workflow", unreachable)
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await main._run_generation_task(job)
+        assert backend.consecutive_failures == 1
+
+        monkeypatch.setattr(backend.catalog, "validate_workflow", missing)
+        with pytest.raises(PermanentJobError):
+            await main._run_generation_task(job)
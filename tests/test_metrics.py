@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.metrics import MetricsRegistry, OLLAMA_IN_FLIGHT, OLLAMA_REQUEST_SECONDS
+
+def test_renders_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests.", ("path",))
+    latency = registry.histogram("test_latency_seconds", "Latency.", ("outcome",), buckets=(0.1, 1.0))
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    latency.observe(0.05, outcome="ok")
+    latency.observe(0.5, outcome="ok")
+    with pytest.raises(RuntimeError):
+        with latency.time():
+            raise RuntimeError("boom")
+
+    text = registry.render()
+    assert '# TYPE test_requests_total counter\ntest_requests_total{path="/a\\"b"} 3\n' in text
+    assert 'test_latency_seconds_bucket{outcome="ok",le="0.1"} 1\n' in text
+    assert 'test_latency_seconds_bucket{outcome="ok",le="1"} 2\n' in text
+    assert 'test_latency_seconds_bucket{outcome="ok",le="+Inf"} 2\n' in text
+    assert 'test_latency_seconds_sum{outcome="ok"} 0.55\n' in text
+    assert 'test_latency_seconds_count{outcome="error"} 1\n' in text
+    # Registering the same metric again returns the existing one
+    assert registry.counter("test_requests_total", "Requests.", ("path",)) is requests
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_agent_calls():
+    from scripts.main import app, call_ollama_agent
+    before = OLLAMA_REQUEST_SECONDS.count(agent="QA", outcome="error")
+
+    async def failing_call(agent_name, task, use_cache):
+        assert OLLAMA_IN_FLIGHT.value(agent="QA") == 1
+        return {"error": "Could not connect to the Ollama service."}
+
+    with patch('scripts.main._call_ollama_agent', failing_call):
+        await call_ollama_agent("QA", "Find bugs")
+    assert OLLAMA_REQUEST_SECONDS.count(agent="QA", outcome="error") == before + 1
+    assert OLLAMA_IN_FLIGHT.value(agent="QA") == 0
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert f'hub_ollama_request_seconds_count{{agent="QA",outcome="error"}} {before + 1}' in response.text
+    assert "# TYPE hub_generation_seconds histogram" in response.text
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from aiohttp import web
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.http_clients import HTTPClientPool
+from scripts.model_catalog import ModelCatalog
+
+OBJECT_INFO = {
+    "CheckpointLoaderSimple": {"input": {"required": {"ckpt_name": [["sd_xl_base_1.0.safetensors"]]}}},
+    "LoraLoader": {"input": {"required": {"lora_name": ["COMBO", {"options": ["pixelart.safetensors"]}]}}},
+    "VAELoader": {"input": {"required": {"vae_name": [["sdxl_vae.safetensors"]]}}},
+}
+
+@pytest.mark.asyncio
+async def test_catalog_single_flight_and_validation():
+    hits = {"object_info": 0}
+
+    async def object_info(request):
+        hits["object_info"] += 1
+        await asyncio.sleep(0.05)
+        return web.json_response(OBJECT_INFO)
+
+    app = web.Application()
+    app.router.add_get("/object_info", object_info)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    pool = HTTPClientPool()
+    catalog = ModelCatalog(f"http://127.0.0.1:{port}", pool.session_for, ttl=60, miss_refresh_interval=3600)
+    workflow = {
+        "4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "sd_xl_base_1.0.safetensors"}},
+        "10": {"class_type": "LoraLoader", "inputs": {"lora_name": "pixelart.safetensors"}},
+    }
+    try:
+        results = await asyncio.gather(*[catalog.validate_workflow(workflow) for _ in range(20)])
+        missing = await catalog.validate_workflow(
+            {"4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "missing.safetensors"}}}
+        )
+        await catalog.refresh(force=True)
+    finally:
+        await pool.close()
+        await runner.cleanup()
+
+    assert all(ok for ok, _ in results)
+    assert hits["object_info"] == 2  # one shared fetch for 20 validations, one forced refresh
+    assert missing[0] is False and "missing.safetensors" in missing[1]
+    assert catalog.as_dict()["vaes"] == ["sdxl_vae.safetensors"]
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+import aiohttp
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.fake_backends import FakeOllama, parse_keep_alive
+from scripts.model_warmup import ModelWarmer, WarmupSkipped, warmup_prompt
+from scripts.workflow_registry import WorkflowRegistry
+
+WORKFLOWS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'workflows'))
+
+def test_warmup_prompt_is_a_tiny_preview_of_the_template():
+    template = WorkflowRegistry(WORKFLOWS_DIR).get("workflow_pixel_art.json")
+    workflow = template.instantiate("warm-up", "sprite", seed=5)
+    prompt = warmup_prompt(workflow)
+
+    assert prompt[template.size_node]["inputs"] == {**workflow[template.size_node]["inputs"], "width": 64, "height": 64, "batch_size": 1}
+    assert all(node["inputs"]["steps"] == 1 for node in prompt.values() if node["class_type"] == "KSampler")
+    assert prompt[template.output_node] == {
+        "class_type": "PreviewImage", "inputs": {"images": workflow[template.output_node]["inputs"]["images"]}
+    }
+    # Model loaders are untouched, and the instantiated workflow is not modified
+    loaders = [node_id for node_id, node in workflow.items() if node["class_type"] in ("CheckpointLoaderSimple", "LoraLoader")]
+    assert loaders and all(prompt[node_id] == workflow[node_id] for node_id in loaders)
+    assert workflow[template.output_node]["class_type"] == "SaveImage"
+
+@pytest.mark.asyncio
+async def test_warmer_reports_readiness_retries_failures_and_rewarms_idle_hosts():
+    calls = []
+    failing = {("http://b", "bg.json")}
+    missing_models = {("http://b", "ui.json")}
+    busy = set()
+
+    async def warm_ollama():
+        calls.append("ollama")
+
+    async def warm_comfyui(backend, template):
+        calls.append((backend, template))
+        if (backend, template) in failing:
+            raise RuntimeError("connection reset")
+        if (backend, template) in missing_models:
+            raise WarmupSkipped("checkpoint not installed")
+
+    warmer = ModelWarmer(
+        warm_ollama, warm_comfyui,
+        comfyui_targets=lambda: [("http://a", "sprite.json"), ("http://a", "bg.json"), ("http://b", "bg.json"), ("http://b", "ui.json")],
+        comfyui_idle=lambda backend: backend not in busy,
+        interval=0.2
+    )
+    assert not warmer.ready and warmer.status()["ollama"]["status"] == "pending"
+
+    await warmer.warm_all()
+    assert len(calls) == 5
+    assert not warmer.ready
+    statuses = {(target["backend"], target["workflow"]): (target["status"], target["error"]) for target in warmer.status()["comfyui"]}
+    assert statuses[("http://b", "bg.json")] == ("error", "connection reset")
+    assert statuses[("http://b", "ui.json")] == ("skipped", "checkpoint not installed")
+
+    # Only the failed target is retried before the interval is up; skipped ones do not hold up readiness
+    calls.clear()
+    failing.clear()
+    await warmer.warm_all()
+    assert calls == [("http://b", "bg.json")]
+    assert warmer.ready
+
+    # Once due, everything is re-warmed except on hosts busy with their own jobs
+    await asyncio.sleep(0.25)
+    calls.clear()
+    busy.add("http://a")
+    await warmer.warm_all()
+    assert sorted(map(str, calls)) == sorted(map(str, ["ollama", ("http://b", "bg.json"), ("http://b", "ui.json")]))
+    assert warmer.ready
+
+@pytest.mark.asyncio
+async def test_warmer_runs_in_the_background_and_stops():
+    started = asyncio.Event()
+
+    async def warm_ollama():
+        started.set()
+
+    async def warm_comfyui(backend, template):
+        await asyncio.sleep(0.01)
+
+    warmer = ModelWarmer(warm_ollama, warm_comfyui, comfyui_targets=lambda: [("http://a", "sprite.json")], interval=0)
+    warmer.start()
+    await asyncio.wait_for(started.wait(), timeout=1)
+    for _ in range(100):
+        if warmer.ready:
+            break
+        await asyncio.sleep(0.01)
+    assert warmer.ready and warmer.passes == 1
+    await warmer.stop()
+
+@pytest.mark.asyncio
+async def test_fake_ollama_keeps_the_model_loaded_for_keep_alive():
+    assert (parse_keep_alive("30m"), parse_keep_alive(90), parse_keep_alive("-1m"), parse_keep_alive(None)) == (1800.0, 90.0, float("inf"), 300.0)
+    ollama = FakeOllama(latency=0.0, token_delay=0.0, load_latency=0.05)
+    await ollama.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(ollama.generate_url, json={"prompt": "", "stream": False, "keep_alive": "50ms"}) as response:
+                assert (await response.json())["done_reason"] == "load"
+            async with session.post(ollama.generate_url, json={"prompt": "hi", "stream": False, "keep_alive": "50ms"}) as response:
+                assert response.status == 200
+            assert ollama.loads == 1
+            await asyncio.sleep(0.06)
+            async with session.post(ollama.generate_url, json={"prompt": "hi", "stream": False}) as response:
+                assert response.status == 200
+            assert ollama.loads == 2
+    finally:
+        await ollama.stop()
@@ -0,0 +1,34 @@
+import json
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database
+from scripts.project_history import project_history
+
+def test_history_is_maintained_incrementally_and_fits_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+    project_history.configure(max_conversations=10, max_assets=2, token_budget=50, response_chars=40)
+
+    database.log_chat_message("first request", json.dumps({"response": "<think>long reasoning</think>Sure thing."}), "PM")
+    assert database.load_project_history(10, 2)
+    assert "Agent: Sure thing." in project_history.render()
+    assert "long reasoning" not in project_history.render()
+
+    # Writes after loading are reflected without another load
+    database.log_chat_message("second request", json.dumps({"response": "x" * 500}), "PM")
+    asset_id = database.log_asset_creation("Jason idle", "sprite", "prompt", "placeholder")
+    database.update_asset_status(asset_id, "approved")
+    history = project_history.render()
+
+    assert "Jason idle (Type: sprite, Status: approved)" in history
+    assert "x" * 37 + "..." in history
+    assert "x" * 41 not in history
+    # The 200-character budget only leaves room for the newest conversation
+    assert "first request" not in history
+    assert "second request" in history
+
+    project_history.configure(max_conversations=10, max_assets=10, token_budget=1500, response_chars=400)
@@ -0,0 +1,48 @@
+import os
+import pytest
+from PIL import Image
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database
+from scripts.result_cache import GenerationResultCache, workflow_key
+
+def make_png(path, size=(16, 16)):
+    Image.new("RGB", size, (255, 0, 0)).save(path)
+    return str(path)
+
+def test_workflow_key_ignores_key_order_but_not_seed():
+    a = {"3": {"class_type": "KSampler", "inputs": {"seed": 1, "steps": 20}}}
+    b = {"3": {"inputs": {"steps": 20, "seed": 1}, "class_type": "KSampler"}}
+    c = {"3": {"class_type": "KSampler", "inputs": {"seed": 2, "steps": 20}}}
+    assert workflow_key(a) == workflow_key(b)
+    assert workflow_key(a) != workflow_key(c)
+
+@pytest.mark.asyncio
+async def test_hits_return_independent_copies_and_size_limit_evicts_lru(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    cache = GenerationResultCache(str(output_dir))
+
+    first = make_png(output_dir / "first.png")
+    await cache.store("a" * 64, "workflow_pixel_art.json", first)
+    cache.max_bytes = os.path.getsize(first) * 2
+
+    filename = await cache.lookup("a" * 64, asset_id=7)
+    assert filename == f"cached_{'a' * 16}_7.png"
+    # Approving moves the asset's file away; the cache keeps its own link
+    os.remove(output_dir / filename)
+    assert await cache.lookup("a" * 64, asset_id=8)
+    assert await cache.lookup("b" * 64, asset_id=9) is None
+
+    await cache.store("b" * 64, "workflow_pixel_art.json", make_png(output_dir / "second.png"))
+    await cache.store("c" * 64, "workflow_pixel_art.json", make_png(output_dir / "third.png"))
+    stats = await cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] <= cache.max_bytes
+    assert await cache.lookup("a" * 64, asset_id=10) is None
+    assert sorted(os.listdir(cache.cache_dir)) == sorted([f"{'b' * 64}.png", f"{'c' * 64}.png"])
+    assert (stats["hits"], stats["misses"]) == (2, 1)
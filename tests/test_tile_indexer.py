@@ -0,0 +1,44 @@
+import os
+import numpy as np
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.gb_postprocess import write_indexed_png
+from scripts.tile_indexer import analyze_indices, analyze_tiles, merge_similar_tiles, tile_view
+
+def make_tile(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 4, (8, 8), dtype=np.uint8)
+
+def test_counts_unique_and_flipped_duplicate_tiles(tmp_path):
+    a, b = make_tile(1), make_tile(2)
+    # A 4x2 tile background: a repeated, a mirrored, b and its vertical flip
+    rows = [np.hstack([a, a, a[:, ::-1], b]), np.hstack([b[::-1, :], a, a, b])]
+    indices = np.vstack(rows)
+    assert tile_view(indices).shape == (2, 4, 8, 8)
+
+    report = analyze_indices(indices, budget=3)
+    assert (report["tiles"], report["unique_tiles"], report["unique_tiles_with_flips"]) == (8, 4, 2)
+    assert report["over_budget"]
+
+    path = tmp_path / "background.png"
+    write_indexed_png(indices, str(path))
+    assert analyze_tiles(str(path), budget=4)["unique_tiles"] == 4
+    assert not analyze_tiles(str(path), budget=4)["over_budget"]
+
+def test_merge_remaps_near_duplicates_to_fit_budget():
+    a = make_tile(3)
+    near_a = a.copy()
+    near_a[0, :2] = (near_a[0, :2] + 1) % 4
+    b = make_tile(4)
+    indices = np.hstack([a, a, near_a, b])
+
+    merged, unique_count = merge_similar_tiles(indices, max_distance=4, budget=2)
+    assert unique_count == 2
+    # The rarer near-duplicate takes the common tile's pixels; distinct tiles are untouched
+    assert np.array_equal(merged[:, 16:24], a) and np.array_equal(merged[:, 24:], b)
+    assert analyze_indices(merged)["unique_tiles"] == 2
+
+    _, unchanged = merge_similar_tiles(indices, max_distance=1)
+    assert unchanged == 3
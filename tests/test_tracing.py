@@ -0,0 +1,72 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import database, tracing
+
+@pytest.mark.asyncio
+async def test_nested_spans_are_saved_and_laid_out_as_a_waterfall(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+
+    with tracing.span("outside") as span:
+        assert span is None
+    with pytest.raises(ValueError):
+        async with tracing.trace("generation", "trace-1", 7, workflow="pixel"):
+            assert tracing.current_trace_id() == "trace-1"
+            tracing.record_span("scheduler.queue", time.time() - 0.5, time.time())
+            with tracing.span("comfyui.submit") as span:
+                span["attributes"]["prompt_id"] = "p1"
+                with tracing.span("http"):
+                    await asyncio.sleep(0.01)
+            raise ValueError("lost the output")
+    assert tracing.current_trace_id() is None
+
+    spans = database.get_trace_spans("trace-1", 7)
+    assert {span["name"] for span in spans} == {"generation", "scheduler.queue", "comfyui.submit", "http"}
+    layout = tracing.waterfall(spans)
+    rows = {row["name"]: row for row in layout["spans"]}
+    assert rows["generation"]["depth"] == 0
+    assert rows["comfyui.submit"]["depth"] == 1
+    assert rows["http"]["depth"] == 2
+    assert rows["comfyui.submit"]["attributes"] == {"prompt_id": "p1"}
+    assert rows["http"]["duration_seconds"] >= 0.01
+    assert rows["generation"]["error"] == "ValueError: lost the output"
+    assert layout["spans"][0]["name"] == "scheduler.queue"
+    assert layout["total_seconds"] >= 0.5
+
+@pytest.mark.asyncio
+async def test_job_trace_joins_the_chat_turn_that_queued_it(tmp_path, monkeypatch):
+    from scripts.main import app, queue_art_generation
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "hub.db"))
+    database.initialize_database()
+
+    async def fake_submit(prompt, task_name, asset_type, workflow, priority=0, trace_id=None):
+        return database.enqueue_generation_job(task_name, asset_type, prompt, workflow, priority, trace_id)
+
+    async with tracing.trace("chat", agent="Art") as chat_trace:
+        with patch('scripts.main.generation_scheduler.submit', fake_submit):
+            asset_id = await queue_art_generation(
+                {"workflow": "workflow_pixel_art.json", "asset_type": "sprite", "prompt": "a knight"}, "Knight"
+            )
+    async with tracing.trace("generation", tracing.job_trace_id(asset_id, chat_trace.trace_id), asset_id):
+        tracing.record_span("comfyui.execute", time.time(), time.time())
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get(f"/api/v1/jobs/{asset_id}/trace")
+        missing = await ac.get("/api/v1/jobs/999/trace")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["trace_id"] == chat_trace.trace_id
+    assert {span["name"] for span in body["spans"]} == {"chat", "generation.queue", "generation", "comfyui.execute"}
+    queued = next(span for span in body["spans"] if span["name"] == "generation.queue")
+    assert queued["depth"] == 1 and queued["attributes"]["asset_id"] == asset_id
+    assert missing.status_code == 404
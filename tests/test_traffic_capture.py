@@ -0,0 +1,99 @@
+import pytest
+from aiohttp import web
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient, ASGITransport
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.fake_backends import FakeServer
+from scripts.replay import Replayer, load_capture, parse_speed, schedule
+from scripts.traffic_capture import TrafficCaptureMiddleware, TrafficRecorder, record_job_ids
+
+def make_app(recorder: TrafficRecorder) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TrafficCaptureMiddleware, recorder=recorder)
+
+    @app.post("/api/v1/chat/{agent_name}")
+    async def chat(agent_name: str, body: dict, response: Response):
+        record_job_ids(7)
+        response.headers["X-Trace-Id"] = "abc123"
+        return {"response": "ok"}
+
+    @app.post("/api/v1/chat/{agent_name}/stream")
+    async def stream(agent_name: str, body: dict):
+        async def events():
+            yield "event: token\n\n"
+            record_job_ids(8)
+            yield "event: done\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/api/v1/jobs/queue")
+    async def queue():
+        return {}
+
+    return app
+
+@pytest.mark.asyncio
+async def test_middleware_records_calls_and_the_jobs_they_queued(tmp_path):
+    path = tmp_path / "captures" / "requests.jsonl"
+    recorder = TrafficRecorder(str(path), max_bytes=600, backups=2)
+    recorder.start()
+    async with AsyncClient(transport=ASGITransport(app=make_app(recorder)), base_url="http://test") as ac:
+        await ac.post("/api/v1/chat/Art", json={"message": "A knight"})
+        await ac.post("/api/v1/chat/Art/stream", json={"message": "A dragon"})
+        await ac.get("/api/v1/jobs/queue")
+        for i in range(4):
+            await ac.post("/api/v1/chat/PM", json={"message": f"Status {i}"})
+    recorder.stop()
+
+    # The file rotated; replay reads the rotated files oldest first
+    assert (tmp_path / "captures" / "requests.jsonl.1").exists()
+    entries = load_capture(sorted(map(str, (tmp_path / "captures").iterdir()), reverse=True))
+    assert len(entries) == 6
+    first, streamed = entries[0], entries[1]
+    assert (first["agent"], first["message"], first["job_ids"], first["trace_id"]) == ("Art", "A knight", [7], "abc123")
+    assert (streamed["path"], streamed["job_ids"], streamed["status"]) == ("/api/v1/chat/Art/stream", [8], 200)
+    assert [entry["message"] for entry in entries[2:]] == [f"Status {i}" for i in range(4)]
+    assert entries == sorted(entries, key=lambda entry: entry["ts"])
+
+def test_replay_schedule():
+    entries = [{"ts": 100.0}, {"ts": 101.0}, {"ts": 104.0}]
+    assert schedule(entries, 1.0) == [0.0, 1.0, 4.0]
+    assert schedule(entries, 4.0) == [0.0, 0.25, 1.0]
+    assert schedule(entries, parse_speed("max")) == [0.0, 0.0, 0.0]
+    assert parse_speed("10x") == 10.0
+
+@pytest.mark.asyncio
+async def test_replay_maps_captured_jobs_to_new_ones_for_approvals():
+    approved = []
+    server = FakeServer()
+
+    async def execute(request):
+        return web.json_response({"asset_id": 100 + len(approved)})
+
+    async def approve(request):
+        approved.append(await request.json())
+        return web.json_response({"status": "success"})
+
+    server.app.router.add_post("/api/v1/execute_generation", execute)
+    server.app.router.add_post("/api/v1/approve_asset", approve)
+    url = await server.start()
+    entries = [
+        {"ts": 10.0, "method": "POST", "path": "/api/v1/execute_generation", "body": {"prompt": "knight"}, "job_ids": [5]},
+        {"ts": 10.1, "method": "POST", "path": "/api/v1/approve_asset", "body": {"asset_id": 5, "asset_type": "sprite"}},
+        {"ts": 10.2, "method": "POST", "path": "/api/v1/approve_asset", "body": {"asset_id": 6, "asset_type": "sprite"}},
+    ]
+    try:
+        report = await Replayer(url, speed=2.0).run(entries)
+    finally:
+        await server.stop()
+
+    assert approved == [{"asset_id": 100, "asset_type": "sprite"}]
+    assert report["skipped_approvals"] == 1
+    assert (report["captured_jobs"], report["replayed_jobs"]) == (1, 1)
+    assert report["routes"]["POST /api/v1/approve_asset"]["statuses"] == {"200": 1}
+    assert report["duration_seconds"] >= 0.1
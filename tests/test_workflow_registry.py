@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from scripts.workflow_registry import WorkflowRegistry, WorkflowError
+
+WORKFLOWS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'workflows'))
+
+def test_registry_converts_ui_workflows_and_finds_nodes_by_class_type():
+    registry = WorkflowRegistry(WORKFLOWS_DIR)
+    registry.load_all()
+    assert registry.errors == {}
+
+    background = registry.get("workflow_background.json")
+    assert background.source_format == "ui"
+    assert (background.prompt_node, background.negative_node, background.output_node) == ("6", "7", "9")
+    assert background.size == (160, 144)
+
+    workflow = background.instantiate("castle gate", "background", seed=42)
+    sampler = workflow["8"]
+    assert sampler["class_type"] == "KSampler"
+    assert sampler["inputs"]["seed"] == 42
+    assert sampler["inputs"]["positive"] == ["6", 0]
+    assert "control_after_generate" not in sampler["inputs"]
+    assert workflow["6"]["inputs"]["text"].startswith("castle gate")
+
+    pixel_art = registry.get("workflow_pixel_art.json")
+    workflow = pixel_art.instantiate("knight", "sprite")
+    assert "knight" in workflow["6"]["inputs"]["text"] and "[SUBJECT]" not in workflow["6"]["inputs"]["text"]
+    # Jobs get copies; the template itself is untouched
+    assert "[SUBJECT]" in pixel_art.prompt_template
+
+def test_registry_reloads_changed_files_and_reports_invalid_ones(tmp_path):
+    shutil.copy(os.path.join(WORKFLOWS_DIR, "workflow_pixel_art.json"), tmp_path / "art.json")
+    registry = WorkflowRegistry(str(tmp_path))
+    registry.load_all()
+    assert registry.get("art.json").size == (160, 144)
+
+    path = tmp_path / "art.json"
+    data = json.loads(path.read_text())
+    data["5"]["inputs"]["width"] = 256
+    path.write_text(json.dumps(data))
+    os.utime(path, (os.path.getmtime(path) + 5,) * 2)
+    (tmp_path / "broken.json").write_text(json.dumps({"1": {"class_type": "SaveImage", "inputs": {"images": ["2", 0]}}}))
+    registry.load_all()
+
+    assert registry.get("art.json").size == (256, 144)
+    assert "broken.json" in registry.errors
+    with pytest.raises(WorkflowError):
+        registry.get("broken.json")
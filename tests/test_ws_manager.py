@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+
+# Add the project root to the path to allow importing 'scripts'
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.ws_manager import ConnectionManager
+
+class FakeWebSocket:
+    """Records sent messages; `delay` simulates a slow client and `fail` a dead one."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        if self.fail:
+            raise ConnectionResetError("socket closed")
+        await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+    async def close(self):
+        self.closed = True
+
+def progress(asset_id, value):
+    return {"event": "UPDATE", "status": "GENERATING", "asset_id": asset_id, "progress": {"value": value, "max": 20}}
+
+@pytest.mark.asyncio
+async def test_slow_and_dead_clients_do_not_delay_others():
+    manager = ConnectionManager(queue_size=5, send_timeout=1.0)
+    fast, slow, dead = FakeWebSocket(), FakeWebSocket(delay=0.5), FakeWebSocket(fail=True)
+    for ws in (fast, slow, dead):
+        await manager.connect(ws)
+
+    started = asyncio.get_running_loop().time()
+    for value in range(10):
+        await manager.broadcast(progress(1, value))
+    await manager.broadcast({"event": "UPDATE", "status": "COMPLETED", "asset_id": 1})
+    assert asyncio.get_running_loop().time() - started < 0.1
+
+    await asyncio.sleep(0.05)
+    assert fast.sent[-1]["status"] == "COMPLETED"
+    # The dead socket is evicted instead of raising into the caller
+    assert dead.closed and dead not in manager.clients
+    await asyncio.sleep(1.1)
+    # The slow client only got the newest progress event, then the completion
+    assert [m.get("progress", {}).get("value") for m in slow.sent] == [9, None]
+    await manager.stop()
+
+@pytest.mark.asyncio
+async def test_topic_subscriptions_and_heartbeat_eviction():
+    manager = ConnectionManager(heartbeat_interval=0.05, heartbeat_timeout=0.1)
+    follower, everyone, silent = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    follower_client = await manager.connect(follower, ["job:2"])
+    everyone_client = await manager.connect(everyone)
+    await manager.connect(silent)
+    await manager.start()
+
+    await manager.broadcast({"event": "UPDATE", "status": "COMPLETED", "asset_id": 1})
+    await manager.broadcast({"event": "UPDATE", "status": "COMPLETED", "asset_id": 2})
+    await manager.broadcast({"event": "QUEUE", "queued": 0})
+    for _ in range(4):
+        await asyncio.sleep(0.05)
+        manager.handle_client_message(follower_client, '{"action": "pong"}')
+        manager.handle_client_message(everyone_client, '{"action": "pong"}')
+
+    assert [m.get("asset_id") for m in follower.sent if m["event"] != "PING"] == [2, None]
+    assert [m.get("asset_id") for m in everyone.sent if m["event"] != "PING"] == [1, 2, None]
+    assert silent.closed and silent not in manager.clients
+    assert follower in manager.clients and everyone in manager.clients
+    await manager.stop()